@@ -0,0 +1,256 @@
+import argparse
+import json
+import logging
+from concurrent.futures import Future
+from functools import partial
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable
+from urllib.parse import parse_qs, urlparse
+from documents_parser import __version__, settings
+from documents_parser.pipeline import FORMS, process_document_bytes
+from documents_parser.utils.jobs import Job, JobQueue, QueueFull
+from documents_parser.utils.quality import TIERS
+from documents_parser.utils.timing import prometheus_text, record_stages
+
+logger = logging.getLogger("dev")
+
+# Seconds the client should wait after 429/503
+RETRY_AFTER = 5
+
+
+class ApiServer(ThreadingHTTPServer):
+    """
+    HTTP server validating documents in the job queue
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self, address: tuple[str, int], queue: JobQueue,
+        worker: Callable = process_document_bytes,
+        sync_timeout: float | None = None
+    ):
+        """
+        Initialize the server
+
+        :param address: host and port
+        :param queue: job queue with the worker pool
+        :param worker: picklable function (data, form, tier=...) -> result, form is None to detect,
+            tier is None for the setting
+        :param sync_timeout: seconds to wait in synchronous mode, setting by default
+        """
+        super().__init__(address, ApiHandler)
+        self.queue = queue
+        self.worker = worker
+        self.sync_timeout = settings.API_SYNC_TIMEOUT if sync_timeout is None else sync_timeout
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    """
+    Routes:
+        POST /validate[?form=<М-11|ФМУ-76|auto>][&tier=<fast|balanced|accurate>][&mode=async][&name=<file name>]
+            body is the pdf file, the form is detected by default,
+            the OCR quality tier is the setting by default.
+            Synchronous mode returns the result, async mode
+            (or sync timeout) returns 202 with the job id.
+        GET /jobs/<id>
+            job status and result when finished
+        GET /health
+            version and number of unfinished jobs
+        GET /metrics
+            time of the pipeline stages of the finished jobs in Prometheus text format
+    """
+
+    server: ApiServer
+    server_version = f"DocumentsParser/{__version__}"
+
+    def do_GET(self) -> None:
+        path = urlparse(self.path).path.rstrip("/")
+        if path == "/health":
+            self.send_json(HTTPStatus.OK, {
+                "version": __version__,
+                "pending": self.server.queue.pending,
+                "max_pending": self.server.queue.max_pending,
+            })
+        elif path == "/metrics":
+            body = prometheus_text().encode("utf-8")
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif path.startswith("/jobs/"):
+            job = self.server.queue.get(path[len("/jobs/"):])
+            if job is None:
+                self.send_error_json(HTTPStatus.NOT_FOUND, "Unknown job")
+            else:
+                self.send_job(job)
+        else:
+            self.send_error_json(HTTPStatus.NOT_FOUND, "Unknown path")
+
+    def do_POST(self) -> None:
+        url = urlparse(self.path)
+        if url.path.rstrip("/") != "/validate":
+            self.send_error_json(HTTPStatus.NOT_FOUND, "Unknown path")
+            return
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        form = query.get("form", "auto")
+        if form not in FORMS + ("auto",):
+            self.send_error_json(HTTPStatus.BAD_REQUEST, f"`form` should be one of {FORMS} or auto")
+            return
+        tier = query.get("tier")
+        if tier is not None and tier not in TIERS:
+            self.send_error_json(HTTPStatus.BAD_REQUEST, f"`tier` should be one of {tuple(TIERS)}")
+            return
+
+        length = int(self.headers.get("Content-Length") or 0)
+        if length <= 0:
+            self.send_error_json(HTTPStatus.LENGTH_REQUIRED, "Empty body, send the pdf file")
+            return
+        if length > settings.API_MAX_UPLOAD_MB * 2 ** 20:
+            self.send_error_json(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "File is too large")
+            return
+        data = self.rfile.read(length)
+
+        try:
+            job = self.server.queue.submit(
+                partial(self.server.worker, tier=tier), data, None if form == "auto" else form,
+                name=query.get("name", "")
+            )
+        except QueueFull as e:
+            self.send_error_json(HTTPStatus.TOO_MANY_REQUESTS, str(e), retry=True)
+            return
+        except RuntimeError as e:
+            # pool is broken or shut down
+            logger.warning(f"Can't submit the job: {e!r}")
+            self.send_error_json(HTTPStatus.SERVICE_UNAVAILABLE, "Workers are unavailable", retry=True)
+            return
+        job.future.add_done_callback(record_job_stages)
+
+        if query.get("mode", "sync") == "sync":
+            try:
+                job.result(timeout=self.server.sync_timeout)
+            except Exception:
+                # timeout and job errors are reported by the job status
+                pass
+        self.send_job(job)
+
+    def send_job(self, job: Job) -> None:
+        """
+        Send job status, result if finished
+
+        :param job: job
+        :return:
+            None
+        """
+        payload = {"id": job.id, "name": job.name, "state": job.status}
+        if not job.done:
+            self.send_json(HTTPStatus.ACCEPTED, payload, location=f"/jobs/{job.id}")
+        elif job.error is not None:
+            payload["error"] = repr(job.error)
+            self.send_json(HTTPStatus.INTERNAL_SERVER_ERROR, payload)
+        else:
+            payload["result"] = job.result()
+            self.send_json(HTTPStatus.OK, payload)
+
+    def send_error_json(self, status: HTTPStatus, message: str, retry: bool = False) -> None:
+        """
+        Send error message
+
+        :param status: HTTP status
+        :param message: error description
+        :param retry: add Retry-After header
+        :return:
+            None
+        """
+        self.send_json(status, {"error": message}, retry_after=RETRY_AFTER if retry else None)
+
+    def send_json(
+        self, status: HTTPStatus, payload: dict,
+        location: str | None = None, retry_after: int | None = None
+    ) -> None:
+        """
+        Send JSON response
+
+        :param status: HTTP status
+        :param payload: response body
+        :param location: Location header
+        :param retry_after: Retry-After header
+        :return:
+            None
+        """
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        if location is not None:
+            self.send_header("Location", location)
+        if retry_after is not None:
+            self.send_header("Retry-After", str(retry_after))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        logger.info(f"{self.address_string()} {format % args}")
+
+
+def record_job_stages(future: Future) -> None:
+    """
+    Add the stages measured in the worker to the metrics of the server
+
+    :param future: finished worker call
+    :return:
+        None
+    """
+    if future.cancelled() or future.exception() is not None:
+        return
+    result = future.result()
+    if isinstance(result, dict):
+        record_stages(result.get("stages", {}), result.get("form"))
+
+
+def parse_args(args: list[str] | None = None) -> argparse.Namespace:
+    """
+    Parse command line arguments
+
+    :param args: arguments, sys.argv by default
+    :return:
+        Parsed arguments
+    """
+    parser = argparse.ArgumentParser(
+        prog="parser-api",
+        description="HTTP сервис проверки документов М-11 и ФМУ-76",
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen")
+    parser.add_argument("--port", type=int, default=8000, help="port to listen")
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=None,
+        help="number of worker processes, DOCUMENTS_PARSER_QUEUE_WORKERS by default",
+    )
+    parser.add_argument(
+        "--queue-size", type=int, default=None,
+        help="limit of unfinished documents, DOCUMENTS_PARSER_QUEUE_SIZE by default",
+    )
+    return parser.parse_args(args)
+
+
+def main(args: list[str] | None = None) -> None:
+    args = parse_args(args)
+    logger.setLevel(logging.INFO)
+    logger.addHandler(logging.StreamHandler())
+
+    queue = JobQueue(workers=args.jobs, max_pending=args.queue_size)
+    server = ApiServer((args.host, args.port), queue)
+    logger.info(f"Listen on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        queue.shutdown(wait=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+import argparse
+import json
+import multiprocessing
+import platform
+import resource
+import sys
+import time
+from pathlib import Path
+import pandas as pd
+from documents_parser import __version__
+from documents_parser.pipeline import STATUS_ACCEPTED, STATUS_ERROR, STATUS_REJECTED, process_document
+from documents_parser.utils.timing import stage_times
+
+# Expected verdict of the labelled folders of the corpus
+EXPECTED = {
+    "Принято": STATUS_ACCEPTED,
+    "Аннулировано": STATUS_REJECTED,
+}
+# Default regression thresholds: relative slowdown of the median time
+# of the folder or of the total stage time, drop of the folder accuracy
+MAX_SLOWDOWN = 0.2
+MAX_ACCURACY_DROP = 0.0
+# Stages faster than this (in seconds per corpus) are not compared, their noise is too high
+MIN_STAGE_SECONDS = 1.0
+
+
+def run_document(path: Path) -> dict:
+    """
+    Process the document in the fresh worker process,
+    so the peak RSS belongs to this document only
+
+    :param path: path to pdf file
+    :return:
+        dict with the verdict, time, peak RSS and stage times
+    """
+    stage_times(reset=True)
+    start = time.perf_counter()
+    result = process_document(path, use_cache=False, workers=1)
+    elapsed = time.perf_counter() - start
+    # kilobytes on Linux
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    expected = EXPECTED.get(path.parent.name)
+    return {
+        "path": str(path),
+        "folder": f"{path.parent.parent.name}/{path.parent.name}",
+        "form": result.get("form"),
+        "status": result["status"],
+        "expected": expected,
+        "correct": None if expected is None else result["status"] == expected,
+        "seconds": round(elapsed, 3),
+        "peak_rss_mb": round(peak_rss, 1),
+        "stages": {name: value["seconds"] for name, value in stage_times().items()},
+    }
+
+
+def summarize(documents: list[dict]) -> dict:
+    """
+    Aggregate per-document results
+
+    :param documents: list of results of run_document
+    :return:
+        dict with per-folder latency and accuracy and total stage times
+    """
+    results = pd.DataFrame(documents)
+    folders = {}
+    for folder, group in results.groupby("folder"):
+        labelled = group["correct"].dropna()
+        folders[folder] = {
+            "documents": len(group),
+            "errors": int((group["status"] == STATUS_ERROR).sum()),
+            "accuracy": round(float(labelled.mean()), 4) if len(labelled) else None,
+            "median_s": round(float(group["seconds"].median()), 3),
+            "p95_s": round(float(group["seconds"].quantile(0.95)), 3),
+            "peak_rss_mb": round(float(group["peak_rss_mb"].max()), 1),
+        }
+    stages = pd.DataFrame(list(results["stages"])).fillna(0).sum().round(3)
+    labelled = results["correct"].dropna()
+    return {
+        "documents": len(results),
+        "total_s": round(float(results["seconds"].sum()), 3),
+        "accuracy": round(float(labelled.mean()), 4) if len(labelled) else None,
+        "peak_rss_mb": round(float(results["peak_rss_mb"].max()), 1),
+        "folders": folders,
+        "stages": stages.sort_values(ascending=False).to_dict(),
+    }
+
+
+def compare(baseline: dict, current: dict, max_slowdown: float, max_accuracy_drop: float) -> list[str]:
+    """
+    Find regressions of the current run against the baseline
+
+    :param baseline: summary of the baseline run
+    :param current: summary of the current run
+    :param max_slowdown: allowed relative increase of the time
+    :param max_accuracy_drop: allowed decrease of the accuracy
+    :return:
+        list of regression messages, empty if there are none
+    """
+    regressions = []
+    for folder, old in baseline["folders"].items():
+        new = current["folders"].get(folder)
+        if new is None:
+            continue
+        if new["median_s"] > old["median_s"] * (1 + max_slowdown):
+            regressions.append(f"{folder}: median time {old['median_s']} s -> {new['median_s']} s")
+        if old["accuracy"] is not None and new["accuracy"] is not None \
+                and new["accuracy"] < old["accuracy"] - max_accuracy_drop:
+            regressions.append(f"{folder}: accuracy {old['accuracy']} -> {new['accuracy']}")
+    for name, old in baseline["stages"].items():
+        new = current["stages"].get(name, 0.0)
+        if old >= MIN_STAGE_SECONDS and new > old * (1 + max_slowdown):
+            regressions.append(f"stage {name}: {old} s -> {new} s")
+    return regressions
+
+
+def main(args: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m documents_parser.benchmarks.corpus",
+        description="Замер скорости и точности вердиктов полного конвейера на корпусе",
+    )
+    parser.add_argument("inputs", nargs="*", default=["data"], help="directories with pdf files")
+    parser.add_argument("-o", "--output", default=None, help="JSON file for the results, e.g. the baseline")
+    parser.add_argument("--compare", default=None, help="baseline JSON file to compare with")
+    parser.add_argument("--max-slowdown", type=float, default=MAX_SLOWDOWN, help="allowed relative slowdown")
+    parser.add_argument("--max-accuracy-drop", type=float, default=MAX_ACCURACY_DROP, help="allowed accuracy drop")
+    args = parser.parse_args(args)
+
+    files = sorted(
+        path for item in args.inputs
+        for path in (Path(item).rglob("*.pdf") if Path(item).is_dir() else [Path(item)])
+    )
+    # one process per document: the peak RSS and the stage times are not shared
+    with multiprocessing.Pool(1, maxtasksperchild=1) as pool:
+        documents = pool.map(run_document, files, chunksize=1)
+    summary = summarize(documents)
+    run = {
+        "version": __version__,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "summary": summary,
+        "documents": documents,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(run, f, ensure_ascii=False, indent=1)
+
+    folders = pd.DataFrame(summary["folders"]).T
+    print(folders.to_string())
+    print(pd.Series(summary["stages"], name="seconds").to_string())
+    print(
+        f"Total: {summary['documents']} documents, {summary['total_s']} s, "
+        f"accuracy {summary['accuracy']}, peak RSS {summary['peak_rss_mb']} MB"
+    )
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["summary"]
+        regressions = compare(baseline, summary, args.max_slowdown, args.max_accuracy_drop)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import argparse
+import time
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from documents_parser.utils.document import DocumentContext
+from documents_parser.utils.lines import detect_lines, hough_lines
+
+# Lines closer than this (in pixels) are the same line
+TOLERANCE = 10
+
+
+def matched(line: list[int], lines: list[list[int]], tolerance: int = TOLERANCE) -> bool:
+    """
+    Check that the line is covered by one of the lines
+
+    :param line: line [x1, y1, x2, y2]
+    :param lines: list of lines
+    :param tolerance: allowed distance in pixels
+    :return:
+        True if the line is found
+    """
+    return any(
+        abs(other[1] - line[1]) <= tolerance
+        and other[0] <= line[0] + tolerance
+        and other[2] >= line[2] - tolerance
+        for other in lines
+    )
+
+
+def same_ends(line: list[int], lines: list[list[int]], tolerance: int = TOLERANCE) -> bool:
+    """
+    Check that one of the lines has the same end points,
+    so too long lines are not counted as found
+
+    :param line: line [x1, y1, x2, y2]
+    :param lines: list of lines
+    :param tolerance: allowed distance in pixels
+    :return:
+        True if the line is found with its end points
+    """
+    return any(
+        max(abs(other[0] - line[0]), abs(other[1] - line[1]), abs(other[2] - line[2])) <= tolerance
+        for other in lines
+    )
+
+
+def benchmark(path: Path) -> dict:
+    """
+    Detect lines on the first page by both detectors
+
+    :param path: path to pdf file
+    :return:
+        dict with timings, number of lines and agreement of the detectors
+    """
+    context = DocumentContext(str(path))
+    gray = context.gray(0)
+
+    start = time.perf_counter()
+    edges = context.edges(0)
+    reference = hough_lines(edges)
+    hough_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    lines = detect_lines(gray)
+    morphology_time = time.perf_counter() - start
+
+    header = [
+        bool(np.abs(np.subtract(reference[i], lines[i])).max() <= TOLERANCE)
+        for i in range(2) if i < len(reference) and i < len(lines)
+    ]
+    return {
+        "path": str(path),
+        "hough_ms": round(hough_time * 1000, 1),
+        "morphology_ms": round(morphology_time * 1000, 1),
+        "hough_lines": len(reference),
+        "morphology_lines": len(lines),
+        "recall": np.mean([matched(line, lines) for line in reference]) if reference else np.nan,
+        "ends_match": np.mean([same_ends(line, lines) for line in reference]) if reference else np.nan,
+        "header_match": len(header) == 2 and all(header),
+    }
+
+
+def main(args: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m documents_parser.benchmarks.lines",
+        description="Сравнение детектора линий с преобразованием Хафа",
+    )
+    parser.add_argument("inputs", nargs="*", default=["data"], help="directories with pdf files")
+    parser.add_argument("-o", "--output", default=None, help="CSV file with results per document")
+    args = parser.parse_args(args)
+
+    files = sorted(
+        path for item in args.inputs
+        for path in (Path(item).rglob("*.pdf") if Path(item).is_dir() else [Path(item)])
+    )
+    results = pd.DataFrame([benchmark(path) for path in files])
+    if args.output:
+        results.to_csv(args.output, index=False)
+
+    results["folder"] = results["path"].map(lambda path: Path(path).parent.name)
+    summary = results.groupby("folder").agg(
+        documents=("path", "size"),
+        hough_ms=("hough_ms", "median"),
+        morphology_ms=("morphology_ms", "median"),
+        recall=("recall", "mean"),
+        ends_match=("ends_match", "mean"),
+        header_match=("header_match", "mean"),
+    )
+    print(summary.round(3).to_string())
+    print(
+        f"Total: hough {results['hough_ms'].sum() / 1000:.2f} s, "
+        f"morphology {results['morphology_ms'].sum() / 1000:.2f} s, "
+        f"recall {results['recall'].mean():.3f}, end points {results['ends_match'].mean():.3f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
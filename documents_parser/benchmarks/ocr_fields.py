@@ -0,0 +1,119 @@
+import argparse
+import time
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from documents_parser.parser import ocr_fmu76_scripts, ocr_m11_scripts
+from documents_parser.parser.classifier import FORM_FMU76, FORM_M11, classify_document
+from documents_parser.utils.document import DocumentContext
+from documents_parser.utils.extraction import extract_texts
+from documents_parser.utils.text_layer import has_text_layer
+
+# OCR settings compared by the benchmark: one default config and per-field profiles
+MODES = {
+    "default": {FORM_M11: None, FORM_FMU76: None},
+    "profiles": {FORM_M11: ocr_m11_scripts.FIELD_PROFILES, FORM_FMU76: ocr_fmu76_scripts.FIELD_PROFILES},
+}
+PARSERS = {FORM_M11: ocr_m11_scripts, FORM_FMU76: ocr_fmu76_scripts}
+
+
+def normalize(value) -> str:
+    """
+    Value of the field without the case and whitespace differences
+
+    :param value: field value
+    :return:
+        normalized string
+    """
+    return " ".join(str(value or "").split()).lower()
+
+
+def header_rois(context: DocumentContext, form: str) -> dict[str, tuple[slice, slice]]:
+    """
+    Header regions of the first page, found as in the OCR path of the parser
+
+    :param context: opened document
+    :param form: form type
+    :return:
+        dict of region -> ROI as numpy slices
+    """
+    page, gray = context.page(0), context.gray(0)
+    if form == FORM_M11:
+        lines, info = ocr_m11_scripts.line_detector(page, gray=gray)
+        return ocr_m11_scripts.header_rois(lines, info)
+    return ocr_fmu76_scripts.header_rois(ocr_fmu76_scripts.line_detector(page, gray=gray))
+
+
+def benchmark(path: Path) -> list[dict]:
+    """
+    Recognize the header of the digital document in every mode
+    and compare the fields with the embedded text layer
+
+    :param path: path to pdf file
+    :return:
+        list of dicts with mode, field, correctness and OCR time of the document
+    """
+    context = DocumentContext(str(path))
+    spans = context.spans(0)
+    if not has_text_layer(spans):
+        return []
+    form = classify_document(context, str(path), use_ocr=False).form
+    parser = PARSERS[form]
+    expected = parser.parse_text_layer(spans)
+    if expected is None:
+        return []
+
+    img = np.array(context.page(0))
+    rois = header_rois(context, form)
+    rows = []
+    for mode, profiles in MODES.items():
+        start = time.perf_counter()
+        texts = extract_texts(img, rois, profiles[form])
+        elapsed = time.perf_counter() - start
+        try:
+            fields = parser.header_fields(texts)
+        except (IndexError, ValueError):
+            fields = {}
+        rows.extend(
+            {
+                "path": str(path),
+                "form": form,
+                "mode": mode,
+                "field": field,
+                "correct": normalize(fields.get(field)) == normalize(value),
+                "ocr_ms": round(elapsed * 1000, 1),
+            }
+            for field, value in expected.items()
+        )
+    return rows
+
+
+def main(args: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m documents_parser.benchmarks.ocr_fields",
+        description="Сравнение настроек OCR полей шапки с единой настройкой по текстовому слою",
+    )
+    parser.add_argument("inputs", nargs="*", default=["data"], help="directories with pdf files")
+    parser.add_argument("-o", "--output", default=None, help="CSV file with results per field")
+    args = parser.parse_args(args)
+
+    files = sorted(
+        path for item in args.inputs
+        for path in (Path(item).rglob("*.pdf") if Path(item).is_dir() else [Path(item)])
+    )
+    results = pd.DataFrame([row for path in files for row in benchmark(path)])
+    if results.empty:
+        print("No documents with the text layer")
+        return
+    if args.output:
+        results.to_csv(args.output, index=False)
+
+    accuracy = results.pivot_table(index=["form", "field"], columns="mode", values="correct", aggfunc="mean")
+    print(accuracy.round(3).to_string())
+    timing = results.drop_duplicates(["path", "mode"]).groupby(["form", "mode"])["ocr_ms"].agg(["size", "median", "sum"])
+    print(timing.round(1).to_string())
+    print(results.groupby("mode")["correct"].mean().round(3).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import argparse
+import time
+from pathlib import Path
+import camelot
+import pandas as pd
+from documents_parser.parser.classifier import FORM_M11, classify_document
+from documents_parser.parser.table_parser import read_tables, table_ocr_fmu76, table_ocr_m11
+from documents_parser.utils.lines import LINE_SCALE
+from documents_parser.utils.document import DocumentContext
+
+
+def extract(path: Path, form: str, scoped: bool) -> (list[pd.DataFrame] | str, float):
+    """
+    Extract tables of the document in a fresh context, so pages are rendered in both modes
+
+    :param path: path to pdf file
+    :param form: form type
+    :param scoped: process only the found table regions
+    :return:
+        tables or the error message, time in seconds
+    """
+    parse = table_ocr_m11 if form == FORM_M11 else table_ocr_fmu76
+    start = time.perf_counter()
+    try:
+        tables = parse(None, context=DocumentContext(str(path)), workers=1, scoped=scoped)
+    except Exception as e:
+        tables = repr(e)
+    return tables, time.perf_counter() - start
+
+
+def extract_raw(path: Path, backend: str | None) -> (list[pd.DataFrame] | str, float):
+    """
+    Extract raw tables of all pages with the given image backend
+
+    :param path: path to pdf file
+    :param backend: camelot backend rendering at the lattice resolution,
+        None for the pages rendered in the document context
+    :return:
+        tables or the error message, time in seconds
+    """
+    start = time.perf_counter()
+    try:
+        if backend is None:
+            tables = read_tables(DocumentContext(str(path)), workers=1, scoped=False)
+        else:
+            tables = [
+                table.df for table in camelot.read_pdf(str(path), pages="all", backend=backend, line_scale=LINE_SCALE)
+            ]
+    except Exception as e:
+        tables = repr(e)
+    return tables, time.perf_counter() - start
+
+
+def same_tables(first: list[pd.DataFrame] | str, second: list[pd.DataFrame] | str) -> bool:
+    """
+    Check that both modes give the same tables or both fail
+
+    :param first: tables or the error message
+    :param second: tables or the error message
+    :return:
+        True if equal
+    """
+    if isinstance(first, str) or isinstance(second, str):
+        return isinstance(first, str) and isinstance(second, str)
+    return len(first) == len(second) and all(
+        a.reset_index(drop=True).equals(b.reset_index(drop=True)) for a, b in zip(first, second)
+    )
+
+
+def benchmark(path: Path, backend: str = "ghostscript") -> dict:
+    """
+    Extract tables of the whole document and of the found regions only,
+    raw tables from the context pages and from camelot's own render
+
+    :param path: path to pdf file
+    :param backend: camelot backend of the reference render
+    :return:
+        dict with timings and agreement of the modes and of the backends
+    """
+    form = classify_document(DocumentContext(str(path)), path.name, use_ocr=False).form
+    full, full_time = extract(path, form, scoped=False)
+    scoped, scoped_time = extract(path, form, scoped=True)
+    context_tables, context_time = extract_raw(path, None)
+    reference, reference_time = extract_raw(path, backend)
+    return {
+        "path": str(path),
+        "form": form,
+        "full_s": round(full_time, 3),
+        "scoped_s": round(scoped_time, 3),
+        "same": same_tables(full, scoped),
+        "failed": isinstance(full, str),
+        "context_s": round(context_time, 3),
+        "reference_s": round(reference_time, 3),
+        "same_backend": same_tables(context_tables, reference),
+    }
+
+
+def main(args: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m documents_parser.benchmarks.tables",
+        description="Сравнение извлечения таблиц по всему документу и по найденным областям, "
+                    "по страницам контекста и по рендеру camelot",
+    )
+    parser.add_argument("inputs", nargs="*", default=["data"], help="directories with pdf files")
+    parser.add_argument(
+        "--backend", default="ghostscript", choices=("ghostscript", "poppler"),
+        help="camelot backend of the reference render",
+    )
+    parser.add_argument("-o", "--output", default=None, help="CSV file with results per document")
+    args = parser.parse_args(args)
+
+    files = sorted(
+        path for item in args.inputs
+        for path in (Path(item).rglob("*.pdf") if Path(item).is_dir() else [Path(item)])
+    )
+    results = pd.DataFrame([benchmark(path, args.backend) for path in files])
+    if args.output:
+        results.to_csv(args.output, index=False)
+
+    results["folder"] = results["path"].map(lambda path: Path(path).parent.name)
+    summary = results.groupby("folder").agg(
+        documents=("path", "size"),
+        full_s=("full_s", "median"),
+        scoped_s=("scoped_s", "median"),
+        same=("same", "mean"),
+        failed=("failed", "sum"),
+        context_s=("context_s", "median"),
+        reference_s=("reference_s", "median"),
+        same_backend=("same_backend", "mean"),
+    )
+    print(summary.round(3).to_string())
+    print(
+        f"Total: full {results['full_s'].sum():.1f} s, "
+        f"scoped {results['scoped_s'].sum():.1f} s, "
+        f"same {results['same'].mean():.3f}, "
+        f"context pages {results['context_s'].sum():.1f} s, {args.backend} {results['reference_s'].sum():.1f} s, "
+        f"same tables {results['same_backend'].mean():.3f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
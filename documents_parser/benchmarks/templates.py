@@ -0,0 +1,174 @@
+import argparse
+import time
+from pathlib import Path
+import cv2
+import numpy as np
+import pandas as pd
+from documents_parser.parser import ocr_fmu76_scripts, ocr_m11_scripts
+from documents_parser.parser.classifier import FORM_M11, classify_document
+from documents_parser.utils.document import DocumentContext
+from documents_parser.utils.extraction import roi_to_box
+from documents_parser.utils.lines import detect_lines
+from documents_parser.utils.templates import (
+    HEADER_BAND, LayoutProbe, LayoutTemplate, TemplateRegistry, fingerprint
+)
+from documents_parser.utils.text_layer import has_text_layer
+
+# Scan distortions of the augmented copies: rotation in degrees,
+# shift in pixels, noise level, part of the dust pixels. Thin rules
+# rotated by more than ~0.2 degree are broken for the line detector
+MAX_ANGLE = 0.1
+MAX_SHIFT = 4
+NOISE = 12
+DUST = 0.001
+
+
+def augment(gray: np.ndarray, rng: np.random.Generator, max_angle: float = MAX_ANGLE) -> np.ndarray:
+    """
+    Simulate a scan of the page: small rotation and shift, noise and dust
+
+    :param gray: grayscale page
+    :param rng: random generator
+    :param max_angle: largest rotation in degrees
+    :return:
+        distorted page
+    """
+    height, width = gray.shape
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), rng.uniform(-max_angle, max_angle), 1)
+    matrix[:, 2] += rng.integers(-MAX_SHIFT, MAX_SHIFT + 1, 2)
+    page = cv2.warpAffine(gray, matrix, (width, height), borderValue=255).astype(np.int16)
+    page += rng.normal(0, NOISE, page.shape).astype(np.int16)
+    page[rng.random(page.shape) < DUST] = 0
+    return np.clip(page, 0, 255).astype(np.uint8)
+
+
+def header_layout(form: str) -> (float, dict):
+    """
+    Fingerprint band and parameters of the form, as in the parser
+
+    :param form: form type
+    :return:
+        band, fingerprint parameters
+    """
+    if form == FORM_M11:
+        return HEADER_BAND, {}
+    return ocr_fmu76_scripts.HEADER_BAND, {"do_committee": False}
+
+
+def header_rois(gray: np.ndarray, form: str, probe: LayoutProbe) -> dict[str, tuple[slice, slice]]:
+    """
+    Header ROIs of the page found as in the parser on a template miss:
+    the header rules of the fingerprint and the rest of the page.
+    М-11 labels of the signature lines are not recognized, they are below the band.
+
+    :param gray: grayscale page
+    :param form: form type
+    :param probe: fingerprint of the page
+    :return:
+        dict of field -> ROI as numpy slices
+    """
+    lines = probe.lines + [
+        [x1, y1 + probe.bottom, x2, y2 + probe.bottom] for x1, y1, x2, y2 in detect_lines(gray[probe.bottom:])
+    ]
+    if form == FORM_M11:
+        return ocr_m11_scripts.header_rois(lines, {})
+    return ocr_fmu76_scripts.header_rois(lines)
+
+
+def benchmark(
+    path: Path, registry: TemplateRegistry, copies: int,
+    rng: np.random.Generator, max_angle: float = MAX_ANGLE
+) -> list[dict]:
+    """
+    Look up templates for the first page and its augmented copies,
+    learn the missing ones and compare the ROIs of the hits with the found ones
+
+    :param path: path to pdf file
+    :param registry: templates learned so far
+    :param copies: number of augmented copies
+    :param rng: random generator
+    :param max_angle: largest rotation of the copies in degrees
+    :return:
+        list of dicts with the page kind, hit, the largest ROI difference in pixels,
+        time of the fingerprint and of the full page line detection
+    """
+    context = DocumentContext(str(path))
+    form = classify_document(context, str(path), use_ocr=False).form
+    if form is None:
+        return []
+    kind = "digital" if has_text_layer(context.spans(0)) else "scan"
+    band, params = header_layout(form)
+    gray = context.gray(0)
+    rows = []
+    for copy in range(copies + 1):
+        page = gray if copy == 0 else augment(gray, rng, max_angle)
+        start = time.perf_counter()
+        probe = fingerprint(page, form, band, **params)
+        template = registry.get(probe)
+        elapsed = time.perf_counter() - start
+        start = time.perf_counter()
+        detect_lines(page)
+        detection = time.perf_counter() - start
+        try:
+            rois = header_rois(page, form, probe)
+        except IndexError:
+            # not enough header lines
+            continue
+        difference = np.nan
+        if template is None:
+            learned = LayoutTemplate.learn(probe, rois)
+            if learned is not None and probe.lines:
+                registry.put(learned)
+        else:
+            difference = max(
+                np.abs(np.subtract(roi_to_box(roi, page.shape), roi_to_box(rois[field], page.shape))).max()
+                for field, roi in template.rois(page.shape).items()
+            )
+        rows.append({
+            "path": str(path),
+            "form": form,
+            "page": kind if copy == 0 else f"{kind}, augmented",
+            "hit": template is not None,
+            "roi_diff": difference,
+            "fingerprint_ms": round(elapsed * 1000, 2),
+            "detect_ms": round(detection * 1000, 2),
+        })
+    return rows
+
+
+def main(args: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m documents_parser.benchmarks.templates",
+        description="Доля попаданий в шаблоны шапки на первых страницах и их копиях с искажениями скана",
+    )
+    parser.add_argument("inputs", nargs="*", default=["data"], help="directories with pdf files")
+    parser.add_argument("-n", "--copies", type=int, default=3, help="augmented copies of each page")
+    parser.add_argument("--max-angle", type=float, default=MAX_ANGLE, help="largest rotation of the copies, degrees")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the distortions")
+    parser.add_argument("-o", "--output", default=None, help="CSV file with results per page")
+    args = parser.parse_args(args)
+
+    files = sorted(
+        path for item in args.inputs
+        for path in (Path(item).rglob("*.pdf") if Path(item).is_dir() else [Path(item)])
+    )
+    registry = TemplateRegistry(max_templates=len(files) * (args.copies + 1))
+    rng = np.random.default_rng(args.seed)
+    results = pd.DataFrame([row for path in files for row in benchmark(path, registry, args.copies, rng, args.max_angle)])
+    if args.output:
+        results.to_csv(args.output, index=False)
+
+    summary = results.groupby(["form", "page"]).agg(
+        pages=("path", "size"),
+        hit=("hit", "mean"),
+        roi_diff_median=("roi_diff", "median"),
+        roi_diff_max=("roi_diff", "max"),
+        fingerprint_ms=("fingerprint_ms", "median"),
+        detect_ms=("detect_ms", "median"),
+    )
+    print(summary.round(3).to_string())
+    print(f"Templates: {len(registry)}, hit rate {results['hit'].mean():.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,15 @@
+import argparse
+import glob
+import json
 import logging
-from sys import argv
-from documents_parser.parser.ocr_m11_scripts import ocr_m11
-from documents_parser.parser.ocr_fmu76_scripts import ocr_fmu76
-from documents_parser.parser.table_parser import table_ocr_m11
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+import pandas as pd
+from tqdm import tqdm
+from documents_parser.pipeline import FORMS, STATUS_ERROR, process_document
+from documents_parser.utils.profiling import sampled
+from documents_parser.utils.quality import TIERS
+from documents_parser.utils.timing import prometheus_text, record_stages
 
 
 # Set up logger
@@ -12,19 +19,180 @@ ch = logging.StreamHandler()
 ch.setLevel(logging.DEBUG)
 logger.addHandler(ch)
 
+OUTPUT_FORMATS = (".jsonl", ".csv")
 
-def main():
-    filename = None
-    if len(argv) == 2:
-        filename = argv[1]
 
-    # ocr_m11(pdf_path=filename)
-    # table_ocr_m(path=filename)
+def collect_files(inputs: list[str]) -> list[Path]:
+    """
+    Collect pdf files from paths, directories and glob patterns
 
-    # ocr_fmu76(pdf_path=filename)
-    # table_ocr(path=filename)
+    :param inputs: list of paths, directories or globs
+    :return:
+        sorted list of unique pdf files
+    """
+    files = set()
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            files.update(path.rglob("*.pdf"))
+        elif path.is_file():
+            files.add(path)
+        else:
+            files.update(Path(p) for p in glob.glob(item, recursive=True))
+    return sorted(f.resolve() for f in files if f.suffix.lower() == ".pdf")
+
+
+def read_manifest(manifest_path: Path) -> dict[str, dict]:
+    """
+    Read results of the previous runs
+
+    :param manifest_path: path to manifest file
+    :return:
+        dict of path -> result
+    """
+    done = {}
+    if not manifest_path.exists():
+        return done
+    with open(manifest_path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                # line is cut by interrupted run
+                continue
+            done[result["path"]] = result
+    return done
+
+
+def write_results(results: list[dict], output_path: Path) -> None:
+    """
+    Write results to JSONL or CSV, depends on the file extension
+
+    :param results: list of results
+    :param output_path: path to output file
+    :return:
+        None
+    """
+    if output_path.suffix == ".jsonl":
+        with open(output_path, "w", encoding="utf-8") as f:
+            for result in results:
+                f.write(json.dumps(result, ensure_ascii=False) + "\n")
+        return
+
+    rows = []
+    for result in results:
+        row = {key: value for key, value in result.items() if key not in ("report", "reasons", "stages")}
+        row["reasons"] = "; ".join(result.get("reasons", []))
+        row.update({f"time_{name}": value["seconds"] for name, value in result.get("stages", {}).items()})
+        row.update(result.get("report", {}))
+        rows.append(row)
+    pd.DataFrame(rows).to_csv(output_path, index=False)
+
+
+def parse_args(args: list[str] | None = None) -> argparse.Namespace:
+    """
+    Parse command line arguments
+
+    :param args: arguments, sys.argv by default
+    :return:
+        Parsed arguments
+    """
+    parser = argparse.ArgumentParser(
+        prog="parser",
+        description="Пакетная проверка документов М-11 и ФМУ-76",
+    )
+    parser.add_argument("inputs", nargs="+", help="pdf files, directories or glob patterns")
+    parser.add_argument(
+        "-f", "--form", choices=FORMS + ("auto",), default="auto",
+        help="form type, `auto` detects it by the content and the file path",
+    )
+    parser.add_argument(
+        "-o", "--output", default="results.jsonl",
+        help=f"output file, format by extension: {', '.join(OUTPUT_FORMATS)}",
+    )
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=1,
+        help="number of documents processed in parallel",
+    )
+    parser.add_argument(
+        "--manifest", default=None,
+        help="manifest of processed documents, `<output>.manifest.jsonl` by default",
+    )
+    parser.add_argument(
+        "--resume", action="store_true",
+        help="skip documents already processed according to the manifest",
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="do not read or write the on-disk result cache",
+    )
+    parser.add_argument(
+        "--metrics", default=None,
+        help="file for the time of the pipeline stages in Prometheus text format",
+    )
+    parser.add_argument(
+        "--tier", choices=tuple(TIERS), default=None,
+        help="OCR quality tier, DOCUMENTS_PARSER_QUALITY_TIER setting by default",
+    )
+    parser.add_argument(
+        "--profile-rate", type=float, default=0.0,
+        help="fraction of documents profiled with cProfile and tracemalloc into `<output>.profiles`",
+    )
+    parser.add_argument("-v", "--verbose", action="store_true", help="show pipeline logs")
+    return parser.parse_args(args)
+
+
+def main(args: list[str] | None = None) -> None:
+    args = parse_args(args)
+    if not args.verbose:
+        logger.setLevel(logging.WARNING)
+
+    output_path = Path(args.output)
+    if output_path.suffix not in OUTPUT_FORMATS:
+        raise SystemExit(f"Unknown output format: {output_path.suffix}")
+    manifest_path = Path(args.manifest or f"{output_path}.manifest.jsonl")
+    profile_dir = Path(f"{output_path}.profiles")
+
+    files = collect_files(args.inputs)
+    done = read_manifest(manifest_path) if args.resume else {}
+    if not args.resume and manifest_path.exists():
+        manifest_path.unlink()
+
+    tasks = []
+    for path in files:
+        previous = done.get(str(path))
+        if previous is not None and previous["status"] != STATUS_ERROR:
+            continue
+        tasks.append((path, args.form if args.form != "auto" else None))
+    logger.warning(f"Documents: {len(files)}, to process: {len(tasks)}")
+
+    with open(manifest_path, "a", encoding="utf-8") as manifest, \
+            ProcessPoolExecutor(max_workers=max(args.jobs, 1)) as pool:
+        futures = [
+            pool.submit(
+                process_document, path, form, 1, False if args.no_cache else None,
+                profile_dir=profile_dir if sampled(args.profile_rate) else None, tier=args.tier,
+            )
+            for path, form in tasks
+        ]
+        for future in tqdm(as_completed(futures), total=len(futures), unit="doc"):
+            result = future.result()
+            done[result["path"]] = result
+            manifest.write(json.dumps(result, ensure_ascii=False) + "\n")
+            manifest.flush()
+
+    results = [done[str(path)] for path in files if str(path) in done]
+    write_results(results, output_path)
+    if args.metrics:
+        for result in results:
+            record_stages(result.get("stages", {}), result.get("form"))
+        Path(args.metrics).write_text(prometheus_text(), encoding="utf-8")
+    statuses = pd.Series([result["status"] for result in results]).value_counts()
+    print(statuses.to_string())
 
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,134 @@
+import logging
+import re
+from typing import NamedTuple
+from documents_parser.utils.document import DocumentContext
+from documents_parser.utils.extraction import extract_text
+from documents_parser.utils.text_layer import has_text_layer
+from documents_parser.utils.timing import timed
+
+logger = logging.getLogger("dev")
+
+FORM_M11 = "М-11"
+FORM_FMU76 = "ФМУ-76"
+FORMS = (FORM_M11, FORM_FMU76)
+
+# Independent signs of the form in the page text: form number, ОКУД code, title
+MARKERS = {
+    FORM_M11: [
+        re.compile(r"М[\s_-]?11(?!\d)"),
+        re.compile(r"0315006"),
+        re.compile(r"ТРЕБОВАНИЕ[\s-]*НАКЛАДНАЯ"),
+    ],
+    FORM_FMU76: [
+        re.compile(r"ФМУ[\s_-]?76(?!\d)"),
+        re.compile(r"0315835"),
+        re.compile(r"НА СПИСАНИЕ МАТЕРИАЛЬНЫХ"),
+    ],
+}
+# Top right corner of the first page with the form number of both forms,
+# parts of the page height and width
+HAT_HEIGHT = 0.08
+HAT_LEFT = 0.55
+# Page orientation alone, with the file name agreeing, the file name against the orientation
+LAYOUT_CONFIDENCE = 0.6
+LAYOUT_NAME_CONFIDENCE = 0.8
+NAME_CONFIDENCE = 0.5
+
+
+class FormGuess(NamedTuple):
+    """
+    Detected form type, confidence in [0, 1] and the evidence it is based on
+    """
+    form: str | None
+    confidence: float
+    source: str
+
+
+def match_markers(text: str, source: str) -> FormGuess:
+    """
+    Detect the form by the markers in the text. Each matched marker
+    is an independent sign, so confidence is 1 - 0.1 ** hits,
+    lowered by the share of the markers of the other form.
+
+    :param text: page text
+    :param source: evidence name
+    :return:
+        Guess, form is None if there are no markers
+    """
+    text = text.upper()
+    hits = {form: sum(bool(marker.search(text)) for marker in markers) for form, markers in MARKERS.items()}
+    form = max(hits, key=hits.get)
+    if not hits[form]:
+        return FormGuess(None, 0.0, source)
+    share = hits[form] / sum(hits.values())
+    return FormGuess(form, round(share * (1 - 0.1 ** hits[form]), 3), source)
+
+
+def guess_from_name(name: str) -> str | None:
+    """
+    Guess form type from the file name and its folders
+
+    :param name: path or name of the file
+    :return:
+        One of FORMS or None
+    """
+    name = str(name).upper()
+    if re.search(r"ФМУ[\s_-]?76", name):
+        return FORM_FMU76
+    if re.search(r"М[\s_-]?11", name):
+        return FORM_M11
+    return None
+
+
+def is_landscape(context: DocumentContext) -> bool:
+    """
+    Orientation of the first page from the PDF page box, the page is not rendered
+
+    :param context: opened document
+    :return:
+        True for landscape page
+    """
+    page = context.reader.pages[0]
+    width, height = float(page.mediabox.width), float(page.mediabox.height)
+    if int(page.get("/Rotate", 0)) % 180:
+        width, height = height, width
+    return width > height
+
+
+@timed("classify")
+def classify_document(
+    context: DocumentContext, name: str | None = None, use_ocr: bool = True
+) -> FormGuess:
+    """
+    Detect the form of the document with the cheapest available evidence:
+    markers in the text layer, markers in the OCR of the page corner,
+    page orientation (ФМУ-76 is landscape) checked against the file name.
+
+    :param context: opened document
+    :param name: path or name of the file, a hint for the orientation
+    :param use_ocr: recognize the page corner of scanned documents
+    :return:
+        Form guess
+    """
+    spans = context.spans(0)
+    if has_text_layer(spans):
+        guess = match_markers(" ".join(span.text for span in spans), "text")
+        if guess.form is not None:
+            return guess
+
+    if use_ocr:
+        gray = context.gray(0)
+        height, width = gray.shape
+        corner = gray[:int(HAT_HEIGHT * height), int(HAT_LEFT * width):]
+        guess = match_markers(extract_text(corner), "ocr")
+        if guess.form is not None:
+            return guess
+
+    layout = FORM_FMU76 if is_landscape(context) else FORM_M11
+    hint = guess_from_name(name) if name else None
+    if hint is None:
+        return FormGuess(layout, LAYOUT_CONFIDENCE, "layout")
+    if hint == layout:
+        return FormGuess(layout, LAYOUT_NAME_CONFIDENCE, "layout")
+    # scans may be rotated, the file name is trusted more
+    return FormGuess(hint, NAME_CONFIDENCE, "name")
@@ -1,108 +1,151 @@
 import logging
-import matplotlib.pyplot as plt
 import pandas as pd
-from pdf2image import convert_from_path
 import cv2
 import numpy as np
-from documents_parser.utils.extraction import extract_text
+from documents_parser import settings
+from documents_parser.utils.extraction import (
+    BLOCK_PROFILE, DIGITS, LINE_PROFILE, PSM_BLOCK, PSM_LINE, OcrProfile, extract_texts
+)
+from documents_parser.utils.lines import detect_lines, draw_lines
+from documents_parser.utils.document import DocumentContext, get_context
+from documents_parser.utils.profiling import profiled
+from documents_parser.utils.timing import timed
+from documents_parser.utils.templates import find_template, learn_template
+from documents_parser.utils.text_layer import (
+    Span, has_text_layer, find_span, right_of, in_box, join
+)
 from PIL import Image
 
 
 logger = logging.getLogger("dev")
 
+REPORT_FIELDS = [
+    "Тип формы",
+    "Номер акта",
+    "Дата акта",
+    "Организация",
+    "Структурное подразделение",
+    "Утверждено (должность)",
+    "Утверждено (ФИО)",
+    "Утверждено (дата)",
+    "Коды [Форма по ОКУД]",
+    "Коды [Форма по ОКПО]",
+    "Коды [Форма, БЕ]",
+    # "Материально ответственное лицо (должность)",
+    # "Материально ответственное лицо (ФИО)",
+    # "Направление расхода",
+    # "Инвентарный номер ремонтируемого основного средства",
+    # "Комиссия в составе",
+]
+# Part of the landscape page height with the header rules, with the committee lines
+HEADER_BAND = 0.4
+COMMITTEE_BAND = 0.65
+# Minimal length of the code, shorter digit groups are table borders and noise
+MIN_CODE_LENGTH = 4
+
 
 def line_detector(
-    page: Image, threshold: int = 200, min_line_length: int = 300,
-    save_line_image: bool = False
+    page: Image, min_line_length: int = 300,
+    save_line_image: bool = False, gray: np.ndarray | None = None,
+    top: int = 0
 ) -> list[list]:
     """
     Find horizontal lines on the pruned image.
 
     :param page: image
-    :param threshold: param in HoughLinesP
-    :param min_line_length: param in HoughLinesP
-    :param save_line_image: save figure with lines or not
+    :param min_line_length: minimal length of the line in pixels
+    :param save_line_image: save the page with lines to data/img.png or not
+    :param gray: precomputed grayscale map of the page
+    :param top: lines above this row are not searched
     :return:
         list of lines coordinates
     """
-
     logger.info("Detect lines")
-    page = cv2.cvtColor(np.array(page), cv2.COLOR_RGB2BGR)
-    gray = cv2.cvtColor(page, cv2.COLOR_BGR2GRAY)
-    blur = cv2.GaussianBlur(gray, (5, 5), 0)
-    edges = cv2.Canny(blur, 50, 50)
-    lines = cv2.HoughLinesP(
-        edges, 1, np.pi / 180,
-        threshold, minLineLength=min_line_length, maxLineGap=0
-    )
-
-    clear_lines = []
-    for line in lines:
-        x1, y1, x2, y2 = line[0]
-        angle = abs(y2 - y1) / abs(x2 - x1 + 0.001)
-        if angle < 0.1:
-            clear_lines.append([x1, y1, x2, y2])
-
-    sorted_lines = sorted(clear_lines, key=lambda x: x[1])
-    clear_lines = [sorted_lines[0]]
-    for i, line in enumerate(sorted_lines[1:], 1):
-        x1_1 = sorted_lines[i][0]
-        y1_1 = sorted_lines[i][1]
-        x1_2 = sorted_lines[i][2]
-        y1_2 = sorted_lines[i][3]
-        x2_1 = sorted_lines[i-1][0]
-        y2_1 = sorted_lines[i-1][1]
-        x2_2 = sorted_lines[i-1][2]
-        y2_2 = sorted_lines[i-1][3]
-
-        eps = 10
-        if (
-            ((abs(y1_1 - y2_1) < eps) or (abs(y1_2 - y2_2) < eps))
-                and
-            ((abs(x1_1 - x2_1) < eps) or (abs(x1_2 - x2_2) < eps))
-        ):
-            continue
-        clear_lines.append(line)
-
-    for line in clear_lines:
-        cv2.line(
-            page,
-            (line[0], line[1]),
-            (line[2], line[3]),
-            (255, 0, 0), 2
-        )
-
+    page = np.array(page)
+    if gray is None:
+        gray = cv2.cvtColor(page, cv2.COLOR_RGB2GRAY)
+    clear_lines = [
+        [x1, y1 + top, x2, y2 + top]
+        for x1, y1, x2, y2 in detect_lines(gray[top:], min_line_length)
+    ]
     if save_line_image:
-        plt.figure(figsize=(15, 20))
-        plt.imshow(page)
-        plt.savefig("data/img.png")
+        draw_lines(page, clear_lines, "data/img.png")
 
     return clear_lines
 
 
-def parse_hat(img: np.ndarray) -> str | None:
+def header_rois(
+    lines: list, do_committee: bool = False
+) -> dict[str, tuple[slice, slice]]:
     """
-    Extract text from hat of the file
+    Regions of the first page with header fields
 
-    :param img: image
+    :param lines: list of all lines
+    :param do_committee: add committee regions or not
     :return:
-        Extracted text
+        dict of field -> ROI as numpy slices
     """
-    hat = extract_text(img[0:70, 1600:])
-    return hat
+    up = lines[1][1]
+    x1, x2 = 1500, -200
+    rois = {
+        "hat": np.s_[0:70, 1600:],
+        "organisation": np.s_[lines[0][1] - 40:lines[0][3], lines[0][0]:lines[0][2]],
+        "department": np.s_[lines[0][1] + 20:up, lines[0][0]:lines[1][2]],
+        "leader": np.s_[up + 100:up + 150, x1 + 200:x2 - 150],
+        "name": np.s_[up + 150:up + 220, x1 + 300:x2 - 50],
+        "date": np.s_[up + 240:up + 270, x1 + 100:x2 - 100],
+        "act": np.s_[up + 140:up + 180, 1040:1300],
+        "codes": np.s_[70:up + 10, 1980:-180],
+    }
 
-
-def parse_codes(img: np.ndarray, down: int) -> dict:
+    if do_committee:
+        long_lines = [line for line in lines if abs(line[0] - line[2]) > 1300]
+        x1, y, x2, _ = long_lines[2]
+        rois["main_person_profession"] = np.s_[y - 50:y, x1:x1 + 285]
+        rois["main_person_name"] = np.s_[y - 50:y, x1 + 285:x2]
+        x1, y, x2, _ = long_lines[3]
+        rois["output"] = np.s_[y - 35:y, x1:x2]
+        rois["inn"] = np.s_[y + 2:y + 35, x1 + 315:x2]
+        x1, y, x2, _ = long_lines[4]
+        rois["committee"] = np.s_[y - 50:y, x1:x2]
+
+    return rois
+
+
+# OCR settings of the header regions. Number and date of the act and the codes
+# are digits only, `|` is allowed for the table borders in the act region
+FIELD_PROFILES = {
+    "hat": BLOCK_PROFILE,
+    "organisation": BLOCK_PROFILE,
+    "department": BLOCK_PROFILE,
+    "leader": LINE_PROFILE,
+    "name": BLOCK_PROFILE,
+    "date": LINE_PROFILE,
+    "act": OcrProfile(PSM_LINE, DIGITS + ".|"),
+    "codes": OcrProfile(PSM_BLOCK, DIGITS),
+    "main_person_profession": LINE_PROFILE,
+    "main_person_name": LINE_PROFILE,
+    "output": LINE_PROFILE,
+    "inn": LINE_PROFILE,
+    "committee": LINE_PROFILE,
+}
+
+
+@timed()
+def parse_codes(text: str) -> dict:
     """
-    Extract text from code block
+    Parse text from code block
 
-    :param img: image
-    :param down: below line level
+    :param text: text of `codes` region
     :return:
         dict with parsed code values
     """
-    codes = extract_text(img[70: down + 10, 1980:-180])
-    codes = codes.split()
+    codes = text.split()
+    if settings.OCR_FIELD_PROFILES:
+        # the digit whitelist of the region drops the labels, only the codes are left
+        numbers = [code for code in codes if code.isdigit() and len(code) >= MIN_CODE_LENGTH]
+        if len(numbers) == 3:
+            return dict(zip(("ОКУД", "ОКПО", "БЕ"), numbers))
     try:
         codes_dict = {
             "ОКУД": codes[1],
@@ -118,162 +161,172 @@ def parse_codes(img: np.ndarray, down: int) -> dict:
     return codes_dict
 
 
-def parse_committee(
-        img: np.ndarray, lines: list
-) -> (str, str, str, str, str):
-    """
-    Extract committee information from the image
-
-    :param img: image
-    :param lines: list of all lines
-    :return:
-        tuple with 4 main strings
-    """
-    x1, y, x2, _ = lines[2]
-    main_person_profession = extract_text(img[y - 50:y, x1:x1+285])
-    main_person_name = extract_text(img[y - 50:y, x1 + 285:x2])
-    x1, y, x2, _ = lines[3]
-    output = extract_text(img[y-35:y, x1:x2])
-    inn = extract_text(img[y+2:y+35, x1+315:x2])
-    x1, y, x2, _ = lines[4]
-    committee = extract_text(img[y-50:y, x1:x2])
-
-    return main_person_profession, main_person_name, output, inn, committee
-
-
-def parse_permission(img: np.ndarray, up: int) -> (str, str, str):
-    """
-    Extract permission data from the image
-
-    :param img: image
-    :param up: above line level
-    :return:
-        tuple with 3 main strings
-    """
-    x1 = 1500
-    x2 = -200
-    leader = extract_text(img[up+100:up+150, x1+200:x2-150])
-    name = extract_text(img[up+150:up+220, x1+300:x2-50])
-    date = extract_text(img[up+240:up+270, x1+100:x2-100])
-    return leader, name, date
-
-
-def parse_act(img: np.ndarray, up: int) -> (int, str):
+@timed()
+def parse_act(text: str) -> (str, str):
     """
-    Extract act information
+    Parse act information
 
-    :param img: image
-    :param up: above line level
+    :param text: text of `act` region
     :return:
         number of act, act date
     """
-    x1 = 1040
-    x2 = 1300
-    text = extract_text(img[up + 140:up + 180, x1:x2])
     text = text.replace("|", " ").replace("—", "")
     number, act_date = text.split()
     return number, act_date
 
 
-def parse_organisation(lines: list, img: np.ndarray) -> str:
+@timed()
+def parse_text_layer(spans: list[Span]) -> dict | None:
     """
-    Extract organisation information
+    Extract header fields from the embedded text layer by positions
 
-    :param lines: list of all lines
-    :param img: image
+    :param spans: spans of the first page
     :return:
-        Extracted text
+        dict with header fields or None if the layout is not recognized
     """
-    x1, y1, x2, y2 = lines[0]
-    y1 -= 40
-
-    organisation = extract_text(img[y1:y2, x1:x2])
-    return organisation
-
-
-def parse_department(lines: list, img: np.ndarray) -> (str, int):
+    hat = find_span(spans, "форма №")
+    act = find_span(spans, "АКТ")
+    okud_label = find_span(spans, "ОКУД")
+    okpo_label = find_span(spans, "по ОКПО")
+    be_label = find_span(spans, "БЕ")
+    leader_label = find_span(spans, "(руководитель)")
+    name_label = find_span(spans, "(расшифровка подписи)")
+    organisation_label = next((s for s in spans if s.text == "организация"), None)
+    department_label = next((s for s in spans if s.text == "структурное подразделение"), None)
+    if None in (
+        hat, act, okud_label, okpo_label, be_label, leader_label,
+        name_label, organisation_label, department_label
+    ):
+        return None
+    okud, okpo, be = right_of(spans, okud_label), right_of(spans, okpo_label), right_of(spans, be_label)
+    if not okud or not okpo or not be:
+        return None
+    try:
+        number, act_date = parse_act(join(
+            span for span in right_of(spans, act) if span.x1 < leader_label.x0
+        ))
+    except ValueError:
+        return None
+
+    # Approval block: position, name above its caption and date below it
+    name = [
+        span for span in in_box(spans, name_label.top - 25, name_label.top)
+        if span.x1 > name_label.x0 and span.x0 < name_label.x1
+        and span.text != "электронная подпись"
+    ]
+    leader = [
+        span for span in in_box(
+            spans, leader_label.top - 5, name_label.top, x0=leader_label.x0
+        )
+        if span not in name and not span.text.startswith("(")
+        and span.text != "электронная подпись"
+    ]
+    leader = [leader_label] + leader if leader_label.text != "(руководитель)" else leader
+    date = in_box(spans, name_label.bottom, name_label.bottom + 15, x0=leader_label.x0)
+
+    return {
+        "Тип формы": hat.text,
+        "Номер акта": number,
+        "Дата акта": act_date,
+        "Организация": join(
+            span for span in in_box(spans, organisation_label.top - 15, organisation_label.top)
+            if span.x1 > organisation_label.x0 and span.x0 < organisation_label.x1
+        ),
+        "Структурное подразделение": join(in_box(
+            spans, organisation_label.bottom, department_label.top, x1=okud_label.x0
+        )),
+        "Утверждено (должность)": join(leader).replace("(руководитель)", "").strip(),
+        "Утверждено (ФИО)": join(name),
+        "Утверждено (дата)": join(date),
+        "Коды [Форма по ОКУД]": okud[0].text,
+        "Коды [Форма по ОКПО]": okpo[0].text,
+        "Коды [Форма, БЕ]": be[0].text,
+    }
+
+
+def header_fields(texts: dict[str, str]) -> dict:
     """
-    Extract department data from the image
+    Parse header fields from the recognized regions
 
-    :param lines: list of all lines
-    :param img: image
+    :param texts: dict of region -> recognized text
     :return:
-        department, y level
+        dict with header fields
     """
-    x1 = lines[0][0]
-    y1 = lines[0][1] + 20
-    x2 = lines[1][2]
-    y2 = lines[1][1]
+    number, act_date = parse_act(texts["act"])
+    codes_dict = parse_codes(texts["codes"])
+    return {
+        "Тип формы": texts["hat"],
+        "Номер акта": number,
+        "Дата акта": act_date,
+        "Организация": texts["organisation"],
+        "Структурное подразделение": texts["department"],
+        "Утверждено (должность)": texts["leader"],
+        "Утверждено (ФИО)": texts["name"],
+        "Утверждено (дата)": texts["date"],
+        "Коды [Форма по ОКУД]": codes_dict["ОКУД"],
+        "Коды [Форма по ОКПО]": codes_dict["ОКПО"],
+        "Коды [Форма, БЕ]": codes_dict["БЕ"],
+    }
+
+
+def create_report(fields: dict) -> pd.DataFrame:
+    """
+    Create report from the parsed fields
 
-    structure_department = extract_text(img[y1:y2, x1:x2])
-    return structure_department, y2
+    :param fields: dict with parsed fields
+    :return:
+        Report with `Значение` column
+    """
+    report = pd.DataFrame({
+        field: [fields.get(field)] for field in REPORT_FIELDS
+    }).T.rename({0: "Значение"}, axis=1)
+    return report
 
 
+@profiled
+@timed()
 def ocr_fmu76(
-    pdf_path: str | None = None, do_committee: bool = False
+    pdf_path: str | None = None, do_committee: bool = False,
+    context: DocumentContext | None = None
 ) -> pd.DataFrame:
     """
     Convert pdf file of `ФМУ-76` form to string variable.
+    Digital files are parsed from the embedded text layer,
+    OCR runs only for scanned files.
 
     :param pdf_path: str, path to pdf file.
     :param do_committee: bool, parse committee or not
+    :param context: opened document, shared with the table extraction
     :return:
         All text from file in pdf-pages.
     """
 
     # Read file
-    if pdf_path is None:
-        raise ValueError("OCR should work with correct file path.")
+    context = get_context(pdf_path, context)
 
-    logger.info("Convert PDF file to image.")
-    pages = convert_from_path(pdf_path)
-    logger.info("Converting PDF file to image finished.")
+    spans = context.spans(0)
+    if has_text_layer(spans):
+        fields = parse_text_layer(spans)
+        if fields is not None:
+            logger.info("Parsing text layer.")
+            return create_report(fields)
 
     # Process first page
-    page = pages[0]
+    page = context.page(0)
     img = np.array(page)
-    lines = line_detector(page)
+    gray = context.gray(0)
+    band = COMMITTEE_BAND if do_committee else HEADER_BAND
+    probe, template = find_template(gray, "ФМУ-76", band, do_committee=do_committee)
+    if template is None:
+        # header rules are found by the fingerprint, only the rest of the page is searched
+        lines = line_detector(page, gray=gray, top=probe.bottom if probe else 0)
+        rois = header_rois(probe.lines + lines if probe else lines, do_committee)
+        learn_template(probe, rois)
+    else:
+        logger.info("Header layout is taken from the template")
+        rois = template.rois(gray.shape)
 
     # Parsing
-    logger.info("1. Parsing hat")
-    hat = parse_hat(img)
-    logger.info("2. Parsing organisation")
-    organisation = parse_organisation(lines, img)
-    logger.info("3. Parsing department")
-    department, codes_y_down = parse_department(lines, img)
-    logger.info("4. Parsing permission")
-    leader, name, date = parse_permission(img, codes_y_down)
-    logger.info("5. Parsing act")
-    number, act_date = parse_act(img, codes_y_down)
-    logger.info("6. Parsing codes")
-    codes_dict = parse_codes(img, codes_y_down)
-
-    if do_committee:
-        logger.info("7. Parsing committee")
-        long_lines = []
-        for line in lines:
-            if abs(line[0] - line[2]) > 1300:
-                long_lines.append(line)
-        main_person_profession, main_person_name, output, inn, committee = parse_committee(img, long_lines)
-
-    # Create report
-    report = pd.DataFrame({
-        "Тип формы": [hat],
-        "Номер акта": [number],
-        "Дата акта": [act_date],
-        "Организация": [organisation],
-        "Структурное подразделение": [department],
-        "Утверждено (должность)": [leader],
-        "Утверждено (ФИО)": [name],
-        "Утверждено (дата)": [date],
-        "Коды [Форма по ОКУД]": [codes_dict["ОКУД"]],
-        "Коды [Форма по ОКПО]": [codes_dict["ОКПО"]],
-        "Коды [Форма, БЕ]": [codes_dict["БЕ"]],
-        # "Материально ответственное лицо (должность)": [main_person_profession],
-        # "Материально ответственное лицо (ФИО)": [main_person_name],
-        # "Направление расхода": [output],
-        # "Инвентарный номер ремонтируемого основного средства": [inn],
-        # "Комиссия в составе": [committee],
-    }).T.rename({0: "Значение"}, axis=1)
-
-    return report
+    logger.info("Parsing header fields")
+    texts = extract_texts(img, rois, FIELD_PROFILES if settings.OCR_FIELD_PROFILES else None)
+    return create_report(header_fields(texts))
@@ -1,86 +1,86 @@
 import logging
-import matplotlib.pyplot as plt
 import pandas as pd
-import pytesseract
-from pdf2image import convert_from_path
 import cv2
 import numpy as np
-from documents_parser.utils.extraction import extract_text
+from typing import Iterable
+from documents_parser import settings
+from documents_parser.utils.extraction import BLOCK_PROFILE, LINE_PROFILE, extract_texts
+from documents_parser.utils.lines import detect_lines, draw_lines
+from documents_parser.utils.parallel import ocr_pages
+from documents_parser.utils.profiling import profiled
+from documents_parser.utils.templates import find_template, learn_template
+from documents_parser.utils.document import DocumentContext, get_context
+from documents_parser.utils.timing import timed
+from documents_parser.utils.text_layer import (
+    Span, has_text_layer, find_span, right_of, in_box, join
+)
 from PIL import Image
 
 logger = logging.getLogger("dev")
 
+# Document references at the end of the document
+TRAILER_FIELDS = [
+    "Документа сбыта",
+    "Документа материала",
+    "Бухгалтерский документ",
+]
+# Part of the page width where the references are printed
+TRAILER_WIDTH = 0.4
+
+REPORT_FIELDS = [
+    "Тип формы",
+    "Требование-накладная",
+    "Организация",
+    "Структурное подразделение",
+    "Коды [Форма по ОКУД]",
+    "Коды [Форма по ОКПО]",
+    "Коды [Форма, 3 поле]",
+    "Через кого",
+    "Затребовал",
+    "Разрешил",
+    "Документа сбыта",
+    "Документа материала",
+    "Бухгалтерский документ",
+]
+# Minimal length of the code, shorter digit groups are table borders and noise
+MIN_CODE_LENGTH = 4
+
 
 def line_detector(
-    page: Image, threshold: int = 200,
-    save_line_image: bool = False
+    page: Image, min_line_length: int = 300,
+    save_line_image: bool = False, gray: np.ndarray | None = None,
+    top: int = 0
 ) -> (list[list], dict):
     """
     Find horizontal lines on the pruned image.
 
     :param page: image
-    :param threshold: param in HoughLinesP
-    :param save_line_image: save figure with lines or not
+    :param min_line_length: minimal length of the line in pixels
+    :param save_line_image: save the page with lines to data/img.png or not
+    :param gray: precomputed grayscale map of the page
+    :param top: lines above this row are not searched
     :return:
         list of lines coordinates, dict with lines info
     """
     logger.info("Detect lines")
-    page = cv2.cvtColor(np.array(page), cv2.COLOR_RGB2BGR)
-    gray = cv2.cvtColor(page, cv2.COLOR_BGR2GRAY)
-    blur = cv2.GaussianBlur(gray, (5, 5), 0)
-    edges = cv2.Canny(blur, 50, 50)
-    lines = cv2.HoughLinesP(
-        edges, 1, np.pi / 180,
-        threshold, minLineLength=300, maxLineGap=0
-    )
-
-    clear_lines = []
-    for line in lines:
-        x1, y1, x2, y2 = line[0]
-        angle = abs(y2 - y1) / abs(x2 - x1 + 0.001)
-        if angle < 0.1:
-            clear_lines.append([x1, y1, x2, y2])
-
-    sorted_lines = sorted(clear_lines, key=lambda x: x[1])
-    clear_lines = [sorted_lines[0]]
-    for i, line in enumerate(sorted_lines[1:], 1):
-        x1_1 = sorted_lines[i][0]
-        y1_1 = sorted_lines[i][1]
-        x1_2 = sorted_lines[i][2]
-        y1_2 = sorted_lines[i][3]
-        x2_1 = sorted_lines[i-1][0]
-        y2_1 = sorted_lines[i-1][1]
-        x2_2 = sorted_lines[i-1][2]
-        y2_2 = sorted_lines[i-1][3]
-
-        eps = 10
-        if (
-            ((abs(y1_1 - y2_1) < eps) or (abs(y1_2 - y2_2) < eps))
-                and
-            ((abs(x1_1 - x2_1) < eps) or (abs(x1_2 - x2_2) < eps))
-        ):
-            continue
-        clear_lines.append(line)
-
-    for line in clear_lines:
-        cv2.line(
-            page,
-            (line[0], line[1]),
-            (line[2], line[3]),
-            (255, 0, 0), 2
-        )
-
-    plt.figure(figsize=(15, 20))
-
+    page = np.array(page)
+    if gray is None:
+        gray = cv2.cvtColor(page, cv2.COLOR_RGB2GRAY)
+    clear_lines = [
+        [x1, y1 + top, x2, y2 + top]
+        for x1, y1, x2, y2 in detect_lines(gray[top:], min_line_length)
+    ]
     if save_line_image:
-        plt.imshow(page)
-        plt.savefig("data/img.png")
+        draw_lines(page, clear_lines, "data/img.png")
 
-    img = np.array(page)
+    labels = extract_texts(page, {
+        str(i): np.s_[line[1]-50:line[1], 0:line[0]]
+        for i, line in enumerate(clear_lines)
+    })
     info = {}
-    for line in clear_lines:
+    for i, line in enumerate(clear_lines):
         x1, y1, x2, y2 = line
-        text = extract_text(img[y1-50:y1, 0:x1])
+        text = labels[str(i)]
         if (info.get("Через") is None) and ("Через" in text):
             info["Через кого"] = (x1, y1, x2, y2)
         if (info.get("Затребовал") is None) and ("Затребовал" in text):
@@ -93,44 +93,91 @@ def line_detector(
     return clear_lines, info
 
 
-def parse_hat(img: np.ndarray) -> str | None:
+def header_rois(lines: list, info: dict) -> dict[str, tuple[slice, slice]]:
     """
-    Extract text from hat of the file
+    Regions of the first page with header fields
 
-    :param img: image
+    :param lines: list with all lines
+    :param info: dict with lines
     :return:
-        Extracted text
+        dict of field -> ROI as numpy slices
     """
-    hat = extract_text(img[30:170, 1000:1600])
-    return hat
+    codes_y_up = 210
+    codes_y_down = lines[1][1]
+    rois = {
+        "hat": np.s_[30:170, 1000:1600],
+        "number": np.s_[150:codes_y_up, 400:1200],
+        "organisation": np.s_[lines[0][1] - 40:lines[0][3], lines[0][0]:lines[0][2]],
+        "department": np.s_[lines[0][1]:codes_y_down, lines[0][0]:lines[1][2]],
+        "codes": np.s_[codes_y_up:codes_y_down, -390:-100],
+    }
+    rois.update(signature_rois(info))
+    return rois
+
 
+# OCR settings of the header regions. The codes are not limited to digits:
+# the region includes ОКУД and ОКПО labels, they would be read as digits
+FIELD_PROFILES = {
+    "hat": BLOCK_PROFILE,
+    "number": LINE_PROFILE,
+    "organisation": BLOCK_PROFILE,
+    "department": BLOCK_PROFILE,
+    "codes": BLOCK_PROFILE,
+    "via_who": BLOCK_PROFILE,
+    "who_get": BLOCK_PROFILE,
+    "who_get_permission": BLOCK_PROFILE,
+}
 
-def parse_number(img: np.ndarray) -> (str, int):
+
+def signature_rois(info: dict) -> dict[str, tuple[slice, slice]]:
+    """
+    Regions of the first page with signatures, found by the labels of the lines
+
+    :param info: dict with lines
+    :return:
+        dict of field -> ROI as numpy slices
+    """
+    rois = {}
+    if info.get("Через кого") is not None:
+        y1 = info["Через кого"][1]
+        rois["via_who"] = np.s_[y1 - 70:y1, 0:]
+    if info.get("Затребовал") is not None:
+        y1 = info["Затребовал"][1]
+        rois["who_get"] = np.s_[y1 - 100:y1, 100:800]
+    if info.get("Разрешил") is not None:
+        y1 = info["Разрешил"][1]
+        rois["who_get_permission"] = np.s_[y1 - 100:y1, -800:]
+    return rois
+
+
+@timed()
+def parse_number(text: str) -> str:
     """
     Parse number of file
 
-    :param img: image
+    :param text: text of `number` region
     :return:
-        Extracted number, y level
+        Extracted number
     """
-    y = 210
-    text = extract_text(img[150:y, 400:1200])
     number = (text.split("№")[1].strip())
-    return number, y
+    return number
 
 
-def parse_codes(up: int, down: int, img: np.ndarray) -> dict:
+@timed()
+def parse_codes(text: str) -> dict:
     """
     Parse tables with codes
 
-    :param up: above line
-    :param down: below line
-    :param img: image
+    :param text: text of `codes` region
     :return:
         dict with codes
     """
-    codes = extract_text(img[up: down, -390:-100])
-    codes = codes.split()
+    codes = text.split()
+    if settings.OCR_FIELD_PROFILES:
+        # the block mode reads the labels in another order, the codes are found by their shape
+        numbers = [code for code in codes if code.isdigit() and len(code) >= MIN_CODE_LENGTH]
+        if len(numbers) == 3:
+            return dict(zip(("ОКУД", "ОКПО", "№"), numbers))
     codes_dict = {
         "ОКУД": codes[1],
         "ОКПО": codes[3],
@@ -139,164 +186,264 @@ def parse_codes(up: int, down: int, img: np.ndarray) -> dict:
     return codes_dict
 
 
-def parse_organisation(lines: list, img: np.ndarray) -> str:
+@timed()
+def parse_via_who(text: str | None) -> str | None:
     """
-    Extract organisation from image
+    Extract `via whom` data.
 
-    :param lines: list with all lines
-    :param img: image
+    :param text: text of `via_who` region or None
     :return:
-        Extracted text
+        Extracted text or None
     """
-    x1, y1, x2, y2 = lines[0]
-    y1 -= 40
-
-    organisation = extract_text(img[y1:y2, x1:x2])
-    return organisation
+    if text is None:
+        return None
+    via_who = text.replace("Через кого", "").replace("  ", " ").strip()
+    return via_who
 
 
-def parse_department(lines: list, img: np.ndarray) -> (str, int):
+@timed()
+def parse_who_get(text: str | None) -> str | None:
     """
-    Extract department from image
+    Extract `who get` data.
 
-    :param lines: list with all lines
-    :param img: image
+    :param text: text of `who_get` region or None
     :return:
-        Extracted department, y level
+        Extracted text or None
     """
-    x1 = lines[0][0]
-    y1 = lines[0][1]
-    x2 = lines[1][2]
-    y2 = lines[1][1]
-
-    structure_department = extract_text(img[y1:y2, x1:x2])
-    return structure_department, y2
+    if text is None:
+        return None
+    who = text.replace("Затребовал", "").replace("  ", " ").strip()
+    if not len(who):
+        return None
+    return who
 
 
-def parse_via_who(img: np.ndarray, info: dict) -> str | None:
+@timed()
+def parse_who_get_permission(text: str | None) -> str | None:
     """
-    Extract `via whom` data.
+    Extract `who get permission` data.
 
-    :param img: image
-    :param info: dict with lines
+    :param text: text of `who_get_permission` region or None
     :return:
         Extracted text or None
     """
-    if info.get("Через кого") is None:
+    if text is None:
         return None
-    x1, y1, x2, y2 = info.get("Через кого")
-    via_who = extract_text(img[y1-70:y1, 0:])
-    via_who = via_who.replace("Через кого", "").replace("  ", " ").strip()
-    return via_who
+    who = text.replace("Разрешил", "").replace("  ", " ").strip()
+    return who
 
 
-def parse_who_get(img: np.ndarray, info: dict) -> str | None:
+@timed()
+def parse_trailer(lines: Iterable[str]) -> dict:
     """
-    Extract `who get` data.
+    Find document references in the text of the whole document
 
-    :param img: image
-    :param info: dict with lines
+    :param lines: lines of the document text
     :return:
-        Extracted text or None
+        dict with found references
+    """
+    doc_info = {}
+    for line in lines:
+        for field in TRAILER_FIELDS:
+            if field in line:
+                doc_info[field] = line.split(":")[1].strip()
+    return doc_info
+
+
+@timed()
+def ocr_trailer(context: DocumentContext, workers: int | None = None) -> dict:
+    """
+    Find document references with OCR. The references are printed
+    in the left part of the page after the tables, so pages are scanned
+    from the end and only in that part. Full pages are scanned
+    only if nothing is found there.
+
+    :param context: opened document
+    :param workers: number of processes for page OCR, None for the setting
+    :return:
+        dict with found references
+    """
+    doc_info = {}
+    for text in ocr_pages(context, width=TRAILER_WIDTH, reverse=True, workers=workers):
+        found = parse_trailer(text.split("\n"))
+        if doc_info and not found:
+            # The block with references is over
+            break
+        doc_info = {**found, **doc_info}
+        if len(doc_info) == len(TRAILER_FIELDS):
+            break
+
+    if not doc_info:
+        logger.info("References are not found, scan full pages")
+        text = "".join(ocr_pages(context, workers=workers))
+        doc_info = parse_trailer(text.split("\n"))
+    return doc_info
+
+
+@timed()
+def parse_text_layer(spans: list[Span]) -> dict | None:
+    """
+    Extract header fields from the embedded text layer by positions
+
+    :param spans: spans of the first page
+    :return:
+        dict with header fields or None if the layout is not recognized
     """
-    if info.get("Затребовал") is None:
+    title = find_span(spans, "НАКЛАДНАЯ")
+    organisation_label = find_span(spans, "Организация")
+    okud_label = find_span(spans, "ОКУД")
+    okpo_label = find_span(spans, "по ОКПО")
+    table = find_span(spans, "Отправитель")
+    if None in (title, organisation_label, okud_label, okpo_label, table):
         return None
-    x1, y1, x2, y2 = info.get("Затребовал")
-    who = extract_text(img[y1-100:y1, 100:800])
-    who = who.replace("Затребовал", "").replace("  ", " ").strip()
-    if not len(who):
+    okud = right_of(spans, okud_label)
+    okpo = right_of(spans, okpo_label)
+    if not okud or not okpo:
         return None
-    return who
+    try:
+        number = parse_number(join([title] + right_of(spans, title)))
+    except IndexError:
+        return None
+    codes_x = okud[0].x0 - 10
+    third_code = in_box(spans, okpo[0].bottom, table.top, x0=codes_x)
 
+    department = [
+        span for span in in_box(
+            spans, organisation_label.bottom, table.top,
+            x0=organisation_label.x1, x1=codes_x
+        )
+        if span.text not in ("Структурное", "подразделение")
+    ]
+
+    via_who = find_span(spans, "Через кого")
+    if via_who is not None:
+        via_who = join([via_who] + right_of(spans, via_who))
+
+    # Signatures may span several lines around the labels row
+    who_get, who_get_permission = None, None
+    who_get_label = find_span(spans, "Затребовал")
+    if who_get_label is not None:
+        permission_label = find_span(spans, "Разрешил")
+        if permission_label is None:
+            split_x = max(span.x1 for span in spans) / 2
+        elif permission_label is who_get_label:
+            # Both labels are merged into one line
+            split_x = permission_label.x1
+        else:
+            split_x = permission_label.x0
+        window = in_box(
+            spans, who_get_label.top - 30, who_get_label.bottom + 15
+        )
+        window = [span for span in window if span.top > table.bottom]
+        who_get = join(span for span in window if span.x0 < split_x).split("Разрешил")[0]
+        who_get_permission = join(span for span in window if span.x0 >= split_x - 1)
+
+    return {
+        "Тип формы": join(in_box(spans, 0, title.top)),
+        "Требование-накладная": number,
+        "Организация": join(
+            span for span in right_of(spans, organisation_label)
+            if span.x1 <= okpo_label.x0
+        ),
+        "Структурное подразделение": join(department),
+        "Коды [Форма по ОКУД]": okud[0].text,
+        "Коды [Форма по ОКПО]": okpo[0].text,
+        "Коды [Форма, 3 поле]": third_code[0].text if third_code else None,
+        "Через кого": parse_via_who(via_who),
+        "Затребовал": parse_who_get(who_get),
+        "Разрешил": parse_who_get_permission(who_get_permission),
+    }
 
-def parse_who_get_permission(img: np.ndarray, info: dict) -> str | None:
+
+def header_fields(texts: dict[str, str]) -> dict:
     """
-    Extract `who get permission` data.
+    Parse header fields from the recognized regions
 
-    :param img: image
-    :param info: dict with lines
+    :param texts: dict of region -> recognized text
     :return:
-        Extracted text or None
+        dict with header fields
     """
-    if info.get("Разрешил") is None:
-        return None
-    x1, y1, x2, y2 = info.get("Разрешил")
-    who = extract_text(img[y1 - 100:y1, -800:])
-    who = who.replace("Разрешил", "").replace("  ", " ").strip()
-    return who
+    codes_dict = parse_codes(texts["codes"])
+    return {
+        "Тип формы": texts["hat"],
+        "Требование-накладная": parse_number(texts["number"]),
+        "Организация": texts["organisation"],
+        "Структурное подразделение": texts["department"],
+        "Коды [Форма по ОКУД]": codes_dict["ОКУД"],
+        "Коды [Форма по ОКПО]": codes_dict["ОКПО"],
+        "Коды [Форма, 3 поле]": codes_dict["№"],
+        "Через кого": parse_via_who(texts.get("via_who")),
+        "Затребовал": parse_who_get(texts.get("who_get")),
+        "Разрешил": parse_who_get_permission(texts.get("who_get_permission")),
+    }
 
 
-def ocr_m11(pdf_path: str | None = None) -> pd.DataFrame:
+def create_report(fields: dict) -> pd.DataFrame:
+    """
+    Create report from the parsed fields
+
+    :param fields: dict with parsed fields
+    :return:
+        Report with `Значение` column
+    """
+    report = pd.DataFrame({
+        field: [fields.get(field)] for field in REPORT_FIELDS
+    }).T.rename({0: "Значение"}, axis=1)
+    return report
+
+
+@profiled
+@timed()
+def ocr_m11(
+    pdf_path: str | None = None, context: DocumentContext | None = None,
+    workers: int | None = None
+) -> pd.DataFrame:
     """
     Convert pdf file of `M-11` form to string variable.
+    Digital files are parsed from the embedded text layer,
+    OCR runs only for scanned files.
 
     :param pdf_path: str, path to pdf file.
+    :param context: opened document, shared with the table extraction
+    :param workers: number of processes for page OCR, None for the setting
     :return:
         All text from file in pdf-pages.
     """
 
     # Read file
-    if pdf_path is None:
-        raise ValueError("OCR should work with correct file path.")
+    context = get_context(pdf_path, context)
 
-    logger.info("Convert PDF file to image.")
-    pages = convert_from_path(pdf_path)
-    logger.info("Converting PDF file to image finished.")
+    spans = context.spans(0)
+    if has_text_layer(spans):
+        fields = parse_text_layer(spans)
+        if fields is not None:
+            logger.info("Parsing text layer.")
+            fields.update(parse_trailer(context.text_lines()))
+            return create_report(fields)
 
     # Extract first page
-    page = pages[0]
+    page = context.page(0)
     img = np.array(page)
-    lines, info = line_detector(page)
+    gray = context.gray(0)
+    # header rules are found by the fingerprint, the rest of the page
+    # is searched for the signature lines
+    probe, template = find_template(gray, "М-11")
+    lines, info = line_detector(page, gray=gray, top=probe.bottom if probe else 0)
+    if template is None:
+        rois = header_rois(probe.lines + lines if probe else lines, {})
+        learn_template(probe, rois)
+    else:
+        logger.info("Header layout is taken from the template")
+        rois = template.rois(gray.shape)
+    rois.update(signature_rois(info))
 
     # Parsing functions
-    logger.info("1. Parsing hat")
-    hat = parse_hat(img)
-    logger.info("2. Parsing number")
-    number, codes_y_up = parse_number(img)
-    logger.info("3. Parsing organisation")
-    organisation = parse_organisation(lines, img)
-    logger.info("4. Parsing department")
-    department, codes_y_down = parse_department(lines, img)
-    logger.info("5. Parsing codes")
-    codes_dict = parse_codes(codes_y_up, codes_y_down, img)
-    logger.info("6. Parsing via who")
-    via_who = parse_via_who(img, info)
-    logger.info("7. Parsing who get")
-    who_get = parse_who_get(img, info)
-    logger.info("8. Parsing who get permission")
-    who_get_permission = parse_who_get_permission(img, info)
-
-    # Extract text from all pages
-    text = ""
-    for page in pages:
-        img = np.array(page)
-        text += pytesseract.image_to_string(img, lang='rus')
-
-    # Find additional statistics from all text
-    doc_info = {}
-    for line in text.split("\n"):
-        if "Документа сбыта" in line:
-            doc_info["Документа сбыта"] = line.split(":")[1].strip()
-        if "Документа материала" in line:
-            doc_info["Документа материала"] = line.split(":")[1].strip()
-        if "Бухгалтерский документ" in line:
-            doc_info["Бухгалтерский документ"] = line.split(":")[1].strip()
-
-    # Create report
-    report = pd.DataFrame({
-        "Тип формы": [hat],
-        "Требование-накладная": [number],
-        "Организация": [organisation],
-        "Структурное подразделение": [department],
-        "Коды [Форма по ОКУД]": [codes_dict["ОКУД"]],
-        "Коды [Форма по ОКПО]": [codes_dict["ОКПО"]],
-        "Коды [Форма, 3 поле]": [codes_dict["№"]],
-        "Через кого": [via_who],
-        "Затребовал": [who_get],
-        "Разрешил": [who_get_permission],
-        "Документа сбыта": [doc_info.get("Документа сбыта")],
-        "Документа материала": [doc_info.get("Документа материала")],
-        "Бухгалтерский документ": [doc_info.get("Бухгалтерский документ")],
-    }).T.rename({0: "Значение"}, axis=1)
+    logger.info("Parsing header fields")
+    texts = extract_texts(img, rois, FIELD_PROFILES if settings.OCR_FIELD_PROFILES else None)
+    fields = header_fields(texts)
 
-    return report
+    # Find additional statistics from the end of the document
+    logger.info("Parsing document references")
+    fields.update(ocr_trailer(context, workers))
+
+    return create_report(fields)
@@ -1,9 +1,32 @@
 import camelot
+from camelot.backends.ghostscript_backend import GhostscriptBackend
+import cv2
+import numpy as np
 import pandas as pd
+from pandas.api.types import is_object_dtype, is_string_dtype
 import logging
 import os
+from PyPDF2 import PdfReader
+from functools import partial
+from documents_parser import settings
+from documents_parser.utils.document import RASTER_DPI, DocumentContext, get_context
+from documents_parser.utils.lines import LINE_SCALE, detect_grids
+from documents_parser.utils.parallel import get_pool, get_workers
+from documents_parser.utils.profiling import profiled
+from documents_parser.utils.timing import stage, timed
 
-logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("dev")
+
+# Margin around the found tables passed to camelot, in page pixels
+REGION_PADDING = 10
+# pdfminer layout of the scoped mode: camelot reads text lines,
+# grouping of text boxes into the reading order is not needed
+SCOPED_LAYOUT = {"boxes_flow": None}
+# Resolution of the page images passed to camelot, the lattice parameters are set for it,
+# the pages kept in the context are rendered at it
+LATTICE_RESOLUTION = RASTER_DPI
+# Rows with the column names and numbers repeated at the top of the table on every page
+HEADER_ROWS = 3
 
 columns_table1_m11 = ['Дата составления','Код вида операции','Отправитель (структурное подразделение)',
          'Отправитель (табельный номер МОЛ (ЛОС))','Получатель (структурное подразделение)','Получатель (табельный номер МОЛ (ЛОС))',
@@ -28,39 +51,187 @@ columns_table2_fmu76 = ['Технический счет 32 "Затраты"', '
                       'Регистрационный номерпартии товара,подлежащего прослеживаемости']
 
 
-def table_ocr_m11(path: str | None) -> list[pd.DataFrame, pd.DataFrame]:
+class ContextBackend:
+    """
+    Camelot image conversion backend which passes the pages
+    already rendered with the context instead of running
+    Ghostscript on the pages split by camelot
+    """
+
+    def __init__(
+        self, context: DocumentContext, images: dict[int, np.ndarray],
+        resolution: int = LATTICE_RESOLUTION
+    ):
+        """
+        Initialize the backend
+
+        :param context: opened document
+        :param images: zero-based page number -> RGB page rendered at the resolution
+        :param resolution: resolution of the images, the one of the camelot lattice
+        """
+        self.context = context
+        self.images = images
+        self.resolution = resolution
+        self.fallback = GhostscriptBackend()
+
+    def convert(self, pdf_path: str, png_path: str) -> None:
+        """
+        Write page image for camelot
+
+        :param pdf_path: single page pdf created by camelot (`page-N.pdf`)
+        :param png_path: path to the output image
+        :return:
+            None
+        """
+        index = int(os.path.basename(pdf_path)[len("page-"):-len(".pdf")]) - 1
+        rotation = int(PdfReader(pdf_path).pages[0].get("/Rotate", 0))
+        page_rotation = int(self.context.reader.pages[index].get("/Rotate", 0))
+        if rotation % 180 != page_rotation % 180:
+            # camelot has rotated the page by /Rotate, render it as is
+            with stage("ghostscript"):
+                self.fallback.convert(pdf_path, png_path, self.resolution)
+            return
+        cv2.imwrite(png_path, cv2.cvtColor(self.images[index], cv2.COLOR_RGB2BGR))
+
+
+@timed("table_regions")
+def find_table_regions(image: np.ndarray, line_scale: int = LINE_SCALE) -> list[tuple[int, int, int, int]]:
+    """
+    Cheap first pass over the rendered page: find tables ruled in black.
+    Pages without them are not passed to camelot, the stamp
+    of electronic signatures is blue and is not a region.
+
+    :param image: RGB page
+    :param line_scale: rules are longer than the page size divided by this
+    :return:
+        list of table boxes (x, y, width, height) with a margin, in page pixels
+    """
+    return [
+        (max(x - REGION_PADDING, 0), max(y - REGION_PADDING, 0), w + 2 * REGION_PADDING, h + 2 * REGION_PADDING)
+        for x, y, w, h in detect_grids(image, line_scale)
+    ]
+
+
+def mask_regions(image: np.ndarray, boxes: list[tuple[int, int, int, int]]) -> np.ndarray:
+    """
+    Blank the page out of the table regions
+
+    :param image: RGB page
+    :param boxes: table boxes (x, y, width, height) in page pixels
+    :return:
+        RGB page with the regions only
+    """
+    masked = np.full_like(image, 255)
+    for x, y, w, h in boxes:
+        masked[y:y + h, x:x + w] = image[y:y + h, x:x + w]
+    return masked
+
+
+def read_page_tables(
+    pdf_path: str | None, index: int, scoped: bool = False,
+    line_scale: int = LINE_SCALE, context: DocumentContext | None = None
+) -> list[pd.DataFrame]:
+    """
+    Extract tables of a single page, also in pool workers.
+    The page is rendered at the lattice resolution unless the context
+    keeps it, the table regions are found on the same image camelot gets.
+
+    :param pdf_path: path to pdf file
+    :param index: zero-based page number
+    :param scoped: process only the found table regions
+    :param line_scale: camelot line scale
+    :param context: opened document
+    :return:
+        list of tables
+    """
+    context = get_context(pdf_path, context)
+    image = context.image(index, LATTICE_RESOLUTION)
+    if scoped:
+        boxes = find_table_regions(image, line_scale)
+        if not boxes:
+            return []
+        # lines out of the regions are not found, so are not the tables there
+        image = mask_regions(image, boxes)
+    tables = camelot.read_pdf(
+        context.pdf_path, pages=str(index + 1), backend=ContextBackend(context, {index: image}),
+        line_scale=line_scale, resolution=LATTICE_RESOLUTION, layout_kwargs=SCOPED_LAYOUT if scoped else {}
+    )
+    return [tabl.df for tabl in tables]
+
+
+@timed("camelot")
+def read_tables(
+    context: DocumentContext, workers: int | None = None,
+    scoped: bool | None = None, line_scale: int = LINE_SCALE
+) -> list[pd.DataFrame]:
+    """
+    Extract tables of the document with camelot page by page.
+    In the scoped mode only the pages and regions with the tables
+    ruled in black are processed, so the stamp of electronic
+    signatures is not extracted.
+    With several workers pages are rendered and processed in the process pool,
+    the pages kept in the context are processed here and are not rendered again.
+
+    :param context: opened document
+    :param workers: number of processes, None for the setting
+    :param scoped: process only the found table regions, None for the setting
+    :param line_scale: camelot line scale
+    :return:
+        list of tables in page order
+    """
+    scoped = settings.TABLES_SCOPED if scoped is None else scoped
+    indexes = list(range(context.page_count))
+    if get_workers(workers) <= 1 or len(indexes) <= 1:
+        tables = [read_page_tables(None, index, scoped, line_scale, context) for index in indexes]
+        return [table for page_tables in tables for table in page_tables]
+
+    pending = [index for index in indexes if not context.kept(index)]
+    # the pool starts on the rest of the pages before the kept ones are processed here
+    results = get_pool(get_workers(workers)).map(
+        partial(read_page_tables, context.pdf_path, scoped=scoped, line_scale=line_scale), pending
+    )
+    tables = {
+        index: read_page_tables(None, index, scoped, line_scale, context)
+        for index in indexes if context.kept(index)
+    }
+    tables.update(zip(pending, results))
+    return [table for index in indexes for table in tables[index]]
+
+
+@profiled
+@timed()
+def table_ocr_m11(
+    path: str | None, context: DocumentContext | None = None,
+    workers: int | None = None, scoped: bool | None = None
+) -> list[pd.DataFrame, pd.DataFrame]:
     """
     Obtaining and correcting tables in the M-11 file
 
     :param path: file path
+    :param context: opened document, shared with the header parser
+    :param workers: number of processes for page extraction, None for the setting
+    :param scoped: extract only the regions of the tables, None for the setting
     :return:
         list from a table in DataFrame format
     """
+    if context is not None:
+        path = context.pdf_path
     if path is None:
-        logging.critical('Неверный путь')
+        logger.critical('Неверный путь')
         return []
     if os.path.split(path)[1].split('.')[-1] != 'pdf':
-        logging.critical('Неверный тип файла')
+        logger.critical('Неверный тип файла')
         return []
 
-    tables = camelot.read_pdf(path,pages='all',)
-    tables = tables[1:-1]
-    tables = [tabl.df for tabl in tables]
-
-    index = 1
-    while index < len(tables):
-        if tables[index-1].shape[1] == tables[index].shape[1]:
-            tab = tables[index].iloc[3:]
-            if len(tab.iloc[0, 0]) == 0:
-                line2 = tab.iloc[0,:]
-                for i, val in enumerate(line2):
-                    tables[index - 1].iloc[-1,i] += str(val)
-                tables[index - 1] = pd.concat([tables[index - 1], tables[index].iloc[4:]])
-            else:
-                tables[index - 1] = pd.concat([tables[index-1],tables[index].iloc[3:]])
-            del tables[index]
-        else:
-            index += 1
+    if context is None:
+        context = DocumentContext(path)
+    scoped = settings.TABLES_SCOPED if scoped is None else scoped
+    tables = read_tables(context, workers, scoped)
+    # the codes table of the header goes first, the last one is the stamp
+    # of electronic signatures which the scoped mode does not extract
+    tables = tables[1:] if scoped else tables[1:-1]
+
+    tables = stitch_tables(tables)
 
     tables[0].columns = columns_table1_m11
     tables[0].drop([0, 1], axis=0, inplace=True)
@@ -69,32 +240,31 @@ def table_ocr_m11(path: str | None) -> list[pd.DataFrame, pd.DataFrame]:
     return clear_dataframe(tables[:2])
 
 
-def table_ocr_fmu76(path: str | None) -> list[pd.DataFrame, pd.DataFrame]:
+@profiled
+@timed()
+def table_ocr_fmu76(
+    path: str | None, context: DocumentContext | None = None,
+    workers: int | None = None, scoped: bool | None = None
+) -> list[pd.DataFrame, pd.DataFrame]:
     """
     Obtaining and correcting tables in the FMU-76 file
 
     :param path: file path
+    :param context: opened document, shared with the header parser
+    :param workers: number of processes for page extraction, None for the setting
+    :param scoped: extract only the regions of the tables, None for the setting
     :return:
         list from a table in DataFrame format
     """
-    tables = camelot.read_pdf(path, pages='all')
-    tables = tables[:-1]
-    tables = [tabl.df for tabl in tables]
-
-    index = 1
-    while index < len(tables):
-        if tables[index-1].shape[1] == tables[index].shape[1]:
-            tab = tables[index].iloc[3:]
-            if len(tab.iloc[0, 0]) == 0:
-                line2 = tab.iloc[0,:]
-                for i, val in enumerate(line2):
-                    tables[index - 1].iloc[-1,i] += str(val)
-                tables[index - 1] = pd.concat([tables[index - 1], tables[index].iloc[4:]])
-            else:
-                tables[index - 1] = pd.concat([tables[index-1],tables[index].iloc[3:]])
-            del tables[index]
-        else:
-            index += 1
+    if context is None:
+        context = DocumentContext(path)
+    scoped = settings.TABLES_SCOPED if scoped is None else scoped
+    tables = read_tables(context, workers, scoped)
+    # the last table is the stamp of electronic signatures
+    # which the scoped mode does not extract
+    tables = tables if scoped else tables[:-1]
+
+    tables = stitch_tables(tables)
 
     if len(tables) > 1:
         table1_fmu_2_2 = tables[0].iloc[2, 2].split('\n')
@@ -113,18 +283,52 @@ def table_ocr_fmu76(path: str | None) -> list[pd.DataFrame, pd.DataFrame]:
     return clear_dataframe(tables[:2])
 
 
+@timed("stitch")
+def stitch_tables(tables: list[pd.DataFrame], header_rows: int = HEADER_ROWS) -> list[pd.DataFrame]:
+    """
+    Join the parts of the tables split by page breaks. A table with the
+    same number of columns as the previous one is its continuation, its
+    header rows are dropped. A continuation starting with an empty first
+    cell is the end of the last row of the previous page, the row is
+    glued back. Row blocks are collected and concatenated once per table,
+    so the time is linear in the number of pages.
+
+    :param tables: list of tables in page order
+    :param header_rows: number of header rows of the continuations
+    :return:
+        list of joined tables
+    """
+    groups = []
+    for table in tables:
+        if not groups or groups[-1][0].shape[1] != table.shape[1]:
+            groups.append([table])
+            continue
+        blocks = groups[-1]
+        part = table.iloc[header_rows:]
+        if len(part) and len(blocks[-1]) and len(str(part.iat[0, 0])) == 0:
+            last = blocks[-1]
+            row = last.iloc[[-1]] + part.iloc[[0]].astype(str).to_numpy()
+            blocks[-1:] = [last.iloc[:-1], row]
+            part = part.iloc[1:]
+        blocks.append(part)
+    return [blocks[0] if len(blocks) == 1 else pd.concat(blocks) for blocks in groups]
+
+
 def clear_dataframe(
     tables: list[pd.DataFrame,pd.DataFrame]
 ) -> list[pd.DataFrame, pd.DataFrame]:
     """
-    Clear DataFrame
+    Clear DataFrame: remove line breaks of the cells
 
     :param tables:  list from a table in DataFrame
     :return:
         list from a table in DataFrame
     """
     tables = [
-        table.replace('\n', '', regex=True)
+        table.apply(
+            lambda column: column.replace('\n', '', regex=True)
+            if is_string_dtype(column) or is_object_dtype(column) else column
+        )
         for table in tables
     ]
     return tables
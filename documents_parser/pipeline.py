@@ -0,0 +1,302 @@
+import logging
+import os
+import tempfile
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Iterator
+import pandas as pd
+from documents_parser.parser.classifier import (
+    FORMS, FORM_M11, FORM_FMU76, FormGuess, classify_document
+)
+from documents_parser.parser.ocr_m11_scripts import ocr_m11
+from documents_parser.parser.ocr_fmu76_scripts import ocr_fmu76
+from documents_parser.parser.table_parser import table_ocr_m11, table_ocr_fmu76
+from documents_parser.ui.validator import validate_raw_data_m11, validate_tables_m11
+from documents_parser.ui.validator import validate_raw_fmu_76, validate_tables_fmu_76
+from documents_parser import settings
+from documents_parser.utils.cache import ResultCache, cache_key, file_hash
+from documents_parser.utils.document import DPI, RASTER_DPI, DocumentContext
+from documents_parser.utils.profiling import profile_stem, profiling, sampled
+from documents_parser.utils.quality import get_tier, quality_tier
+from documents_parser.utils.timing import collect, export_jsonl, stage, summarize_spans, tag, tagged, timed
+
+logger = logging.getLogger("dev")
+
+STATUS_ACCEPTED = "Принято"
+STATUS_REJECTED = "Отклонено"
+STATUS_ERROR = "Ошибка"
+# Document id in the metrics: prefix of the SHA-256 of the file
+DOCUMENT_ID_LENGTH = 16
+
+
+def output_settings() -> dict:
+    """
+    Settings which change the parsed result, a part of the cache key
+
+    :return:
+        dict of the setting values
+    """
+    return {
+        "dpi": DPI,
+        "raster_dpi": RASTER_DPI,
+        "field_profiles": settings.OCR_FIELD_PROFILES,
+        "tables_scoped": settings.TABLES_SCOPED,
+        "templates": settings.TEMPLATES_ENABLED,
+        "tessdata": settings.TESSDATA_DIR,
+    }
+
+
+def parse_document(
+    pdf_path: str | Path, form: str | None = None, workers: int | None = None,
+    use_cache: bool | None = None, context: DocumentContext | None = None,
+    tier: str | None = None, name: str | None = None, digest: str | None = None
+) -> (FormGuess, pd.DataFrame, list[pd.DataFrame]):
+    """
+    Detect the form and parse header report and tables of the document.
+    Results are looked up in the on-disk cache by the file content first,
+    the document is opened and the form is detected on a cache miss only
+    and stored with the result.
+
+    :param pdf_path: path to pdf file
+    :param form: form type, one of FORMS, None to detect
+    :param workers: number of processes for page-level work, None for the setting
+    :param use_cache: use the result cache, None for the setting
+    :param context: opened document, created if None
+    :param tier: OCR quality tier, None for the current one
+    :param name: path or name of the file, a hint for the form detection
+    :param digest: SHA-256 of the file if already computed
+    :return:
+        form guess, report, list of tables
+    """
+    if use_cache is None:
+        use_cache = settings.CACHE_ENABLED
+    if form is not None and form not in FORMS:
+        raise ValueError(f"Form is not correct! Current value = {form}")
+    tier = get_tier(tier).name
+
+    if use_cache:
+        cache = ResultCache()
+        # documents of the detected form share entries apart from the ones of the given form
+        key = cache_key(digest or file_hash(pdf_path), form=form, tier=tier, **output_settings())
+        cached = cache.get(key)
+        if cached is not None:
+            logger.info(f"{pdf_path}: result is taken from the cache")
+            return cached
+
+    with quality_tier(tier):
+        context = context or DocumentContext(str(pdf_path))
+        tag(pages=context.page_count)
+        guess = detect_form(context, form, name or str(pdf_path))
+        report, tables = _parse_document(pdf_path, guess.form, workers, context)
+    if use_cache:
+        cache.put(key, (guess, report, tables))
+    return guess, report, tables
+
+
+@contextmanager
+def temporary_pdf(data: bytes) -> Iterator[str]:
+    """
+    Write the content to a unique temporary pdf file, removed on exit
+
+    :param data: content of the pdf file
+    :return:
+        path to the file
+    """
+    fd, path = tempfile.mkstemp(prefix="upload_", suffix=".pdf")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        yield path
+    finally:
+        os.remove(path)
+
+
+def detect_form(
+    context: DocumentContext, form: str | None = None, name: str | None = None
+) -> FormGuess:
+    """
+    Form of the document: the given one or detected by the classifier
+
+    :param context: opened document
+    :param form: form type, one of FORMS, None to detect
+    :param name: path or name of the file, a hint for the classifier
+    :return:
+        Form guess
+    """
+    if form is not None:
+        return FormGuess(form, 1.0, "user")
+    guess = classify_document(context, name)
+    logger.info(f"{name or context.pdf_path}: form {guess.form}, confidence {guess.confidence} ({guess.source})")
+    return guess
+
+
+def parse_document_bytes(
+    data: bytes, form: str | None = None, workers: int | None = 1,
+    name: str | None = None, tier: str | None = None
+) -> (FormGuess, pd.DataFrame, list[pd.DataFrame]):
+    """
+    Parse uploaded document
+
+    :param data: content of the pdf file
+    :param form: form type, one of FORMS, None to detect
+    :param workers: number of processes for page-level work, None for the setting
+    :param name: name of the uploaded file, a hint for the form detection
+    :param tier: OCR quality tier, None for the setting
+    :return:
+        form guess, report, list of tables
+    """
+    with temporary_pdf(data) as path:
+        return parse_document(path, form, workers, tier=tier, name=name)
+
+
+def _parse_document(
+    pdf_path: str | Path, form: str, workers: int | None = None,
+    context: DocumentContext | None = None
+) -> (pd.DataFrame, list[pd.DataFrame]):
+    """
+    Run the parsers on the document
+
+    :param pdf_path: path to pdf file
+    :param form: form type, one of FORMS
+    :param workers: number of processes for page-level work, None for the setting
+    :param context: opened document, created if None
+    :return:
+        report, list of tables
+    """
+    context = context or DocumentContext(str(pdf_path))
+    if form == FORM_M11:
+        report = ocr_m11(context=context, workers=workers)
+        tables = table_ocr_m11(path=None, context=context, workers=workers)
+    elif form == FORM_FMU76:
+        report = ocr_fmu76(context=context)
+        tables = table_ocr_fmu76(path=None, context=context, workers=workers)
+    return report, tables
+
+
+@timed("validate")
+def validate_document(
+    form: str, report: pd.DataFrame, tables: list[pd.DataFrame]
+) -> (list, list[str], list[list], list[list[str]]):
+    """
+    Validate parsed document
+
+    :param form: form type, one of FORMS
+    :param report: header report
+    :param tables: list of tables, indexes are reset
+    :return:
+        unvalidated report rows, their reasons,
+        unvalidated cells for each table, their reasons
+    """
+    if form == FORM_M11:
+        validate_raw, validate_table = validate_raw_data_m11, validate_tables_m11
+    else:
+        validate_raw, validate_table = validate_raw_fmu_76, validate_tables_fmu_76
+
+    unvalidated_row, reasons_row = validate_raw(report)
+    unvalidated_list, reasons_list = [], []
+    for table in tables:
+        unvalidated_t, reasons_t = validate_table(table)
+        if isinstance(unvalidated_t, str):
+            # table of unknown type
+            unvalidated_t, reasons_t = [], ["Не удалось определить тип таблицы"]
+        unvalidated_list.append(unvalidated_t)
+        reasons_list.append(reasons_t)
+    return unvalidated_row, reasons_row, unvalidated_list, reasons_list
+
+
+def document_status(
+    unvalidated_row: list, reasons_row: list[str],
+    unvalidated_list: list[list], reasons_list: list[list[str]]
+) -> (str, list[str]):
+    """
+    Verdict on the validated document
+
+    :param unvalidated_row: unvalidated report rows
+    :param reasons_row: their reasons
+    :param unvalidated_list: unvalidated cells for each table
+    :param reasons_list: their reasons
+    :return:
+        status, accepted or rejected, and the list of all reasons
+    """
+    reasons = reasons_row + [reason for reasons in reasons_list for reason in reasons]
+    rejected = unvalidated_row or any(unvalidated_list) or reasons
+    return STATUS_REJECTED if rejected else STATUS_ACCEPTED, reasons
+
+
+def process_document(
+    pdf_path: str | Path, form: str | None = None, workers: int | None = None,
+    use_cache: bool | None = None, name: str | None = None,
+    profile_dir: str | Path | None = None, tier: str | None = None
+) -> dict:
+    """
+    Parse and validate the document, errors are reported in the result.
+    The document is profiled into `profile_dir` if it is given,
+    otherwise the sampled documents are profiled into PROFILE_DIR setting.
+
+    :param pdf_path: path to pdf file
+    :param form: form type, one of FORMS, None to detect
+    :param workers: number of processes for page-level work, None for the setting
+    :param use_cache: use the result cache, None for the setting
+    :param name: file name for the form detection, the path by default
+    :param profile_dir: directory for the CPU and memory profile of the document
+    :param tier: OCR quality tier, None for the setting
+    :return:
+        dict with path, form, form confidence, quality tier, status, reasons, report,
+        elapsed time, time of the stages and path to the profile summary
+    """
+    start = time.perf_counter()
+    result = {"path": str(pdf_path), "form": form}
+    if profile_dir is None and settings.PROFILE_DIR and sampled():
+        profile_dir = settings.PROFILE_DIR
+    profiler = profiling(profile_stem(profile_dir, name or str(pdf_path))) if profile_dir else nullcontext()
+    with profiler as profile, quality_tier(tier) as quality, \
+            collect() as spans, tagged(tier=quality.name) as tags, stage("document"):
+        result["tier"] = quality.name
+        try:
+            digest = file_hash(pdf_path)
+            tags["document"] = digest[:DOCUMENT_ID_LENGTH]
+            guess, report, tables = parse_document(
+                pdf_path, form, workers, use_cache, name=name or str(pdf_path), digest=digest
+            )
+            form = tags["form"] = guess.form
+            result.update(form=form, form_confidence=guess.confidence)
+            tables = [table.reset_index(drop=True) for table in tables]
+            status, reasons = document_status(*validate_document(form, report, tables))
+        except Exception as e:
+            logger.warning(f"{pdf_path}: {e!r}")
+            result.update(status=STATUS_ERROR, reasons=[repr(e)], report={})
+        else:
+            result.update(status=status, reasons=reasons, report=report["Значение"].to_dict())
+    result["elapsed"] = round(time.perf_counter() - start, 3)
+    result["stages"] = summarize_spans(spans)
+    if profile and "path" in profile:
+        result["profile"] = profile["path"]
+    if settings.METRICS_FILE:
+        try:
+            export_jsonl(spans, settings.METRICS_FILE)
+        except OSError as e:
+            logger.warning(f"Can't write metrics: {e!r}")
+    return result
+
+
+def process_document_bytes(
+    data: bytes, form: str | None = None, workers: int | None = 1,
+    name: str | None = None, tier: str | None = None
+) -> dict:
+    """
+    Parse and validate uploaded document
+
+    :param data: content of the pdf file
+    :param form: form type, one of FORMS, None to detect
+    :param workers: number of processes for page-level work, None for the setting
+    :param name: name of the uploaded file, a hint for the form detection
+    :param tier: OCR quality tier, None for the setting
+    :return:
+        dict with form, form confidence, quality tier, status, reasons, report,
+        elapsed time and time of the stages
+    """
+    with temporary_pdf(data) as path:
+        result = process_document(path, form, workers, name=name, tier=tier)
+    del result["path"]
+    return result
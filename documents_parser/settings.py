@@ -0,0 +1,45 @@
+import os
+
+# Number of processes for page-level parallel work, 1 disables the pool
+WORKERS = int(os.environ.get("DOCUMENTS_PARSER_WORKERS", "1"))
+
+# On-disk cache of parsing results
+CACHE_ENABLED = os.environ.get("DOCUMENTS_PARSER_CACHE", "1") != "0"
+CACHE_DIR = os.environ.get(
+    "DOCUMENTS_PARSER_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "documents_parser"),
+)
+CACHE_SIZE_MB = float(os.environ.get("DOCUMENTS_PARSER_CACHE_SIZE_MB", "512"))
+
+# Document job queue of the UI: worker processes and pending jobs limit
+QUEUE_WORKERS = int(os.environ.get("DOCUMENTS_PARSER_QUEUE_WORKERS", "2"))
+QUEUE_SIZE = int(os.environ.get("DOCUMENTS_PARSER_QUEUE_SIZE", "64"))
+
+# HTTP API: upload size limit and time to wait for the result in synchronous mode
+API_MAX_UPLOAD_MB = float(os.environ.get("DOCUMENTS_PARSER_API_MAX_UPLOAD_MB", "50"))
+API_SYNC_TIMEOUT = float(os.environ.get("DOCUMENTS_PARSER_API_SYNC_TIMEOUT", "120"))
+
+# Layout templates: header geometry learned from processed documents
+TEMPLATES_ENABLED = os.environ.get("DOCUMENTS_PARSER_TEMPLATES", "1") != "0"
+TEMPLATES_MAX = int(os.environ.get("DOCUMENTS_PARSER_TEMPLATES_MAX", "256"))
+
+# OCR quality tier: fast, balanced or accurate, may be chosen per document.
+# Tiers load `fast` and `best` traineddata from the subdirectories of the tessdata
+# directory, the system model is used if it is not set
+QUALITY_TIER = os.environ.get("DOCUMENTS_PARSER_QUALITY_TIER", "balanced")
+TESSDATA_DIR = os.environ.get("DOCUMENTS_PARSER_TESSDATA_DIR", "")
+
+# OCR of the header fields with the settings declared for each field
+# (page segmentation mode, allowed characters) instead of the full layout analysis
+OCR_FIELD_PROFILES = os.environ.get("DOCUMENTS_PARSER_OCR_FIELD_PROFILES", "0") != "0"
+
+# Table extraction: camelot processes only the tables found by a first pass over the pages
+TABLES_SCOPED = os.environ.get("DOCUMENTS_PARSER_TABLES_SCOPED", "1") != "0"
+
+# Spans of the processed documents are appended to this JSON lines file, disabled if empty
+METRICS_FILE = os.environ.get("DOCUMENTS_PARSER_METRICS_FILE", "")
+
+# Profiling: cProfile and tracemalloc reports of the entry points are written
+# to this directory for the sampled fraction of documents, disabled if empty
+PROFILE_DIR = os.environ.get("DOCUMENTS_PARSER_PROFILE_DIR", "")
+PROFILE_RATE = float(os.environ.get("DOCUMENTS_PARSER_PROFILE_RATE", "1"))
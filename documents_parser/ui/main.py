@@ -1,16 +1,42 @@
+import hashlib
 import logging
+import time
 import pandas as pd
 import streamlit as st
 from pathlib import Path
 import base64
-from documents_parser.ui.validator import validate_tables_m11, validate_raw_data_m11
-from documents_parser.ui.validator import validate_tables_fmu_76, validate_raw_fmu_76
-from documents_parser.parser.ocr_m11_scripts import ocr_m11
-from documents_parser.parser.ocr_fmu76_scripts import ocr_fmu76
-from documents_parser.parser.table_parser import table_ocr_m11, table_ocr_fmu76
+from documents_parser.ui.styles import highlight_cells, highlight_rows
+from documents_parser.pipeline import (
+    FORMS, STATUS_ACCEPTED, document_status, parse_document_bytes, validate_document
+)
+from documents_parser.utils.jobs import JobQueue, QueueFull, STATUS_DONE, STATUS_FAILED
+from documents_parser.utils.quality import TIERS, get_tier
 
 SRC_PATH = Path(__file__).parent / "src"
-DOWNLOAD_FILENAME = Path("data/file.pdf")
+# Rows of a table page, styling large tables at once is slow
+PAGE_SIZE = 200
+JOBS_KEY = "jobs"
+AUTO_FORM = "Определить автоматически"
+# Status table is refreshed while documents are processed
+REFRESH_SECONDS = 2
+# Names of the OCR quality tiers
+TIER_NAMES = {
+    "fast": "Быстро",
+    "balanced": "Сбалансированно",
+    "accurate": "Точно",
+}
+
+
+@st.cache_resource
+def get_queue() -> JobQueue:
+    """
+    Job queue shared by all sessions. Identical uploads
+    are parsed once while their results are kept in the queue.
+
+    :return:
+        Job queue
+    """
+    return JobQueue()
 
 
 class Gui:
@@ -20,7 +46,7 @@ class Gui:
         """
         st.set_page_config(layout='wide')
 
-        self.uploaded_file = None
+        self.uploaded_files = []
         self.button_disabled = True
         self.check_button: st.button or None = None
         self.head_container = st.container()
@@ -48,9 +74,14 @@ class Gui:
             logo.image(str(SRC_PATH / "logo.png"), width=150, output_format="PNG")
             self.option = st.selectbox(
                 "Выберите тип документа",
-                ("М-11", "ФМУ-76"),
-                index=None,
-                placeholder="Выберите тип документа...",
+                (AUTO_FORM,) + FORMS,
+                index=0,
+            )
+            self.tier = st.selectbox(
+                "Качество распознавания",
+                tuple(TIERS),
+                index=tuple(TIERS).index(get_tier().name),
+                format_func=lambda tier: TIER_NAMES[tier],
             )
 
         self.draw_choose_file()
@@ -58,11 +89,13 @@ class Gui:
         with self.button_container:
             self.check_button = st.button(
                 'Проверить',
-                help="Проверить документ",
+                help="Проверить документы",
                 on_click=lambda: self.run_file_processing(),
                 disabled=self.button_disabled
             )
 
+        self.draw_jobs()
+
     def draw_choose_file(self) -> None:
         """
         Draw choose file widget
@@ -71,16 +104,15 @@ class Gui:
             None
         """
         with self.upload_container:
-            self.uploaded_file = st.file_uploader(
-                "Выберите файл",
+            self.uploaded_files = st.file_uploader(
+                "Выберите файлы",
                 type=["pdf"],
-                accept_multiple_files=False
+                accept_multiple_files=True
             )
 
-        if self.uploaded_file is not None:
-            filename = self.uploaded_file.name
+        if self.uploaded_files:
             with self.button_container:
-                st.write("Выбранный файл:", filename)
+                st.write("Выбрано файлов:", len(self.uploaded_files))
             if self.option:
                 self.button_disabled = False
 
@@ -89,223 +121,160 @@ class Gui:
 
     def run_file_processing(self) -> None:
         """
-        Activate functions, reaction on click of check_button
+        Activate functions, reaction on click of check_button.
+        Uploaded files are submitted to the job queue, the session
+        keeps the list of its jobs.
 
         :return:
             None
         """
         self.button_disabled = True
+        logging.getLogger("dev").info(f"{self.option=}")
 
-        with open(DOWNLOAD_FILENAME, 'wb+') as f:
-            # save file to local machine
-            f.write(self.uploaded_file.read())
+        queue = get_queue()
+        jobs = st.session_state.setdefault(JOBS_KEY, [])
+        form = None if self.option == AUTO_FORM else self.option
+        for uploaded_file in self.uploaded_files:
+            data = uploaded_file.getvalue()
+            try:
+                job = queue.submit(
+                    parse_document_bytes, data, form, 1, uploaded_file.name, self.tier,
+                    name=uploaded_file.name,
+                    key=(hashlib.sha256(data).hexdigest(), form, self.tier),
+                )
+            except QueueFull:
+                st.toast("Очередь переполнена, остальные файлы отправьте позже")
+                break
+            if all(item["id"] != job.id for item in jobs):
+                jobs.append({"id": job.id, "name": uploaded_file.name, "form": form, "tier": self.tier})
 
-        gif_path = "https://donskow.com/train4"
-        with self.button_container:
-            # loading gif :)
-            gif_runner = st.image(gif_path)
+    def draw_jobs(self) -> None:
+        """
+        Draw status of the session documents and results of the chosen one.
+        The page is rerun while some documents are processed.
 
-        logging.getLogger("dev").info(f"{self.option=}")
-        if self.option == "М-11":
-            df = ocr_m11(pdf_path=str(DOWNLOAD_FILENAME))
-            df_list = table_ocr_m11(path=str(DOWNLOAD_FILENAME))
-            gif_runner.empty()  # finish gif
-            self.button_container.empty()
-            self.draw_results_m11(df, df_list)
-        elif self.option == "ФМУ-76":
-            df = ocr_fmu76(pdf_path=str(DOWNLOAD_FILENAME))
-            df_list = table_ocr_fmu76(path=str(DOWNLOAD_FILENAME))
-            gif_runner.empty()  # finish gif
-            self.button_container.empty()
-            self.draw_results_fmu(df, df_list)
-        else:
-            raise ValueError(f"Option is not correct! Current value = {self.option}")
+        :return:
+            None
+        """
+        queue = get_queue()
+        # jobs dropped from the queue are forgotten
+        jobs = [item for item in st.session_state.get(JOBS_KEY, []) if queue.get(item["id"])]
+        st.session_state[JOBS_KEY] = jobs
+        if not jobs:
+            return
+
+        statuses = [queue.get(item["id"]).status for item in jobs]
+        guesses = [
+            queue.get(item["id"]).result()[0] if status == STATUS_DONE else None
+            for item, status in zip(jobs, statuses)
+        ]
+        with self.result_container:
+            st.dataframe(
+                pd.DataFrame({
+                    "Файл": [item["name"] for item in jobs],
+                    "Тип": [
+                        guess.form if guess is not None else item["form"] or AUTO_FORM
+                        for item, guess in zip(jobs, guesses)
+                    ],
+                    "Уверенность": [guess.confidence if guess is not None else None for guess in guesses],
+                    "Качество": [TIER_NAMES[item["tier"]] for item in jobs],
+                    "Статус": statuses,
+                }),
+                hide_index=True,
+                use_container_width=True,
+            )
+            for item, status in zip(jobs, statuses):
+                if status == STATUS_FAILED:
+                    st.error(f'{item["name"]}: {queue.get(item["id"]).error!r}')
+
+            finished = [i for i, status in enumerate(statuses) if status == STATUS_DONE]
+            if finished:
+                index = st.selectbox(
+                    "Показать результат",
+                    finished,
+                    index=len(finished) - 1,
+                    format_func=lambda i: jobs[i]["name"],
+                )
+                guess, df, df_list = queue.get(jobs[index]["id"]).result()
+                self.draw_results(guess.form, df, df_list)
 
-        self.uploaded_file = None
+        if any(not queue.get(item["id"]).done for item in jobs):
+            time.sleep(REFRESH_SECONDS)
+            st.rerun()
 
-    def draw_results_m11(self, df: pd.DataFrame, df_list: list) -> None:
+    def draw_results(self, form: str, df: pd.DataFrame, df_list: list) -> None:
         """
-        Draw results of document parser func
+        Draw results of document parser func with the verdict of the pipeline
 
+        :param form: form type, one of FORMS
         :param df: df with results from a parser func
         :param df_list: returned list of dataframes with table data
         :return:
             None
         """
         df_list = [_df.reset_index(drop=True) for _df in df_list]
-        unvalidated_row, reasons_row = validate_raw_data_m11(df)
-        is_accept = len(unvalidated_row)
-
-        unvalidated_list = []
-        reasons_list = []
-        for dataframe in df_list:
-            unvalidated_t, reason_t = validate_tables_m11(dataframe)
-            unvalidated_list.append(unvalidated_t)
-            is_accept += len(unvalidated_t)
-            reasons_list.append(reason_t)
-
-        def highlight_survived(s):
-            """
-            Highlight unvalidated data
-
-            :param s: dataframe row
-            :return:
-                Color for row
-            """
-            return (
-                [''] * len(s) if s["Название"] not in unvalidated_row
-                else ['background-color: tomato;text-color: black;'] * len(s)
-            )
+        unvalidated_row, reasons_row, unvalidated_list, reasons_list = validate_document(form, df, df_list)
+        status, reasons = document_status(unvalidated_row, reasons_row, unvalidated_list, reasons_list)
 
-        def color_survived(val, df: pd.DataFrame, unvalidated) -> str:
-            """
-            Color unvalidated cells
-
-            :param val: value from cell
-            :param df: dataframe
-            :param unvalidated: list of unvalidated [(index, col)]
-            :return:
-                Color html code
-            """
-            color = 'background-color: tomato;text-color: black;'
-            for coord in unvalidated:
-                index, col = coord[0], coord[1]
-                if df.loc[index, col] == val:
-                    return color
-            return ''
-
-        if df is not None:
-            if is_accept == 0:
-                self.data_container.markdown(
-                    '<h2 style="color:white;background-color:green;text-align:center">Принято</h2>',
-                    unsafe_allow_html=True)
-            else:
-                self.data_container.markdown(
-                    '<h2 style="color:white;background-color:red;text-align:center">Отклонено</h2>',
-                    unsafe_allow_html=True)
+        color = "green" if status == STATUS_ACCEPTED else "red"
+        self.data_container.markdown(
+            f'<h2 style="color:white;background-color:{color};text-align:center">{status}</h2>',
+            unsafe_allow_html=True
+        )
 
         with self.data_container:
-            if len(reasons_row+reasons_list) != 0:
-                if len(reasons_row+reasons_list) < 2:
+            if reasons:
+                if len(reasons) < 2:
                     st.markdown('<h1 style="text-align:center">Причина:<h1>', unsafe_allow_html=True)
                 else:
                     st.markdown('<h1 style="text-align:center">Причины:<h1>', unsafe_allow_html=True)
 
-                for reason in reasons_row:
+                for reason in reasons:
                     st.markdown(f'- {reason}')
 
-                for reasons in reasons_list:
-                    for reason in reasons:
-                        st.markdown(f'- {reason}')
-
         self.data_container.markdown('_____', )
         df = df.reset_index().rename({"index": "Название"}, axis=1)
 
         self.data_container.markdown('<h1 style="text-align:center">Отчет<h1>', unsafe_allow_html=True)
-        if isinstance(df, pd.DataFrame):
-            self.data_container.dataframe(
-                df.style.apply(highlight_survived, axis=1),
-                use_container_width=True,
-                height=500,
-                hide_index=True
-            )
+        self.data_container.dataframe(
+            df.style.apply(highlight_rows, axis=None, unvalidated=unvalidated_row),
+            use_container_width=True,
+            height=500,
+            hide_index=True
+        )
 
         with self.data_container:
             for i in range(len(df_list)):
                 try:
-                    dataframe = df_list[i]
-                    unvalidated_t = unvalidated_list[i]
-                    reason_t = reasons_list[i]
-                    st.dataframe(dataframe.style.map(lambda x: color_survived(x, dataframe, unvalidated_t)),
-                                 hide_index=True)
-
+                    self.draw_table(df_list[i], unvalidated_list[i], key=f"table_{i}")
                 except Exception as e:
                     logging.getLogger("dev").warning(e)
 
-    def draw_results_fmu(self, df: pd.DataFrame, df_list: list) -> None:
+    def draw_table(self, dataframe: pd.DataFrame, unvalidated: list, key: str) -> None:
         """
-        Draw results of document parser func
+        Draw table with highlighted unvalidated cells.
+        Large tables are split into pages, only the current page is styled.
 
-        :param df: df with results from a parser func
-        :param df_list: returned list with dataframes with table data
+        :param dataframe: table
+        :param unvalidated: list of unvalidated [(index, col)]
+        :param key: unique key of the table widgets
         :return:
             None
         """
-        df_list = [_df.reset_index(drop=True) for _df in df_list]
-        unvalidated_row, reasons_row = validate_raw_fmu_76(df)
-        is_accept = len(unvalidated_row)
-
-        unvalidated_list = []
-        reasons_list = []
-        for dataframe in df_list:
-            unvalidated_t, reason_t = validate_tables_fmu_76(dataframe)
-            unvalidated_list.append(unvalidated_t)
-            is_accept += len(unvalidated_t)
-            reasons_list.append(reason_t)
-
-        def highlight_survived(s):
-            return (
-                [''] * len(s) if s["Название"] not in unvalidated_row
-                else ['background-color: tomato;text-color: black;'] * len(s)
+        if isinstance(unvalidated, str):
+            # table of unknown type
+            unvalidated = []
+        pages = max((len(dataframe) - 1) // PAGE_SIZE + 1, 1)
+        if pages > 1:
+            page = st.number_input(
+                f"Страница (из {pages}, по {PAGE_SIZE} строк)",
+                min_value=1, max_value=pages, value=1, key=key,
             )
-
-        def color_survived(val, df, unvalidated):
-            color = 'background-color: tomato;text-color: black;'
-
-            for coord in unvalidated:
-                index, col = coord[0], coord[1]
-                if df.loc[index, col] == val:
-                    return color
-            return ''
-
-        if df is not None:
-            if is_accept == 0:
-                self.data_container.markdown(
-                    '<h2 style="color:white;background-color:green;text-align:center">Принято</h2>',
-                    unsafe_allow_html=True
-                )
-            else:
-                self.data_container.markdown(
-                    '<h2 style="color:white;background-color:red;text-align:center">Отклонено</h2>',
-                    unsafe_allow_html=True
-                )
-
-        with self.data_container:
-            if len(reasons_row+reasons_list) != 0:
-                if len(reasons_row+reasons_list) < 2:
-                    st.markdown('<h1 style="text-align:center">Причина:<h1>', unsafe_allow_html=True)
-                else:
-                    st.markdown('<h1 style="text-align:center">Причины:<h1>', unsafe_allow_html=True)
-
-                for reason in reasons_row:
-                    st.markdown(f'- {reason}')
-                for reasons in reasons_list:
-                    for reason in reasons:
-                        st.markdown(f'- {reason}')
-
-        self.data_container.markdown('_____', )
-        df = df.reset_index().rename({"index": "Название"}, axis=1)
-
-        self.data_container.markdown('<h1 style="text-align:center">Отчет<h1>', unsafe_allow_html=True)
-        if isinstance(df, pd.DataFrame):
-            self.data_container.dataframe(
-                df.style.apply(highlight_survived, axis=1),
-                use_container_width=True,
-                height=500,
-                hide_index=True
-            )
-
-        with self.data_container:
-            for i in range(len(df_list)):
-                try:
-                    dataframe = df_list[i]
-                    unvalidated_t = unvalidated_list[i]
-                    reason_t = reasons_list[i]
-                    st.dataframe(dataframe.style.map(lambda x: color_survived(x, dataframe, unvalidated_t)),
-                                 hide_index=True)
-
-                except Exception as e:
-                    logging.getLogger("dev").warning(e)
+            dataframe = dataframe.iloc[(page - 1) * PAGE_SIZE:page * PAGE_SIZE]
+        st.dataframe(
+            dataframe.style.apply(highlight_cells, axis=None, unvalidated=unvalidated),
+            hide_index=True
+        )
 
     def displayPDF(self, file: str | Path) -> None:
         """
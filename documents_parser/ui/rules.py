@@ -0,0 +1,165 @@
+import time
+from itertools import groupby
+from typing import Callable, Hashable, Iterable, NamedTuple
+import numpy as np
+import pandas as pd
+
+ERROR = "error"
+WARNING = "warning"
+
+# How the rule field is matched with the column names
+EXACT = "exact"
+CONTAINS = "contains"  # case-insensitive substring
+ANY = "any"
+
+
+class Rule(NamedTuple):
+    """
+    Validation rule: values of the matched columns which fail the predicate
+    are reported with the message, `{field}` in the message is replaced
+    with the column name. Consecutive rules of the same field form a chain,
+    a value is reported by the first failed rule of the chain only.
+    A column is checked by the first chain which matches it.
+    """
+    field: str
+    # vectorized check, returns True for valid values
+    predicate: Callable[[pd.Series | pd.DataFrame], pd.Series]
+    message: str
+    severity: str = ERROR
+    match: str = EXACT
+    # check all matched columns together, the predicate gets a DataFrame
+    combine: bool = False
+
+
+class Violation(NamedTuple):
+    """
+    Failed rule for the row
+    """
+    index: Hashable
+    columns: list[str]
+    message: str
+    severity: str
+
+
+class RuleSet:
+    """
+    Rules compiled into chains of column-wise checks. Each rule runs
+    once over all matched columns of the table, the engine counts calls,
+    hits and time spent for every rule.
+    """
+
+    def __init__(self, rules: Iterable[Rule], skip_index: Iterable[Hashable] = (), strict: bool = True):
+        """
+        Compile the rules
+
+        :param rules: rules in the order of checks inside a row
+        :param skip_index: index labels of rows which are not checked
+        :param strict: fields matched exactly must be in the table
+        """
+        self.rules = list(rules)
+        self.skip_index = list(skip_index)
+        self.strict = strict
+        self._chains = [
+            list(chain) for _, chain in groupby(
+                enumerate(self.rules),
+                key=lambda item: (item[1].field, item[1].match, item[1].combine)
+            )
+        ]
+        self._stats = np.zeros((len(self.rules), 3))
+
+    def _columns(self, rule: Rule, columns: list[str]) -> list[str]:
+        """
+        Columns matched by the rule field
+
+        :param rule: rule
+        :param columns: columns which are not checked by other chains
+        :return:
+            list of columns
+        """
+        if rule.match == ANY:
+            return columns
+        if rule.match == CONTAINS:
+            field = rule.field.casefold()
+            return [col for col in columns if field in col.casefold()]
+        return [col for col in columns if col == rule.field]
+
+    def check(self, dataframe: pd.DataFrame) -> list[Violation]:
+        """
+        Check the table
+
+        :param dataframe: table, rules fields are its columns
+        :return:
+            list of violations, row by row in the order of the rules
+        """
+        rows = len(dataframe)
+        checked = ~dataframe.index.isin(self.skip_index)
+        unclaimed = list(dataframe.columns)
+        events = []
+        for chain_number, chain in enumerate(self._chains):
+            first = chain[0][1]
+            if self.strict and first.match == EXACT and first.field not in dataframe.columns:
+                raise KeyError(first.field)
+            columns = self._columns(first, unclaimed)
+            unclaimed = [col for col in unclaimed if col not in columns]
+            if first.combine:
+                groups, values = [columns], dataframe[columns]
+            elif columns:
+                # matched columns are stacked and checked in one call
+                groups = [[col] for col in columns]
+                values = pd.concat([dataframe[col] for col in columns], ignore_index=True)
+            else:
+                continue
+
+            remaining = np.tile(checked, len(groups))
+            for rule_number, rule in chain:
+                start = time.perf_counter()
+                failed = remaining & ~np.asarray(rule.predicate(values), dtype=bool)
+                remaining &= ~failed
+                positions = np.flatnonzero(failed)
+                self._stats[rule_number] += (1, len(positions), time.perf_counter() - start)
+                events.extend(
+                    (position % rows, chain_number, position // rows, rule_number, groups[position // rows])
+                    for position in positions
+                )
+
+        events.sort(key=lambda event: event[:3])
+        return [
+            Violation(
+                dataframe.index[position], group,
+                self.rules[rule_number].message.replace("{field}", ", ".join(group)),
+                self.rules[rule_number].severity,
+            )
+            for position, _, _, rule_number, group in events
+        ]
+
+    def validate(self, dataframe: pd.DataFrame) -> tuple[list, list[str]]:
+        """
+        Check the table and report errors
+
+        :param dataframe: table, rules fields are its columns
+        :return:
+            two lists: a first list is "coordinates" unvalidated cell (index, column),
+            a second list is reasons why unvalidated
+        """
+        unvalidated, reasons = [], []
+        for violation in self.check(dataframe):
+            if violation.severity != ERROR:
+                continue
+            unvalidated.extend((violation.index, col) for col in violation.columns)
+            reasons.append(violation.message)
+        return unvalidated, reasons
+
+    def stats(self) -> pd.DataFrame:
+        """
+        Statistics of the rules since the start of the process
+
+        :return:
+            DataFrame with field, message, severity, calls, hits and seconds of each rule
+        """
+        stats = pd.DataFrame(self._stats, columns=["calls", "hits", "seconds"])
+        stats[["calls", "hits"]] = stats[["calls", "hits"]].astype(int)
+        rules = pd.DataFrame(
+            [(rule.field, rule.message, rule.severity) for rule in self.rules],
+            columns=["field", "message", "severity"],
+        )
+        return pd.concat([rules, stats], axis=1)
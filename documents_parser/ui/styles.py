@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+
+HIGHLIGHT = 'background-color: tomato;text-color: black;'
+
+
+def highlight_cells(df: pd.DataFrame, unvalidated: list) -> pd.DataFrame:
+    """
+    Style of unvalidated cells for `Styler.apply(axis=None)`
+
+    :param df: table or its part
+    :param unvalidated: list of unvalidated [(index, col)]
+    :return:
+        DataFrame of css styles
+    """
+    mask = np.zeros(df.shape, dtype=bool)
+    if unvalidated:
+        indexes, cols = zip(*unvalidated)
+        rows = df.index.get_indexer(list(indexes))
+        columns = df.columns.get_indexer(list(cols))
+        found = (rows >= 0) & (columns >= 0)
+        mask[rows[found], columns[found]] = True
+    return pd.DataFrame(np.where(mask, HIGHLIGHT, ""), index=df.index, columns=df.columns)
+
+
+def highlight_rows(df: pd.DataFrame, unvalidated: list) -> pd.DataFrame:
+    """
+    Style of unvalidated report rows for `Styler.apply(axis=None)`
+
+    :param df: report with `Название` column
+    :param unvalidated: list of unvalidated field names
+    :return:
+        DataFrame of css styles
+    """
+    mask = np.repeat(df["Название"].isin(unvalidated).to_numpy()[:, None], df.shape[1], axis=1)
+    return pd.DataFrame(np.where(mask, HIGHLIGHT, ""), index=df.index, columns=df.columns)
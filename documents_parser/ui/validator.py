@@ -1,7 +1,11 @@
+import re
+import numpy as np
 import pandas as pd
-from typing import Hashable, Tuple, Any, Literal
+from typing import Tuple, Any, Literal, Callable
 from numpy import isnan
 import datetime
+from documents_parser.ui.rules import ANY, CONTAINS, ERROR, WARNING, Rule, RuleSet
+from documents_parser.utils.timing import timed
 
 ORGANIZATION_TYPES = [
     "ОАО", "ООО", "ЗАО", "ПАО",
@@ -46,6 +50,158 @@ def check_float(candidate: Any) -> bool:
         return False
 
 
+def check_dates(series: pd.Series) -> pd.Series:
+    """
+    Column-wise `check_date`
+
+    :param series: column of strings
+    :return:
+        Boolean mask, true if date is valid
+    """
+    parts = series.str.split(".", n=2, expand=True).reindex(columns=range(3), fill_value="")
+    day, month, year = (pd.to_numeric(parts[i], errors="coerce") for i in range(3))
+    valid = (
+        series.str.count(r"\.").eq(2)
+        & parts[0].str.len().le(2) & day.between(1, 31)
+        & parts[1].str.len().le(2) & month.between(1, 12)
+        & parts[2].str.len().eq(4) & year.le(datetime.date.today().year)
+    )
+    return valid.eq(True)
+
+
+def check_floats(series: pd.Series) -> pd.Series:
+    """
+    Column-wise `check_float`
+
+    :param series: column of strings
+    :return:
+        Boolean mask, true if the value can be floated
+    """
+    return pd.to_numeric(series, errors="coerce").notna()
+
+
+def is_digit(series: pd.Series) -> pd.Series:
+    """
+    Column-wise `str.isdigit`, non-string values are not digits
+
+    :param series: column of strings
+    :return:
+        Boolean mask
+    """
+    return series.str.isdigit().eq(True)
+
+
+def check_organizations(series: pd.Series) -> pd.Series:
+    """
+    Column-wise `check_organization`
+
+    :param series: column of strings
+    :return:
+        Boolean mask, true if organisation type is in the name
+    """
+    pattern = "|".join(re.escape(org_type) for org_type in ORGANIZATION_TYPES)
+    return series.str.contains(pattern).eq(True)
+
+
+def check_names(series: pd.Series) -> pd.Series:
+    """
+    Column-wise `check_name`
+
+    :param series: column of strings
+    :return:
+        Boolean mask, true if every word of the full name is capitalized
+    """
+    words = series.reset_index(drop=True).str.split(" ").explode()
+    first = words.str[:1]
+    valid = (words.str.len().gt(1) & first.ne(first.str.lower())).groupby(level=0).all()
+    return pd.Series(valid.to_numpy(), series.index)
+
+
+def has_text(text: str) -> Callable[[pd.Series], pd.Series]:
+    """
+    Predicate checking that the value contains the text
+
+    :param text: searched text
+    :return:
+        Predicate for the rule
+    """
+    return lambda series: series.str.contains(text, regex=False).eq(True)
+
+
+def has_info(frame: pd.DataFrame) -> pd.Series:
+    """
+    Check that at least one of the columns is filled
+
+    :param frame: columns of the table
+    :return:
+        Boolean mask, true if some value is longer than 10 symbols
+    """
+    filled = [frame[col].str.len().gt(10) for col in frame.columns]
+    return pd.concat(filled, axis=1).any(axis=1) if filled else pd.Series(False, frame.index)
+
+
+def clean(series: pd.Series) -> pd.Series:
+    """
+    Remove spaces and line breaks
+
+    :param series: column of strings
+    :return:
+        Cleaned column
+    """
+    return series.str.replace(" ", "").str.replace("\n", "")
+
+
+def check_money(series: pd.Series) -> pd.Series:
+    """
+    Check money format `rub,kop`
+
+    :param series: column of strings
+    :return:
+        Boolean mask
+    """
+    values = clean(series)
+    parts = values.str.split(",", n=1, expand=True).reindex(columns=range(2), fill_value="")
+    return values.str.count(",").eq(1) & is_digit(parts[0]) & is_digit(parts[1])
+
+
+def validate_report(rules: RuleSet, dataframe: pd.DataFrame) -> Tuple[list, list[str]]:
+    """
+    Validate header report, report fields are the rules fields
+
+    :param rules: rules of the form
+    :param dataframe: column: `Значение` values in the document
+    :return:
+        list of indexes with wrong col, list of reasons
+    """
+    values = dataframe["Значение"]
+    # missing values are checked as empty strings
+    values = values.where(values.map(lambda value: isinstance(value, str)), "")
+    positions = {field: position for position, field in enumerate(values.index)}
+    violations = sorted(
+        rules.check(values.to_frame().T),
+        key=lambda violation: positions[violation.columns[0]]
+    )
+    unvalidated = [violation.columns[0] for violation in violations if violation.severity == ERROR]
+    reasons = [violation.message for violation in violations if violation.severity == ERROR]
+    return unvalidated, reasons
+
+
+NUMBER_MESSAGE = "{field}: Неверный формат номера (только числа)"
+
+M11_REPORT_RULES = RuleSet([
+    Rule("Организация", check_organizations, "Неверное название организации"),
+    Rule("Тип формы", has_text("Типовая межотраслевая форма"),
+         "Отсутствует фраза: \"Типовая межотраслевая форма\""),
+    Rule("Требование-накладная", check_floats, NUMBER_MESSAGE),
+    Rule("Коды", check_floats, NUMBER_MESSAGE, match=CONTAINS),
+    Rule("документ", check_floats, NUMBER_MESSAGE, match=CONTAINS),
+    Rule("документ", lambda values: pd.to_numeric(values, errors="coerce").gt(0),
+         "{field}: Неверный формат номера (только числа > 0)", match=CONTAINS),
+    Rule("", lambda values: values.str.count(" ").ge(2), "{field}: Неверный формат", match=ANY),
+], strict=False)
+
+
+@timed()
 def validate_raw_data_m11(dataframe: pd.DataFrame) -> Tuple[list, list[str]]:
     """
     Validation of values in the M-11 document
@@ -54,47 +210,7 @@ def validate_raw_data_m11(dataframe: pd.DataFrame) -> Tuple[list, list[str]]:
     :return:
         list of indexes with wrong col, list of reasons
     """
-    unvalidated: list[Hashable] = []
-    reasons: list[str] = []
-    col_name = "Значение"
-    for index, row in dataframe.iterrows():
-        value = row[col_name]
-        if index == "Организация":
-            if not check_organization(value):
-                unvalidated.append(index)
-                reasons.append("Неверное название организации")
-        elif index == "Тип формы":
-            if "Типовая межотраслевая форма" not in value:
-                unvalidated.append(index)
-                reasons.append("Отсутствует фраза: \"Типовая межотраслевая форма\"")
-        elif index == "Требование-накладная":
-            if not check_float(value):
-                unvalidated.append(index)
-                reasons.append(f"Требование-накладная: Неверный формат номера (только числа)")
-        elif "Коды" in index:
-            if not check_float(value):
-                unvalidated.append(index)
-                reasons.append(f"{index}: Неверный формат номера (только числа)")
-
-        elif "документ" in index.lower():
-
-            if not check_float(value):
-                unvalidated.append(index)
-                reasons.append(f"{index}: Неверный формат номера (только числа)")
-            elif float(value) <= 0:
-                unvalidated.append(index)
-                reasons.append(f"{index}: Неверный формат номера (только числа > 0)")
-        else:
-            try:
-                if len(value.split(" ")) < 3:
-                    unvalidated.append(index)
-                    reasons.append(f"{index}: Неверный формат")
-            except AttributeError:
-                # if not str
-                unvalidated.append(index)
-                reasons.append(f"{index}: Неверный формат")
-
-    return unvalidated, reasons
+    return validate_report(M11_REPORT_RULES, dataframe)
 
 
 def identify_df(dataframe: pd.DataFrame) -> Literal[1, 2, 3]:
@@ -137,6 +253,31 @@ def check_date(date: str) -> bool:
         return False
 
 
+M11_TABLE_1_RULES = RuleSet([
+    Rule("Дата составления", check_dates, "Неверная дата составления"),
+    Rule("Код вида операции", is_digit, "Неверный код вида операции"),
+    Rule("Отправитель", has_info, "Нет данных о отправителе", match=CONTAINS, combine=True),
+    Rule("Получатель", has_info, "Нет данных о получателе", match=CONTAINS, combine=True),
+    Rule("Корреспондирующий счет", lambda values: is_digit(values.str.replace(" ", "")) | values.eq("-"),
+         "{field}: неправильные данные", match=CONTAINS),
+    Rule("Корреспондирующий счет", lambda values: values.str.startswith("7909").eq(True),
+         "{field}: неправильные данные (начинается с 7909)", match=CONTAINS),
+])
+
+# the third row is a header row of the table
+M11_TABLE_2_RULES = RuleSet([
+    Rule("Корреспондирующий счет", lambda values: is_digit(clean(values)) | values.eq("-"),
+         "{field}: неправильные данные (начинается с 1003)", match=CONTAINS),
+    Rule("Корреспондирующий счет", lambda values: values.str.startswith("1003").eq(True),
+         "{field}: неправильные данные", match=CONTAINS),
+    Rule("Материальные ценности (номенклатурный номер)", lambda values: is_digit(clean(values)),
+         '"{field}": неправильные данные (только цифры)'),
+    Rule("Единица измерения (код)", is_digit, '"{field}": неправильные данные (только цифры)'),
+    Rule("Количество", lambda values: check_floats(clean(values)), "{field}: неправильные данные", match=CONTAINS),
+    Rule("руб.", check_money, "{field}: Неправильный денежный формат (руб,коп)", match=CONTAINS),
+], skip_index=[2])
+
+
 def validate_dataframe_m11_1(dataframe: pd.DataFrame) -> Tuple[list, list]:
     """
     Validate table from document M-11 (type 1)
@@ -147,50 +288,7 @@ def validate_dataframe_m11_1(dataframe: pd.DataFrame) -> Tuple[list, list]:
         two lists: a first list is "coordinates" unvalidated cell (index, column),
         a second list is reasons why unvalidated
     """
-    reasons = []
-    unvalidated = []
-
-    for index, row in dataframe.iterrows():
-        # validate date
-        if not check_date(row["Дата составления"]):
-            unvalidated.append((index, "Дата составления"))
-            reasons.append("Неверная дата составления")
-        # validate code
-        if not row["Код вида операции"].isdigit():
-            unvalidated.append((index, "Код вида операции"))
-            reasons.append("Неверный код вида операции")
-        # validate sender and receiver
-        sender_fields = [row[col] for col in dataframe.columns if "Отправитель" in col]
-        receiver_fields = [row[col] for col in dataframe.columns if "Получатель" in col]
-        sender_info = False
-        receiver_info = False
-        for sender in sender_fields:
-            if len(sender) > 10:
-                sender_info = True
-        for receiver in receiver_fields:
-            if len(receiver) > 10:
-                receiver_info = True
-        if not sender_info:
-            cols = [col for col in dataframe.columns if "Отправитель" in col]
-            for col in cols:
-                unvalidated.append((index, col))
-            reasons.append("Нет данных о отправителе")
-        if not receiver_info:
-            cols = [col for col in dataframe.columns if "Получатель" in col]
-            for col in cols:
-                unvalidated.append((index, col))
-            reasons.append("Нет данных о получателе")
-
-        corresponding_account = [col for col in dataframe.columns if "Корреспондирующий счет" in col]
-        for col in corresponding_account:
-            if not row[col].replace(" ", "").isdigit() and row[col] != "-":
-                unvalidated.append((index, col))
-                reasons.append(f"{col}: неправильные данные")
-            elif not row[col].startswith("7909"):
-                unvalidated.append((index, col))
-                reasons.append(f"{col}: неправильные данные (начинается с 7909)")
-
-    return unvalidated, reasons
+    return M11_TABLE_1_RULES.validate(dataframe)
 
 
 def validate_dataframe_m11_2(dataframe: pd.DataFrame):
@@ -203,52 +301,10 @@ def validate_dataframe_m11_2(dataframe: pd.DataFrame):
         two lists: a first list is "coordinates" unvalidated cell (index, column),
         a second list is reasons why unvalidated
     """
-    reasons = []
-    unvalidated = []
-    for index, row in dataframe.iterrows():
-        if index == 2:
-            continue
-        corresponding_account = [col for col in dataframe.columns if "Корреспондирующий счет" in col]
-        for col in corresponding_account:
-            if (not row[col].replace(" ", "").replace("\n", "").isdigit()
-                    and row[col] != "-"):
-                unvalidated.append((index, col))
-                reasons.append(f"{col}: неправильные данные (начинается с 1003)")
-            elif not row[col].startswith("1003"):
-                unvalidated.append((index, col))
-                reasons.append(f"{col}: неправильные данные")
-
-        if not row["Материальные ценности (номенклатурный номер)"].replace(" ", "").replace("\n", "").isdigit():
-            unvalidated.append((index, "Материальные ценности (номенклатурный номер)"))
-            reasons.append(f'"Материальные ценности (номенклатурный номер)": неправильные данные (только цифры)')
-        if not row["Единица измерения (код)"].isdigit():
-            unvalidated.append((index, "Единица измерения (код)"))
-            reasons.append(f'"Единица измерения (код)": неправильные данные (только цифры)')
-        totals = [col for col in dataframe.columns if "Количество" in col]
-        for col in totals:
-            if not check_float(row[col].replace(" ", "").replace("\n", "")):
-                unvalidated.append((index, col))
-                reasons.append(f"{col}: неправильные данные")
-        prices = [col for col in dataframe.columns if "руб." in col]
-        for col in prices:
-            try:
-                if len(row[col].replace("\n", "").replace(" ", "").split(",")) != 2:
-                    unvalidated.append((index, col))
-                    reasons.append(f"{col}: Неправильный денежный формат (руб,коп)")
-                else:
-                    rub, kop = row[col].split(",")
-                    rub = rub.replace(" ", "").replace("\n", "")
-                    kop = kop.replace(" ", "").replace("\n", "")
-                    if not rub.isdigit() or not kop.isdigit():
-                        unvalidated.append((index, col))
-                        reasons.append(f"{col}: Неправильный денежный формат (руб,коп)")
-
-            except AttributeError:
-                unvalidated.append((index, col))
-                reasons.append(f"{col}: Неправильный денежный формат (руб,коп)")
-    return unvalidated, reasons
+    return M11_TABLE_2_RULES.validate(dataframe)
 
 
+@timed()
 def validate_tables_m11(dataframe: pd.DataFrame):
     """
     Validate tables from M-11
@@ -329,6 +385,23 @@ def check_name(value: str) -> bool:
     return True
 
 
+FMU76_REPORT_RULES = RuleSet([
+    Rule("Тип формы", has_text("Специализированная форма № ФМУ-76"), "Неверное тип формы"),
+    Rule("Номер акта", is_digit, "Номер акта не является числом"),
+    Rule("Номер акта", lambda values: pd.to_numeric(values, errors="coerce").notna(),
+         "Номер акта не является  натуральным числом"),
+    Rule("Дата акта", check_dates, "Неверная дата акта"),
+    Rule("Организация", check_organizations, "Неверное название организации"),
+    Rule("Структурное подразделение", lambda values: has_text("Север")(values) & has_text("Кавказ")(values),
+         "Структурное подразделение не является Северо- Кавказским"),
+    Rule("Утверждено (должность)", has_text("Начальник"), "Утверждено не начальником"),
+    Rule("Утверждено (ФИО)", check_names, "Некорректно заполнено ФИО"),
+    Rule("Утверждено (дата)", check_dates, "Неверная дата утверждения"),
+    Rule("Коды", check_floats, NUMBER_MESSAGE, match=CONTAINS),
+], strict=False)
+
+
+@timed()
 def validate_raw_fmu_76(dataframe: pd.DataFrame) -> tuple[list, list]:
     """
     Validate raw FMU-76 table
@@ -337,55 +410,7 @@ def validate_raw_fmu_76(dataframe: pd.DataFrame) -> tuple[list, list]:
     :return:
         list of indexes with wrong col, list of reasons
     """
-    unvalidated = []
-    reasons = []
-    col_name = "Значение"
-    for index, row in dataframe.iterrows():
-        value = row[col_name]
-        if index == "Тип формы":
-            if not check_type_from(value):
-                unvalidated.append(index)
-                reasons.append("Неверное тип формы")
-        elif index == "Номер акта":
-            if not value.isdigit():
-                unvalidated.append(index)
-                reasons.append("Номер акта не является числом")
-                continue
-            try:
-                int(value)
-            except ValueError:
-                unvalidated.append(index)
-                reasons.append("Номер акта не является  натуральным числом")
-        elif index == "Дата акта":
-            if not check_date(value):
-                unvalidated.append(index)
-                reasons.append("Неверная дата акта")
-        elif index == "Организация":
-            if not check_organization(value):
-                unvalidated.append(index)
-                reasons.append("Неверное название организации")
-        elif index == "Структурное подразделение":
-            if not check_structure_department(value):
-                unvalidated.append(index)
-                reasons.append("Структурное подразделение не является Северо- Кавказским")
-        elif index == "Утверждено (должность)":
-            if not check_post(value):
-                unvalidated.append(index)
-                reasons.append("Утверждено не начальником")
-        elif index == "Утверждено (ФИО)":
-            if not check_name(value):
-                unvalidated.append(index)
-                reasons.append("Некорректно заполнено ФИО")
-        elif index == "Утверждено (дата)":
-            if not check_date(value):
-                unvalidated.append(index)
-                reasons.append("Неверная дата утверждения")
-        elif "Коды" in index:
-            if not check_float(value):
-                unvalidated.append(index)
-                reasons.append(f"{index}: Неверный формат номера (только числа)")
-
-    return unvalidated, reasons
+    return validate_report(FMU76_REPORT_RULES, dataframe)
 
 
 def identify_df_fmu(dataframe: pd.DataFrame) -> Literal[1, 2, 3]:
@@ -403,6 +428,55 @@ def identify_df_fmu(dataframe: pd.DataFrame) -> Literal[1, 2, 3]:
     return 3
 
 
+FMU76_TABLE_1_RULES = RuleSet([
+    Rule("Структурное подразделение (цех, участок и др.)", lambda values: values.str.len().ge(3),
+         "{field}: Неправильное название организации"),
+    Rule("Код операции", is_digit, "{field}: Допустимы только цифры!"),
+    Rule("Корреспондирующий счет (Cчет, субчет)", is_digit, "{field}: Некорректно задан"),
+    Rule("Корреспондирующий счет (Статья расходов/носитель затрат)", is_digit, "{field}: Допустимы только цифры!"),
+])
+
+
+def is_numeric(series: pd.Series) -> pd.Series:
+    """
+    Column-wise `str.isnumeric`, non-string values are not numeric
+
+    :param series: column of strings
+    :return:
+        Boolean mask
+    """
+    return series.str.isnumeric().eq(True)
+
+
+def has_decimals(series: pd.Series) -> pd.Series:
+    """
+    Check quantity format with three decimals, e.g. 1.000
+
+    :param series: column of strings
+    :return:
+        Boolean mask
+    """
+    return check_floats(series) & series.str.split(".").str[-1].str.len().eq(3)
+
+
+# The format of the table is not settled, violations are not reported yet.
+# The third row is a header row of the table.
+FMU76_TABLE_2_RULES = RuleSet([
+    Rule('Технический счет 32 "Затраты"', is_numeric, "{field}: Допустимы только цифры!", WARNING),
+    Rule("Корреспондирующий счет (Cчет, субчет)", is_numeric, "{field}: Допустимы только цифры!", WARNING),
+    Rule("Материальные ценности (номенклатурный номер)", is_numeric, "{field}: Допустимы только цифры!", WARNING),
+    Rule("Единица измерения (код)", is_numeric, "{field}: Допустимы только цифры!", WARNING),
+    Rule("Нормативное количество", has_decimals, "{field}: Пример формата: 1.000", WARNING),
+    Rule("Фактически израсходованно (Количество)", has_decimals, "{field}: Пример формата: 1.000", WARNING),
+    Rule('Отклонение фактического расхода от нормы ("-" экономия,"+" перерасход)', has_decimals,
+         "{field}: Пример формата: 1.000", WARNING),
+    Rule("Фактически израсходованно (Цена, руб.коп)", check_floats, "{field}: Не число!", WARNING),
+    Rule("Фактически израсходованно (Сумма, руб.коп)", check_floats, "{field}: Не число!", WARNING),
+    Rule("Производстенный заказ", lambda values: values.str.isalnum().eq(True),
+         "{field}: Допустимы только цифры!", WARNING),
+], skip_index=[2])
+
+
 def validate_dataframe_fmu_1(df: pd.DataFrame):
     """
     validate table from document ФМУ-76(type 1)
@@ -413,26 +487,7 @@ def validate_dataframe_fmu_1(df: pd.DataFrame):
          two lists: a first list is "coordinates" unvalidated cell (index, column),
          a second list is reasons why unvalidated
     """
-    reasons = []
-    unvalidated = []
-    for index, row in df.iterrows():
-        if len(row["Структурное подразделение (цех, участок и др.)"]) < 3:
-            unvalidated.append((index, "Структурное подразделение (цех, участок и др.)"))
-            reasons.append(f"Структурное подразделение (цех, участок и др.): Неправильное название организации")
-        if not row["Код операции"].isdigit():
-            unvalidated.append((index, "Код операции"))
-            reasons.append(f"Код операции: Допустимы только цифры!")
-        if row["Корреспондирующий счет (Cчет, субчет)"].isdigit():
-            pass
-        else:
-            unvalidated.append((index, "Корреспондирующий счет (Cчет, субчет)"))
-            reasons.append(f"Корреспондирующий счет (Cчет, субчет): Некорректно задан")
-        if row["Корреспондирующий счет (Статья расходов/носитель затрат)"].isdigit():
-            pass
-        else:
-            unvalidated.append((index, "Корреспондирующий счет (Статья расходов/носитель затрат)"))
-            reasons.append(f"Корреспондирующий счет (Статья расходов/носитель затрат): Допустимы только цифры!")
-    return unvalidated, reasons
+    return FMU76_TABLE_1_RULES.validate(df)
 
 
 def validate_dataframe_fmu_2(df: pd.DataFrame):
@@ -445,56 +500,10 @@ def validate_dataframe_fmu_2(df: pd.DataFrame):
          two lists: a first list is `coordinates` unvalidated cell (index, column),
          a second list is reasons why unvalidated
     """
-    reasons = []
-    unvalidated = []
-    numeric_fields = [
-        'Технический счет 32 "Затраты"',
-        'Корреспондирующий счет (Cчет, субчет)',
-        'Материальные ценности (номенклатурный номер)',
-        'Единица измерения (код)',
-    ]
-    float_fields = [
-        'Нормативное количество',
-        'Фактически израсходованно (Количество)',
-        'Отклонение фактического расхода от нормы ("-" экономия,"+" перерасход)'
-    ]
-    money_fields = [
-        'Фактически израсходованно (Цена, руб.коп)',
-        'Фактически израсходованно (Сумма, руб.коп)',
-    ]
-    for index, row in df.iterrows():
-        if index == 2:
-            continue
-
-        for col in numeric_fields:
-            if row[col].isnumeric():
-                pass
-            else:
-                unvalidated.append((index, col))
-                reasons.append(f'{col}: Допустимы только цифры!')
-
-        for col in float_fields:
-            if check_float(row[col]) and len(row[col].split('.')[-1]) == 3:
-                pass
-            else:
-                unvalidated.append((index, col))
-                reasons.append(f'{col}: Пример формата: 1.000')
-        for col in money_fields:
-            if check_float(row[col]):
-                pass
-            else:
-                unvalidated.append((index, col))
-                reasons.append(f'{col}: Не число!')
-
-        if row['Производстенный заказ'].isalnum():
-            pass
-        else:
-            col = 'Производстенный заказ'
-            unvalidated.append((index, col))
-            reasons.append(f'{col}: Допустимы только цифры!')
-    return [], []
+    return FMU76_TABLE_2_RULES.validate(df)
 
 
+@timed()
 def validate_tables_fmu_76(dataframe: pd.DataFrame):
     """
     Validate tables from ФМУ-76
@@ -515,5 +524,26 @@ def validate_tables_fmu_76(dataframe: pd.DataFrame):
         return "Wrong", "Wrong"
 
 
+RULE_SETS = {
+    "М-11 реквизиты": M11_REPORT_RULES,
+    "М-11 таблица 1": M11_TABLE_1_RULES,
+    "М-11 таблица 2": M11_TABLE_2_RULES,
+    "ФМУ-76 реквизиты": FMU76_REPORT_RULES,
+    "ФМУ-76 таблица 1": FMU76_TABLE_1_RULES,
+    "ФМУ-76 таблица 2": FMU76_TABLE_2_RULES,
+}
+
+
+def rule_stats() -> pd.DataFrame:
+    """
+    Calls, hits and time spent for every validation rule of the process
+
+    :return:
+        DataFrame with a row for each rule
+    """
+    stats = [rules.stats().assign(rules=name) for name, rules in RULE_SETS.items()]
+    return pd.concat(stats, ignore_index=True)
+
+
 if __name__ == '__main__':
     pass
@@ -0,0 +1,124 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any
+import pandas as pd
+from documents_parser import __version__, settings
+
+logger = logging.getLogger("dev")
+
+# Bump when the stored objects change
+CACHE_FORMAT = 2
+
+
+def file_hash(path: str | Path) -> str:
+    """
+    SHA-256 of the file content
+
+    :param path: path to file
+    :return:
+        hex digest
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(digest: str, **params) -> str:
+    """
+    Key of the cache entry: file content, parser version and parameters
+
+    :param digest: file content hash
+    :param params: parameters which change the result
+    :return:
+        hex key
+    """
+    payload = json.dumps(
+        {"file": digest, "version": __version__, "format": CACHE_FORMAT, "params": params},
+        sort_keys=True, ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    On-disk cache of parsing results. Entries are compressed pickles
+    named by key, the total size is capped and the least recently
+    used entries are evicted first.
+    """
+
+    def __init__(self, path: str | Path | None = None, max_size_mb: float | None = None):
+        """
+        Initialize the cache
+
+        :param path: cache directory, setting by default
+        :param max_size_mb: size cap in megabytes, setting by default
+        """
+        self.path = Path(path or settings.CACHE_DIR)
+        self.max_size = (settings.CACHE_SIZE_MB if max_size_mb is None else max_size_mb) * 2 ** 20
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    def _entry(self, key: str) -> Path:
+        return self.path / f"{key}.pkl.gz"
+
+    def get(self, key: str) -> Any | None:
+        """
+        Read entry and mark it as recently used
+
+        :param key: entry key
+        :return:
+            Stored object or None
+        """
+        entry = self._entry(key)
+        try:
+            value = pd.read_pickle(entry, compression="gzip")
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Broken cache entry {entry.name}: {e!r}")
+            entry.unlink(missing_ok=True)
+            return None
+        os.utime(entry)
+        return value
+
+    def put(self, key: str, value: Any) -> None:
+        """
+        Store entry and evict old ones over the size cap
+
+        :param key: entry key
+        :param value: picklable object
+        :return:
+            None
+        """
+        entry = self._entry(key)
+        # unique per writer, concurrent puts of one key do not mix their files
+        tmp = entry.with_name(f"{key}.{os.getpid()}.{threading.get_ident()}.tmp")
+        pd.to_pickle(value, tmp, compression="gzip")
+        tmp.replace(entry)
+        self.evict()
+
+    def evict(self) -> None:
+        """
+        Remove least recently used entries over the size cap
+
+        :return:
+            None
+        """
+        entries = []
+        for entry in self.path.glob("*.pkl.gz"):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_size:
+                break
+            entry.unlink(missing_ok=True)
+            total -= size
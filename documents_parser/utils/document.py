@@ -0,0 +1,243 @@
+import logging
+import os
+import tempfile
+from typing import Iterator
+import cv2
+import numpy as np
+from PIL import Image
+from PyPDF2 import PdfReader
+from pdf2image import convert_from_path
+from documents_parser.utils.text_layer import Span, read_spans
+from documents_parser.utils.timing import stage, timed
+
+logger = logging.getLogger("dev")
+
+# pdf2image default resolution, ROI offsets of the parsers are set for it
+DPI = 200
+# Pages are rendered once at the resolution of the camelot lattice,
+# the parsers get them downscaled to DPI
+RASTER_DPI = 300
+# Rendered page files are written to memory-backed storage when available
+TMPFS_PATH = "/dev/shm"
+
+
+class DocumentContext:
+    """
+    Per-document state shared by the header parsers and the table
+    extraction: the opened PDF, its text layer, rendered pages and
+    derived grayscale/edge maps. Everything is computed once on demand,
+    a page kept in the context is rendered once for both the parsers
+    and the table extraction.
+    """
+
+    def __init__(self, pdf_path: str, dpi: int = DPI, raster_dpi: int = RASTER_DPI):
+        """
+        Open the document
+
+        :param pdf_path: path to pdf file
+        :param dpi: resolution of the pages for the parsers
+        :param raster_dpi: render resolution of the pages kept in the context
+        """
+        self.pdf_path = str(pdf_path)
+        self.dpi = dpi
+        self.raster_dpi = max(raster_dpi, dpi)
+        self.reader = PdfReader(self.pdf_path)
+        self._spans: dict[int, list[Span]] = {}
+        self._rasters: dict[int, Image.Image] = {}
+        self._pages: dict[int, Image.Image] = {}
+        self._gray: dict[int, np.ndarray] = {}
+        self._edges: dict[int, np.ndarray] = {}
+
+    @property
+    def page_count(self) -> int:
+        """
+        Number of pages in the document
+
+        :return:
+            Number of pages
+        """
+        return len(self.reader.pages)
+
+    def spans(self, index: int) -> list[Span]:
+        """
+        Text layer of the page
+
+        :param index: zero-based page number
+        :return:
+            list of spans, empty for scanned pages
+        """
+        if index not in self._spans:
+            pages = read_spans(self.pdf_path, page_numbers=[index])
+            self._spans[index] = pages[0] if pages else []
+        return self._spans[index]
+
+    def text_lines(self) -> list[str]:
+        """
+        Text layer lines of the whole document
+
+        :return:
+            list of lines
+        """
+        missing = [i for i in range(self.page_count) if i not in self._spans]
+        if missing:
+            for index, spans in zip(missing, read_spans(self.pdf_path, page_numbers=missing)):
+                self._spans[index] = spans
+        return [
+            span.text for index in range(self.page_count)
+            for span in self._spans.get(index, [])
+        ]
+
+    def page(self, index: int) -> Image.Image:
+        """
+        Rendered page, kept in the context for reuse. The page is rendered
+        at the raster resolution, which is kept too, and is downscaled to the context one.
+
+        :param index: zero-based page number
+        :return:
+            Page image
+        """
+        if index not in self._pages:
+            raster = self.raster(index)
+            self._rasters[index] = raster
+            if self.raster_dpi == self.dpi:
+                self._pages[index] = raster
+            else:
+                scale = self.dpi / self.raster_dpi
+                size = (round(raster.width * scale), round(raster.height * scale))
+                self._pages[index] = raster.resize(size, Image.LANCZOS)
+        return self._pages[index]
+
+    def kept(self, index: int) -> bool:
+        """
+        Whether the page is rendered and kept in the context
+
+        :param index: zero-based page number
+        :return:
+            True if kept
+        """
+        return index in self._rasters
+
+    def raster(self, index: int) -> Image.Image:
+        """
+        Page at the raster resolution.
+        Pages which are not kept in the context are not cached.
+
+        :param index: zero-based page number
+        :return:
+            Page image
+        """
+        if index in self._rasters:
+            return self._rasters[index]
+        return self._render(index, self.raster_dpi)
+
+    def iter_pages(
+        self, paths_only: bool = False, output_folder: str | None = None,
+        reverse: bool = False
+    ) -> Iterator[Image.Image | str]:
+        """
+        Render pages on demand one at a time. Pages which are not kept
+        in the context are released as soon as the consumer moves on,
+        so peak memory does not depend on the number of pages.
+
+        :param paths_only: yield paths to rendered files instead of images
+        :param output_folder: folder for rendered files, tmpfs by default
+        :param reverse: iterate from the last page
+        :return:
+            iterator over page images or paths
+        """
+        indexes = range(self.page_count)
+        if reverse:
+            indexes = reversed(indexes)
+        if not paths_only:
+            for index in indexes:
+                yield self._pages[index] if index in self._pages else self._render(index)
+            return
+
+        if output_folder is None and os.path.isdir(TMPFS_PATH):
+            output_folder = TMPFS_PATH
+        with tempfile.TemporaryDirectory(dir=output_folder) as folder:
+            for index in indexes:
+                with stage("rasterize"):
+                    path = convert_from_path(
+                        self.pdf_path, dpi=self.dpi,
+                        first_page=index + 1, last_page=index + 1,
+                        output_folder=folder, paths_only=True, fmt="png"
+                    )[0]
+                yield path
+                os.remove(path)
+
+    @timed("rasterize")
+    def _render(self, index: int, dpi: int | None = None) -> Image.Image:
+        """
+        Render single page
+
+        :param index: zero-based page number
+        :param dpi: render resolution, None for the context one
+        :return:
+            Page image
+        """
+        logger.info(f"Render page {index + 1}.")
+        return convert_from_path(
+            self.pdf_path, dpi=dpi or self.dpi,
+            first_page=index + 1, last_page=index + 1
+        )[0]
+
+    def image(self, index: int, dpi: int | None = None) -> np.ndarray:
+        """
+        Rendered page as numpy array.
+        Pages at another resolution than the context one are not cached,
+        the ones at the raster resolution are taken from the context if kept.
+
+        :param index: zero-based page number
+        :param dpi: render resolution, None for the context one
+        :return:
+            RGB image
+        """
+        if dpi == self.raster_dpi:
+            return np.array(self.raster(index))
+        if dpi is not None and dpi != self.dpi:
+            return np.array(self._render(index, dpi))
+        return np.array(self.page(index))
+
+    def gray(self, index: int) -> np.ndarray:
+        """
+        Grayscale map of the page
+
+        :param index: zero-based page number
+        :return:
+            Grayscale image
+        """
+        if index not in self._gray:
+            self._gray[index] = cv2.cvtColor(self.image(index), cv2.COLOR_RGB2GRAY)
+        return self._gray[index]
+
+    def edges(self, index: int) -> np.ndarray:
+        """
+        Edge map of the page used by line detection
+
+        :param index: zero-based page number
+        :return:
+            Canny edges
+        """
+        if index not in self._edges:
+            blur = cv2.GaussianBlur(self.gray(index), (5, 5), 0)
+            self._edges[index] = cv2.Canny(blur, 50, 50)
+        return self._edges[index]
+
+
+def get_context(
+    pdf_path: str | None = None, context: DocumentContext | None = None
+) -> DocumentContext:
+    """
+    Get document context for pipeline entry points
+
+    :param pdf_path: path to pdf file
+    :param context: already opened document
+    :return:
+        Document context
+    """
+    if context is not None:
+        return context
+    if pdf_path is None:
+        raise ValueError("OCR should work with correct file path.")
+    return DocumentContext(pdf_path)
@@ -1,15 +1,425 @@
+import logging
+import threading
+from typing import NamedTuple
 import pytesseract
 import numpy as np
+from documents_parser.utils.document import DPI
+from documents_parser.utils.quality import QualityTier, get_tier, prepare_image, scale_box, tessdata_dir
+from documents_parser.utils.timing import stage, timed
 
+try:
+    import tesserocr
+except ImportError:  # pragma: no cover - optional dependency
+    tesserocr = None
 
-def extract_text(img: np.ndarray) -> str:
+logger = logging.getLogger("dev")
+
+OCR_LANG = 'rus'
+# White gap between tiled crops in batched pytesseract recognition
+TILE_GAP = 40
+
+# Tesseract page segmentation modes
+PSM_AUTO = 3
+PSM_BLOCK = 6
+PSM_LINE = 7
+PSM_WORD = 8
+# Modes which recognize one line, such crops can't be tiled
+SINGLE_LINE_PSM = (PSM_LINE, PSM_WORD)
+DIGITS = "0123456789"
+
+
+class OcrProfile(NamedTuple):
+    """
+    Tesseract settings of the field: page segmentation mode,
+    allowed characters (all if empty) and engine mode (default if None)
+    """
+    psm: int = PSM_AUTO
+    whitelist: str = ""
+    oem: int | None = None
+
+    @property
+    def single_line(self) -> bool:
+        return self.psm in SINGLE_LINE_PSM
+
+    def config(self) -> str:
+        """
+        Command line options of `tesseract`
+
+        :return:
+            options string for pytesseract
+        """
+        options = [f"--psm {self.psm}"]
+        if self.oem is not None:
+            options.append(f"--oem {self.oem}")
+        if self.whitelist:
+            options.append(f"-c tessedit_char_whitelist={self.whitelist}")
+        return " ".join(options)
+
+
+# Full layout analysis, used for the fields without a profile
+DEFAULT_PROFILE = OcrProfile()
+# Uniform block of text, e.g. names and organisations
+BLOCK_PROFILE = OcrProfile(PSM_BLOCK)
+# Single line of text
+LINE_PROFILE = OcrProfile(PSM_LINE)
+
+
+class PytesseractEngine:
+    """
+    Fallback engine: every call spawns a `tesseract` process
+    through pytesseract.
+    """
+    name = "pytesseract"
+
+    def __init__(self, lang: str = OCR_LANG, tier: QualityTier | None = None):
+        """
+        Initialize the engine
+
+        :param lang: tesseract language
+        :param tier: quality tier, the current one by default
+        """
+        self.lang = lang
+        self.tier = tier or get_tier()
+        self.tessdata = tessdata_dir(self.tier, lang)
+
+    def _config(self, profile: OcrProfile) -> str:
+        """
+        Command line options of `tesseract` for the field and the model of the tier
+
+        :param profile: tesseract settings
+        :return:
+            options string for pytesseract
+        """
+        if self.tessdata is None:
+            return profile.config()
+        return f'{profile.config()} --tessdata-dir "{self.tessdata}"'
+
+    def recognize(self, img: np.ndarray, profile: OcrProfile = DEFAULT_PROFILE, dpi: int = DPI) -> str:
+        """
+        Recognize text on the image
+
+        :param img: image
+        :param profile: tesseract settings
+        :param dpi: resolution of the image
+        :return:
+            Raw recognized text
+        """
+        img, _ = prepare_image(img, self.tier, dpi)
+        return self._recognize(img, profile)
+
+    def _recognize(self, img: np.ndarray, profile: OcrProfile) -> str:
+        """
+        Recognize text on the prepared image
+
+        :param img: image
+        :param profile: tesseract settings
+        :return:
+            Raw recognized text
+        """
+        if img.size == 0:
+            return ""
+        with stage("tesseract"):
+            return pytesseract.image_to_string(img, lang=self.lang, config=self._config(profile))
+
+    def recognize_many(
+        self, img: np.ndarray, boxes: dict[str, tuple],
+        profiles: dict[str, OcrProfile] | None = None
+    ) -> dict[str, str]:
+        """
+        Recognize several regions of one image. Regions with the same
+        profile are recognized in a single tesseract call, single line
+        regions are recognized one by one.
+
+        :param img: image
+        :param boxes: dict of field -> (x, y, width, height)
+        :param profiles: dict of field -> tesseract settings, default ones for the others
+        :return:
+            dict of field -> raw recognized text
+        """
+        img, scale = prepare_image(img, self.tier)
+        groups = {}
+        for key, box in boxes.items():
+            groups.setdefault((profiles or {}).get(key, DEFAULT_PROFILE), {})[key] = scale_box(box, scale)
+        texts = {}
+        for profile, group in groups.items():
+            if profile.single_line:
+                texts.update({
+                    key: self._recognize(img[y:y + h, x:x + w], profile)
+                    for key, (x, y, w, h) in group.items()
+                })
+            else:
+                texts.update(self._recognize_tiles(img, group, profile))
+        return {key: texts[key] for key in boxes}
+
+    def _recognize_tiles(self, img: np.ndarray, boxes: dict[str, tuple], profile: OcrProfile) -> dict[str, str]:
+        """
+        Recognize several regions of one image in a single tesseract call.
+        Crops are tiled one under another with white separators,
+        recognized words are assigned back to the tiles by position.
+
+        :param img: image
+        :param boxes: dict of field -> (x, y, width, height)
+        :param profile: tesseract settings
+        :return:
+            dict of field -> raw recognized text
+        """
+        crops = {
+            key: img[y:y + h, x:x + w]
+            for key, (x, y, w, h) in boxes.items() if w > 0 and h > 0
+        }
+        texts = {key: "" for key in boxes}
+        if not crops:
+            return texts
+
+        width = max(crop.shape[1] for crop in crops.values())
+        height = sum(crop.shape[0] for crop in crops.values()) + TILE_GAP * (len(crops) + 1)
+        canvas = np.full((height, width) + img.shape[2:], 255, dtype=np.uint8)
+        tiles = []
+        y = TILE_GAP
+        for key, crop in crops.items():
+            canvas[y:y + crop.shape[0], :crop.shape[1]] = crop
+            tiles.append((key, y, y + crop.shape[0]))
+            y += crop.shape[0] + TILE_GAP
+
+        with stage("tesseract"):
+            data = pytesseract.image_to_data(
+                canvas, lang=self.lang, config=self._config(profile), output_type=pytesseract.Output.DICT
+            )
+        words = {key: [] for key, _, _ in tiles}
+        for i, word in enumerate(data["text"]):
+            if not word.strip():
+                continue
+            center = data["top"][i] + data["height"][i] // 2
+            for key, top, bottom in tiles:
+                if top - TILE_GAP // 2 <= center < bottom + TILE_GAP // 2:
+                    line = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+                    words[key].append((line, data["word_num"][i], word))
+                    break
+
+        for key, tile_words in words.items():
+            lines = {}
+            for line, _, word in sorted(tile_words, key=lambda w: (w[0], w[1])):
+                lines.setdefault(line, []).append(word)
+            texts[key] = "\n".join(" ".join(line) for line in lines.values())
+        return texts
+
+
+class TesserocrEngine:
+    """
+    In-process engine: keeps loaded Tesseract API handles, one per
+    engine mode, and passes numpy buffers to them directly, without
+    temp files. The handles are not thread-safe, use one engine per thread.
+    """
+    name = "tesserocr"
+
+    def __init__(self, lang: str = OCR_LANG, tier: QualityTier | None = None):
+        """
+        Initialize the engine and load the language model once
+
+        :param lang: tesseract language
+        :param tier: quality tier, the current one by default
+        """
+        self.lang = lang
+        self.tier = tier or get_tier()
+        self.tessdata = tessdata_dir(self.tier, lang)
+        self.apis = {}
+        self.api = self._api(None)
+
+    def _api(self, oem: int | None) -> "tesserocr.PyTessBaseAPI":
+        """
+        Get the API handle of the engine mode, it is loaded on the first use
+
+        :param oem: engine mode, None for the default one
+        :return:
+            API handle
+        """
+        api = self.apis.get(oem)
+        if api is None:
+            options = {"lang": self.lang}
+            if self.tessdata is not None:
+                options["path"] = self.tessdata
+            if oem is not None:
+                options["oem"] = oem
+            api = tesserocr.PyTessBaseAPI(**options)
+            self.apis[oem] = api
+        return api
+
+    def recognize(self, img: np.ndarray, profile: OcrProfile = DEFAULT_PROFILE, dpi: int = DPI) -> str:
+        """
+        Recognize text on the image
+
+        :param img: image
+        :param profile: tesseract settings
+        :param dpi: resolution of the image
+        :return:
+            Raw recognized text
+        """
+        img, _ = prepare_image(img, self.tier, dpi)
+        if img.size == 0:
+            return ""
+        api = self._api(profile.oem)
+        self._set_image(api, img)
+        self._configure(api, profile)
+        with stage("tesseract"):
+            return api.GetUTF8Text()
+
+    def recognize_many(
+        self, img: np.ndarray, boxes: dict[str, tuple],
+        profiles: dict[str, OcrProfile] | None = None
+    ) -> dict[str, str]:
+        """
+        Recognize several regions of one image: the image is loaded
+        into the API once and every region is set as a rectangle on it
+        with the settings of its field.
+
+        :param img: image
+        :param boxes: dict of field -> (x, y, width, height)
+        :param profiles: dict of field -> tesseract settings, default ones for the others
+        :return:
+            dict of field -> raw recognized text
+        """
+        texts = {key: "" for key in boxes}
+        img, scale = prepare_image(img, self.tier)
+        if img.size == 0:
+            return texts
+        boxes = {key: scale_box(box, scale) for key, box in boxes.items()}
+        profiles = {key: (profiles or {}).get(key, DEFAULT_PROFILE) for key in boxes}
+        for oem in dict.fromkeys(profile.oem for profile in profiles.values()):
+            api = self._api(oem)
+            self._set_image(api, img)
+            with stage("tesseract"):
+                for key, (x, y, w, h) in boxes.items():
+                    if w > 0 and h > 0 and profiles[key].oem == oem:
+                        self._configure(api, profiles[key])
+                        api.SetRectangle(x, y, w, h)
+                        texts[key] = api.GetUTF8Text()
+        return texts
+
+    @staticmethod
+    def _configure(api: "tesserocr.PyTessBaseAPI", profile: OcrProfile) -> None:
+        """
+        Apply the settings of the field to the API
+
+        :param api: API handle
+        :param profile: tesseract settings
+        :return:
+            None
+        """
+        api.SetPageSegMode(profile.psm)
+        api.SetVariable("tessedit_char_whitelist", profile.whitelist)
+
+    @staticmethod
+    def _set_image(api: "tesserocr.PyTessBaseAPI", img: np.ndarray) -> None:
+        """
+        Pass numpy buffer to the API without temp files
+
+        :param api: API handle
+        :param img: image
+        :return:
+            None
+        """
+        img = np.ascontiguousarray(img, dtype=np.uint8)
+        height, width = img.shape[:2]
+        channels = 1 if img.ndim == 2 else img.shape[2]
+        api.SetImageBytes(
+            img.tobytes(), width, height, channels, width * channels
+        )
+
+    def close(self) -> None:
+        """
+        Release the Tesseract API handles
+
+        :return:
+            None
+        """
+        for api in self.apis.values():
+            api.End()
+
+
+_local = threading.local()
+
+
+def get_engine() -> PytesseractEngine | TesserocrEngine:
+    """
+    Get the OCR engine of the current thread and quality tier.
+    Engine is created once per thread and tier and reused across ROIs and documents.
+    In-process engine is used when `tesserocr` is installed,
+    otherwise pytesseract is a fallback.
+
+    :return:
+        OCR engine
+    """
+    tier = get_tier()
+    engines = _local.__dict__.setdefault("engines", {})
+    engine = engines.get(tier.name)
+    if engine is None:
+        if tesserocr is not None:
+            try:
+                engine = TesserocrEngine(tier=tier)
+            except RuntimeError as e:
+                logger.warning(f"tesserocr is not available: {e}")
+        if engine is None:
+            engine = PytesseractEngine(tier=tier)
+        logger.info(f"OCR engine: {engine.name}, quality tier: {tier.name}")
+        engines[tier.name] = engine
+    return engine
+
+
+@timed("ocr")
+def extract_text(img: np.ndarray, profile: OcrProfile = DEFAULT_PROFILE) -> str:
     """
     Extract text from the image using Tesseract
 
     :param img: image
+    :param profile: tesseract settings
     :return:
         Extracted text
     """
-    text = pytesseract.image_to_string(img, lang='rus')
-    text = text.strip().replace("\n", " ").strip()
-    return text
+    text = get_engine().recognize(img, profile)
+    return clean_text(text)
+
+
+def clean_text(text: str) -> str:
+    """
+    Normalize recognized text to a single line
+
+    :param text: raw recognized text
+    :return:
+        Cleaned text
+    """
+    return text.strip().replace("\n", " ").strip()
+
+
+def roi_to_box(roi: tuple[slice, slice], shape: tuple) -> tuple[int, int, int, int]:
+    """
+    Convert ROI given as numpy slices (e.g. `np.s_[30:170, 1000:1600]`)
+    into absolute box with the same semantics as `img[roi]`.
+
+    :param roi: pair of (rows, columns) slices
+    :param shape: image shape
+    :return:
+        (x, y, width, height)
+    """
+    rows, cols = roi
+    y1, y2, _ = rows.indices(shape[0])
+    x1, x2, _ = cols.indices(shape[1])
+    return x1, y1, max(x2 - x1, 0), max(y2 - y1, 0)
+
+
+@timed("ocr")
+def extract_texts(
+    img: np.ndarray, rois: dict[str, tuple[slice, slice]],
+    profiles: dict[str, OcrProfile] | None = None
+) -> dict[str, str]:
+    """
+    Extract text from several regions of one image in one engine pass
+
+    :param img: image
+    :param rois: dict of field -> ROI as numpy slices
+    :param profiles: dict of field -> tesseract settings, default ones for the others
+    :return:
+        dict of field -> extracted text
+    """
+    boxes = {key: roi_to_box(roi, img.shape) for key, roi in rois.items()}
+    texts = get_engine().recognize_many(img, boxes, profiles)
+    return {key: clean_text(text) for key, text in texts.items()}
@@ -0,0 +1,192 @@
+import logging
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import BrokenExecutor, Executor, Future, ProcessPoolExecutor
+from typing import Any, Callable, Hashable
+from documents_parser import settings
+
+logger = logging.getLogger("dev")
+
+STATUS_QUEUED = "В очереди"
+STATUS_RUNNING = "Обработка"
+STATUS_DONE = "Готово"
+STATUS_FAILED = "Ошибка"
+
+# Finished jobs kept for status requests
+MAX_FINISHED = 256
+
+
+class QueueFull(RuntimeError):
+    """
+    Too many jobs are waiting for the workers
+    """
+
+
+class Job:
+    """
+    Document submitted to the queue
+    """
+
+    def __init__(self, job_id: str, name: str, future: Future, key: Hashable | None = None):
+        """
+        Initialize the job
+
+        :param job_id: unique id
+        :param name: human-readable name, e.g. file name
+        :param future: future of the worker call
+        :param key: key for deduplication of identical jobs
+        """
+        self.id = job_id
+        self.name = name
+        self.key = key
+        self.future = future
+
+    @property
+    def status(self) -> str:
+        """
+        Current status of the job
+
+        :return:
+            One of STATUS_* constants
+        """
+        if not self.future.done():
+            return STATUS_RUNNING if self.future.running() else STATUS_QUEUED
+        if self.future.cancelled() or self.future.exception() is not None:
+            return STATUS_FAILED
+        return STATUS_DONE
+
+    @property
+    def done(self) -> bool:
+        """
+        Check if the job is finished, successfully or not
+
+        :return:
+            True if finished
+        """
+        return self.future.done()
+
+    @property
+    def error(self) -> BaseException | None:
+        """
+        Exception raised by the job
+
+        :return:
+            Exception or None
+        """
+        if not self.future.done() or self.future.cancelled():
+            return None
+        return self.future.exception()
+
+    def result(self, timeout: float | None = None) -> Any:
+        """
+        Wait for the job and get its result
+
+        :param timeout: seconds to wait, forever by default
+        :return:
+            Result of the worker call
+        """
+        return self.future.result(timeout)
+
+
+class JobQueue:
+    """
+    Queue of documents processed in the background by a worker pool.
+    The number of unfinished jobs is bounded, identical jobs (same key)
+    share a single run while it is pending or successful.
+    The process pool is started again when a worker dies and breaks it.
+    """
+
+    def __init__(
+        self, workers: int | None = None, max_pending: int | None = None,
+        executor: Executor | None = None
+    ):
+        """
+        Start the worker pool
+
+        :param workers: number of processes, setting by default
+        :param max_pending: limit of unfinished jobs, setting by default
+        :param executor: executor to use instead of the process pool, it is not restarted
+        """
+        self.workers = max(settings.QUEUE_WORKERS if workers is None else workers, 1)
+        self.max_pending = settings.QUEUE_SIZE if max_pending is None else max_pending
+        self._restartable = executor is None
+        self._executor = executor or ProcessPoolExecutor(max_workers=self.workers)
+        self._jobs: OrderedDict[str, Job] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(
+        self, func: Callable, *args, name: str = "", key: Hashable | None = None
+    ) -> Job:
+        """
+        Submit the job
+
+        :param func: picklable function
+        :param args: function arguments
+        :param name: human-readable name
+        :param key: key for deduplication of identical jobs
+        :return:
+            New job, or the existing one with the same key
+        """
+        with self._lock:
+            if key is not None:
+                for job in self._jobs.values():
+                    if job.key == key and job.status != STATUS_FAILED:
+                        return job
+            if self.pending >= self.max_pending:
+                raise QueueFull(f"Queue is full: {self.pending} jobs are waiting")
+            try:
+                future = self._executor.submit(func, *args)
+            except BrokenExecutor:
+                if not self._restartable:
+                    raise
+                logger.warning(f"Worker pool is broken, start {self.workers} new workers")
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                future = self._executor.submit(func, *args)
+            job = Job(uuid.uuid4().hex, name, future, key)
+            self._jobs[job.id] = job
+            self._forget_finished()
+        logger.info(f"Job {job.id} ({name}) is submitted")
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        """
+        Find the job by id
+
+        :param job_id: job id
+        :return:
+            Job or None
+        """
+        return self._jobs.get(job_id)
+
+    @property
+    def pending(self) -> int:
+        """
+        Number of unfinished jobs
+
+        :return:
+            Number of jobs
+        """
+        return sum(not job.done for job in list(self._jobs.values()))
+
+    def _forget_finished(self) -> None:
+        """
+        Drop the oldest finished jobs over the limit
+
+        :return:
+            None
+        """
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        for job_id in finished[:max(len(finished) - MAX_FINISHED, 0)]:
+            del self._jobs[job_id]
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Stop the worker pool
+
+        :param wait: wait for running jobs
+        :return:
+            None
+        """
+        self._executor.shutdown(wait=wait, cancel_futures=True)
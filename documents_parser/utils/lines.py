@@ -0,0 +1,172 @@
+import logging
+import cv2
+import numpy as np
+from documents_parser.utils.timing import timed
+
+logger = logging.getLogger("dev")
+
+# Lines are searched on the page downscaled by this factor
+SCALE = 2
+# Pixels darker than this are ink
+INK_THRESHOLD = 180
+# Rows of one rule closer than this (in page pixels) are merged
+ROW_GAP = 10
+# Segments of one rule split by a gap narrower than this (in page pixels) are joined
+LINE_GAP = 10
+# Pixels with a larger spread of the channels are coloured ink,
+# e.g. the stamp of electronic signatures
+CHROMA_THRESHOLD = 60
+# Rules of the tables are longer than the page size divided by this, camelot default
+LINE_SCALE = 15
+
+
+@timed("line_detect")
+def detect_lines(
+    gray: np.ndarray, min_line_length: int = 300,
+    scale: int = SCALE, ink_threshold: int = INK_THRESHOLD
+) -> list[list[int]]:
+    """
+    Find horizontal rules of the page. The downscaled page is binarized,
+    opened with a horizontal kernel of the minimal line length, so only
+    long horizontal strokes remain, then the rows with strokes are
+    clustered and split into segments, segments separated by a gap
+    narrower than LINE_GAP are joined.
+
+    :param gray: grayscale page
+    :param min_line_length: minimal length of the line in page pixels
+    :param scale: downscale factor
+    :param ink_threshold: pixels darker than this are ink
+    :return:
+        list of lines [x1, y1, x2, y2] sorted from top to bottom,
+        y1 == y2 is the top of the rule
+    """
+    height, width = gray.shape[:2]
+    small = cv2.resize(gray, (width // scale, height // scale), interpolation=cv2.INTER_AREA)
+    binary = (small < ink_threshold).astype(np.uint8)
+    length = max(min_line_length // scale, 1)
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (length, 1))
+    strokes = cv2.morphologyEx(binary, cv2.MORPH_OPEN, kernel)
+
+    rows = np.flatnonzero(strokes.any(axis=1))
+    if not len(rows):
+        return []
+    clusters = np.split(rows, np.flatnonzero(np.diff(rows) > ROW_GAP // scale) + 1)
+
+    lines = []
+    for cluster in clusters:
+        band = strokes[cluster[0]:cluster[-1] + 1].any(axis=0).astype(np.int8)
+        edges = np.diff(np.concatenate(([0], band, [0])))
+        starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+        # cell borders break the rule into segments with tiny gaps
+        joined = np.concatenate(([True], starts[1:] - ends[:-1] > LINE_GAP // scale))
+        starts, ends = starts[joined], np.append(ends[:-1][joined[1:]], ends[-1])
+        y = int(cluster[0]) * scale
+        lines.extend(
+            [int(start) * scale, y, int(end - 1) * scale, y]
+            for start, end in zip(starts, ends) if end - start >= length
+        )
+    return lines
+
+
+def detect_grids(
+    page: np.ndarray, line_scale: int = LINE_SCALE,
+    scale: int = SCALE, ink_threshold: int = INK_THRESHOLD
+) -> list[tuple[int, int, int, int]]:
+    """
+    Find ruled tables printed in black. Horizontal and vertical rules
+    are found by opening the downscaled ink mask like camelot does,
+    connected groups of rules with both directions are tables.
+    Coloured ink is ignored, so the stamp of electronic signatures
+    is not a table.
+
+    :param page: RGB page
+    :param line_scale: rules are longer than the page size divided by this
+    :param scale: downscale factor
+    :param ink_threshold: pixels darker than this are ink
+    :return:
+        list of table boxes (x, y, width, height) in page pixels sorted from top to bottom
+    """
+    height, width = page.shape[:2]
+    small = cv2.resize(page, (width // scale, height // scale), interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(small, cv2.COLOR_RGB2GRAY)
+    chroma = small.max(axis=2).astype(np.int16) - small.min(axis=2)
+    ink = ((gray < ink_threshold) & (chroma < CHROMA_THRESHOLD)).astype(np.uint8)
+
+    rows, columns = ink.shape
+    horizontal = cv2.morphologyEx(
+        ink, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (columns // line_scale, 1))
+    )
+    vertical = cv2.morphologyEx(
+        ink, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (1, rows // line_scale))
+    )
+    # rules touching at the joints are one component, dilation closes anti-aliasing gaps
+    rules = cv2.dilate(horizontal | vertical, np.ones((3, 3), np.uint8))
+    count, labels, stats, _ = cv2.connectedComponentsWithStats(rules)
+
+    has_horizontal = np.zeros(count, dtype=bool)
+    has_vertical = np.zeros(count, dtype=bool)
+    has_horizontal[labels[horizontal > 0]] = True
+    has_vertical[labels[vertical > 0]] = True
+    boxes = [
+        tuple(int(value) * scale for value in stats[label, :4])
+        for label in range(1, count) if has_horizontal[label] and has_vertical[label]
+    ]
+    return sorted(boxes, key=lambda box: (box[1], box[0]))
+
+
+def hough_lines(
+    edges: np.ndarray, threshold: int = 200, min_line_length: int = 300
+) -> list[list[int]]:
+    """
+    Previous line detector: probabilistic Hough transform on the edge map.
+    Kept as the reference for the benchmark.
+
+    :param edges: Canny edge map of the page
+    :param threshold: param in HoughLinesP
+    :param min_line_length: param in HoughLinesP
+    :return:
+        list of lines [x1, y1, x2, y2] sorted from top to bottom
+    """
+    lines = cv2.HoughLinesP(
+        edges, 1, np.pi / 180,
+        threshold, minLineLength=min_line_length, maxLineGap=0
+    )
+    if lines is None:
+        return []
+
+    clear_lines = []
+    for line in lines:
+        x1, y1, x2, y2 = line[0]
+        angle = abs(y2 - y1) / abs(x2 - x1 + 0.001)
+        if angle < 0.1:
+            clear_lines.append([x1, y1, x2, y2])
+    if not clear_lines:
+        return []
+
+    sorted_lines = sorted(clear_lines, key=lambda x: x[1])
+    clear_lines = [sorted_lines[0]]
+    eps = 10
+    for previous, line in zip(sorted_lines, sorted_lines[1:]):
+        if (
+            (abs(line[1] - previous[1]) < eps or abs(line[3] - previous[3]) < eps)
+            and (abs(line[0] - previous[0]) < eps or abs(line[2] - previous[2]) < eps)
+        ):
+            continue
+        clear_lines.append(line)
+    return clear_lines
+
+
+def draw_lines(page: np.ndarray, lines: list[list[int]], path: str) -> None:
+    """
+    Save the page with detected lines for debugging
+
+    :param page: RGB page
+    :param lines: list of lines
+    :param path: path to image file
+    :return:
+        None
+    """
+    page = cv2.cvtColor(page, cv2.COLOR_RGB2BGR)
+    for x1, y1, x2, y2 in lines:
+        cv2.line(page, (x1, y1), (x2, y2), (0, 0, 255), 2)
+    cv2.imwrite(path, page)
@@ -0,0 +1,124 @@
+import atexit
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Any, Callable, Iterable, Iterator
+import numpy as np
+from pdf2image import convert_from_path
+from documents_parser import settings
+from documents_parser.utils.document import DocumentContext
+from documents_parser.utils.extraction import get_engine
+from documents_parser.utils.quality import get_tier, quality_tier
+
+logger = logging.getLogger("dev")
+
+_pools: dict[int, ProcessPoolExecutor] = {}
+
+
+def get_workers(workers: int | None = None) -> int:
+    """
+    Resolve number of workers
+
+    :param workers: requested number of workers, None for the setting
+    :return:
+        Number of workers
+    """
+    return settings.WORKERS if workers is None else max(int(workers), 1)
+
+
+def get_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    Get process pool of the given size. Pools are kept for the life
+    of the process, so OCR engines in workers are reused across documents.
+
+    :param workers: number of processes
+    :return:
+        Process pool
+    """
+    if workers not in _pools:
+        logger.info(f"Start process pool with {workers} workers")
+        _pools[workers] = ProcessPoolExecutor(max_workers=workers)
+    return _pools[workers]
+
+
+@atexit.register
+def shutdown_pools() -> None:
+    """
+    Stop all process pools
+
+    :return:
+        None
+    """
+    for pool in _pools.values():
+        pool.shutdown(cancel_futures=True)
+    _pools.clear()
+
+
+def run_parallel(func: Callable, items: Iterable, workers: int | None = None) -> list[Any]:
+    """
+    Apply function to items in the process pool, results are in the items order
+
+    :param func: picklable function
+    :param items: function arguments
+    :param workers: number of processes, None for the setting
+    :return:
+        list of results
+    """
+    items = list(items)
+    workers = get_workers(workers)
+    if workers <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+    return list(get_pool(workers).map(func, items))
+
+
+def ocr_page(
+    pdf_path: str, index: int, dpi: int, width: float = 1.0, tier: str | None = None
+) -> str:
+    """
+    Render and recognize single page in a worker process
+
+    :param pdf_path: path to pdf file
+    :param index: zero-based page number
+    :param dpi: render resolution, the resolution of the tier to skip resampling
+    :param width: part of the page width to recognize, from the left
+    :param tier: quality tier of the document
+    :return:
+        Raw recognized text
+    """
+    page = convert_from_path(pdf_path, dpi=dpi, first_page=index + 1, last_page=index + 1)[0]
+    img = np.array(page)
+    with quality_tier(tier):
+        return get_engine().recognize(img[:, :int(img.shape[1] * width)], dpi=dpi)
+
+
+def ocr_pages(
+    context: DocumentContext, width: float = 1.0,
+    reverse: bool = False, workers: int | None = None
+) -> Iterator[str]:
+    """
+    Recognize pages of the document in page order. With several workers
+    pages are rendered and recognized in the process pool in chunks
+    of the pool size, so the consumer can still stop early.
+
+    :param context: opened document
+    :param width: part of the page width to recognize, from the left
+    :param reverse: iterate from the last page
+    :param workers: number of processes, None for the setting
+    :return:
+        iterator over raw recognized texts
+    """
+    workers = get_workers(workers)
+    if workers <= 1:
+        for page in context.iter_pages(reverse=reverse):
+            img = np.array(page)
+            yield get_engine().recognize(img[:, :int(img.shape[1] * width)], dpi=context.dpi)
+        return
+
+    indexes = list(range(context.page_count))
+    if reverse:
+        indexes.reverse()
+    # workers render the pages themselves, right at the tier resolution
+    tier = get_tier()
+    task = partial(ocr_page, context.pdf_path, dpi=tier.dpi, width=width, tier=tier.name)
+    for start in range(0, len(indexes), workers):
+        yield from get_pool(workers).map(task, indexes[start:start + workers])
@@ -0,0 +1,203 @@
+import cProfile
+import inspect
+import io
+import json
+import logging
+import pstats
+import random
+import re
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
+from typing import Callable, Iterator
+from documents_parser import settings
+from documents_parser.utils.timing import collect, summarize_spans
+
+logger = logging.getLogger("dev")
+
+# Stages which run external programs and their names in the profile
+EXTERNAL_STAGES = {
+    "rasterize": "poppler",
+    "tesseract": "tesseract",
+    "ghostscript": "ghostscript",
+}
+# Number of the functions and allocation sites in the profile summary
+TOP_FUNCTIONS = 30
+TOP_ALLOCATIONS = 20
+# Frames stored by tracemalloc for each allocation
+TRACEMALLOC_FRAMES = 5
+
+# cProfile can't be nested, the outer profile covers the inner entry points
+_active = threading.local()
+
+
+def sampled(rate: float | None = None) -> bool:
+    """
+    Decide whether the document is profiled
+
+    :param rate: fraction of profiled documents, setting by default
+    :return:
+        True if the document should be profiled
+    """
+    rate = settings.PROFILE_RATE if rate is None else rate
+    return rate > 0 and random.random() < rate
+
+
+def profile_stem(directory: str | Path, name: str, label: str = "document") -> Path:
+    """
+    Path of the profile files without the extension
+
+    :param directory: profile directory
+    :param name: document path or name
+    :param label: profiled entry point
+    :return:
+        path, unique for the document and the time
+    """
+    stem = re.sub(r"[^\w.-]+", "_", Path(name).stem)
+    suffix = f"{time.strftime('%Y%m%d-%H%M%S')}.{random.randrange(16 ** 4):04x}"
+    return Path(directory) / f"{stem}.{label}.{suffix}"
+
+
+@contextmanager
+def profiling(stem: str | Path) -> Iterator[dict | None]:
+    """
+    Profile the block: cProfile stats are written to `<stem>.prof`,
+    the summary with the top functions, the top allocations of
+    tracemalloc and the time of external programs to `<stem>.json`.
+    Nested calls are covered by the outer profile.
+
+    :param stem: path of the profile files without the extension
+    :return:
+        summary dict, filled on exit, None if another profile is active
+    """
+    if getattr(_active, "profiling", False):
+        yield None
+        return
+
+    stem = Path(stem)
+    summary = {}
+    profiler = cProfile.Profile()
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+    tracemalloc.reset_peak()
+    _active.profiling = True
+    start = time.perf_counter()
+    try:
+        with collect() as spans:
+            profiler.enable()
+            try:
+                yield summary
+            finally:
+                profiler.disable()
+    finally:
+        _active.profiling = False
+        elapsed = time.perf_counter() - start
+        snapshot = tracemalloc.take_snapshot()
+        peak = tracemalloc.get_traced_memory()[1]
+        if not tracing:
+            tracemalloc.stop()
+        summary.update(
+            seconds=round(elapsed, 3),
+            external=external_times(spans),
+            stages=summarize_spans(spans),
+            peak_traced_mb=round(peak / 2 ** 20, 1),
+            top_functions=top_functions(profiler),
+            top_allocations=top_allocations(snapshot),
+        )
+        try:
+            stem.parent.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(f"{stem}.prof")
+            with open(f"{stem}.json", "w", encoding="utf-8") as f:
+                json.dump(summary, f, ensure_ascii=False, indent=1)
+        except OSError as e:
+            logger.warning(f"Can't save the profile {stem}: {e!r}")
+        else:
+            summary["path"] = f"{stem}.json"
+
+
+def external_times(spans: list) -> dict[str, float]:
+    """
+    Time of the external programs
+
+    :param spans: spans of the profiled block
+    :return:
+        dict of program -> seconds
+    """
+    times = {name: 0.0 for name in EXTERNAL_STAGES.values()}
+    for span in spans:
+        if span.name in EXTERNAL_STAGES:
+            times[EXTERNAL_STAGES[span.name]] = round(times[EXTERNAL_STAGES[span.name]] + span.seconds, 3)
+    return times
+
+
+def top_functions(profiler: cProfile.Profile, limit: int = TOP_FUNCTIONS) -> list[dict]:
+    """
+    Functions with the largest cumulative time
+
+    :param profiler: finished profiler
+    :param limit: number of functions
+    :return:
+        list of dicts with function, calls, own and cumulative time
+    """
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    rows = [
+        {
+            "function": f"{file}:{line}({name})",
+            "calls": calls,
+            "tottime": round(tottime, 4),
+            "cumtime": round(cumtime, 4),
+        }
+        for (file, line, name), (_, calls, tottime, cumtime, _) in stats.stats.items()
+    ]
+    return sorted(rows, key=lambda row: row["cumtime"], reverse=True)[:limit]
+
+
+def top_allocations(snapshot: tracemalloc.Snapshot, limit: int = TOP_ALLOCATIONS) -> list[dict]:
+    """
+    Allocation sites holding the most memory at the end of the block
+
+    :param snapshot: tracemalloc snapshot
+    :param limit: number of sites
+    :return:
+        list of dicts with location, size and number of blocks
+    """
+    snapshot = snapshot.filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+    return [
+        {
+            "location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+            "size_kb": round(stat.size / 1024, 1),
+            "count": stat.count,
+        }
+        for stat in snapshot.statistics("lineno")[:limit]
+    ]
+
+
+def profiled(func: Callable) -> Callable:
+    """
+    Profile the sampled calls of the entry point into PROFILE_DIR,
+    the document is taken from the `context` or the first argument,
+    passed by position or by its name
+
+    :param func: entry point
+    :return:
+        wrapped function
+    """
+    signature = inspect.signature(func)
+    first = next(iter(signature.parameters), None)
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if not settings.PROFILE_DIR or getattr(_active, "profiling", False) or not sampled():
+            return func(*args, **kwargs)
+        arguments = signature.bind_partial(*args, **kwargs).arguments
+        context = arguments.get("context")
+        name = context.pdf_path if context is not None else str(arguments.get(first))
+        with profiling(profile_stem(settings.PROFILE_DIR, name, func.__name__)) as summary:
+            result = func(*args, **kwargs)
+        logger.info(f"{func.__name__} profile: {summary.get('path')}")
+        return result
+    return wrapper
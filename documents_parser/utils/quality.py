@@ -0,0 +1,136 @@
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Iterator, NamedTuple
+import cv2
+import numpy as np
+from documents_parser import settings
+from documents_parser.utils.document import DPI
+
+logger = logging.getLogger("dev")
+
+TIER_FAST = "fast"
+TIER_BALANCED = "balanced"
+TIER_ACCURATE = "accurate"
+
+# Preprocessing of the images before OCR, each level includes the previous ones
+PREPROCESS_NONE = 0
+PREPROCESS_BINARIZE = 1
+PREPROCESS_DENOISE = 2
+# Aperture of the median filter of the denoising
+DENOISE_KERNEL = 3
+
+
+class QualityTier(NamedTuple):
+    """
+    Trade-off of OCR speed and accuracy: variant of the traineddata
+    (subdirectory of TESSDATA_DIR, the system model if empty),
+    resolution of the images passed to tesseract and preprocessing level
+    """
+    name: str
+    model: str
+    dpi: int
+    preprocessing: int
+
+
+# Header regions are cut from the pages rendered at DPI, the parser geometry is set for it,
+# so they are resampled to the tier resolution, pages of the full page OCR are rendered at it
+TIERS = {
+    TIER_FAST: QualityTier(TIER_FAST, "fast", 150, PREPROCESS_NONE),
+    TIER_BALANCED: QualityTier(TIER_BALANCED, "", DPI, PREPROCESS_NONE),
+    TIER_ACCURATE: QualityTier(TIER_ACCURATE, "best", 300, PREPROCESS_DENOISE),
+}
+
+# Tier chosen for the current document, per thread and task
+_tier: ContextVar[str | None] = ContextVar("quality_tier", default=None)
+
+
+def get_tier(name: str | None = None) -> QualityTier:
+    """
+    Resolve the quality tier
+
+    :param name: tier name, None for the tier of the current document or the setting
+    :return:
+        Quality tier
+    """
+    name = name or _tier.get() or settings.QUALITY_TIER
+    if name not in TIERS:
+        raise ValueError(f"Unknown quality tier: {name}, should be one of {tuple(TIERS)}")
+    return TIERS[name]
+
+
+@contextmanager
+def quality_tier(name: str | None) -> Iterator[QualityTier]:
+    """
+    Use the tier for OCR in the block
+
+    :param name: tier name, None to keep the current one
+    :return:
+        Quality tier of the block
+    """
+    tier = get_tier(name)
+    token = _tier.set(tier.name)
+    try:
+        yield tier
+    finally:
+        _tier.reset(token)
+
+
+def tessdata_dir(tier: QualityTier, lang: str) -> str | None:
+    """
+    Directory with the traineddata of the tier
+
+    :param tier: quality tier
+    :param lang: tesseract language
+    :return:
+        path or None for the system model
+    """
+    if not tier.model:
+        return None
+    if not settings.TESSDATA_DIR:
+        logger.warning(f"TESSDATA_DIR is not set, the system model is used for the {tier.name} tier")
+        return None
+    path = Path(settings.TESSDATA_DIR) / tier.model
+    if not (path / f"{lang}.traineddata").is_file():
+        logger.warning(f"{path / lang}.traineddata is not found, the system model is used")
+        return None
+    return str(path)
+
+
+def prepare_image(img: np.ndarray, tier: QualityTier, dpi: int = DPI) -> (np.ndarray, float):
+    """
+    Resample and preprocess the image for OCR
+
+    :param img: image
+    :param tier: quality tier
+    :param dpi: resolution of the image
+    :return:
+        image, scale factor of the coordinates
+    """
+    scale = tier.dpi / dpi
+    if img.size == 0:
+        return img, scale
+    if scale != 1:
+        img = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
+    if tier.preprocessing >= PREPROCESS_BINARIZE:
+        if img.ndim == 3:
+            img = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
+        if tier.preprocessing >= PREPROCESS_DENOISE:
+            img = cv2.medianBlur(img, DENOISE_KERNEL)
+        _, img = cv2.threshold(img, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return img, scale
+
+
+def scale_box(box: tuple[int, int, int, int], scale: float) -> tuple[int, int, int, int]:
+    """
+    Box on the resampled image
+
+    :param box: (x, y, width, height)
+    :param scale: scale factor
+    :return:
+        (x, y, width, height)
+    """
+    if scale == 1:
+        return box
+    return tuple(round(value * scale) for value in box)
@@ -0,0 +1,326 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import NamedTuple
+import numpy as np
+from documents_parser import __version__, settings
+from documents_parser.utils.extraction import roi_to_box
+from documents_parser.utils.lines import SCALE, detect_lines
+from documents_parser.utils.timing import timed
+
+logger = logging.getLogger("dev")
+
+# Part of the page height with the header rules
+HEADER_BAND = 0.3
+# Minimal length of the rule in page pixels
+MIN_LINE_LENGTH = 300
+# Largest distance (in page pixels) between the rows of the matched rules
+# and between their ends or the page sizes: scan noise, skew and shifts
+# of a few pixels keep the template, its ROIs are off by this much at most
+ROW_TOLERANCE = 8
+END_TOLERANCE = 16
+# File with learned templates in the cache directory
+TEMPLATES_FILE = "templates.json"
+# Bump when the stored templates change
+TEMPLATES_FORMAT = 3
+
+
+class LayoutProbe(NamedTuple):
+    """
+    Header fingerprint of the page: the layout it belongs to and
+    the rules [x1, y1, x2, y2] of the header band in page pixels.
+    The parsers search the rest of the page from `bottom`.
+    """
+    layout: str
+    lines: list[list[int]]
+    shape: tuple[int, int]
+    # height of the header band in pixels
+    bottom: int
+
+
+def fingerprint(gray: np.ndarray, name: str, band: float = HEADER_BAND, **params) -> LayoutProbe:
+    """
+    Fingerprint of the header layout: long horizontal rules of the
+    header band. Pages are compared by the rule positions with
+    a tolerance, see `match_rules`, so the same layout matches under
+    scan noise, skew and small shifts. The rules are the header lines
+    of the parsers, the rest of the page is searched separately.
+
+    :param gray: grayscale page
+    :param name: layout name, e.g. form type
+    :param band: part of the page height with the rules
+    :param params: parameters which change the ROIs
+    :return:
+        Layout probe
+    """
+    # the band ends on a multiple of the downscale factor, so the band
+    # and the rest of the page are sampled as the whole page
+    bottom = int(gray.shape[0] * band) // SCALE * SCALE
+    lines = detect_lines(gray[:bottom], MIN_LINE_LENGTH)
+    payload = json.dumps(
+        {"name": name, "band": band, "version": __version__, "format": TEMPLATES_FORMAT, "params": params},
+        sort_keys=True, ensure_ascii=False,
+    )
+    return LayoutProbe(
+        hashlib.sha256(payload.encode("utf-8")).hexdigest(), lines,
+        tuple(int(value) for value in gray.shape[:2]), bottom,
+    )
+
+
+def match_rules(
+    lines: list[list[int]], shape: tuple, other: list[list[int]], other_shape: tuple
+) -> int | None:
+    """
+    Compare header rules of two pages by the rows and the ends
+
+    :param lines: rules [x1, y1, x2, y2] of the page
+    :param shape: page shape
+    :param other: rules of the other page
+    :param other_shape: shape of the other page
+    :return:
+        largest distance in pixels or None if the layouts differ
+    """
+    if not lines or len(lines) != len(other):
+        return None
+    sizes = np.abs(np.subtract(shape[:2], other_shape[:2]))
+    difference = np.abs(np.subtract(lines, other))[:, :3]
+    rows, ends = difference[:, 1], difference[:, [0, 2]]
+    if sizes.max() > END_TOLERANCE or rows.max() > ROW_TOLERANCE or ends.max() > END_TOLERANCE:
+        return None
+    return int(max(sizes.max(), difference.max()))
+
+
+class LayoutTemplate(NamedTuple):
+    """
+    Header geometry of the layout: ROIs as (x, y, width, height) boxes
+    normalized by the page size, with the fingerprint of the page
+    it is learned from
+    """
+    boxes: dict[str, tuple[float, float, float, float]]
+    layout: str
+    lines: list[list[int]]
+    shape: tuple[int, int]
+
+    @classmethod
+    def learn(cls, probe: LayoutProbe, rois: dict[str, tuple[slice, slice]]) -> "LayoutTemplate | None":
+        """
+        Build the template from the ROIs found on the page
+
+        :param probe: fingerprint of the page
+        :param rois: dict of field -> ROI as numpy slices
+        :return:
+            Template or None if the ROIs are out of the header band,
+            they depend on the page below it
+        """
+        shape = probe.shape
+        height, width = shape
+        boxes = {}
+        for field, roi in rois.items():
+            x, y, w, h = roi_to_box(roi, shape)
+            if y + h > probe.bottom:
+                return None
+            boxes[field] = (x / width, y / height, w / width, h / height)
+        lines = [[int(value) for value in line] for line in probe.lines]
+        return cls(boxes, probe.layout, lines, shape)
+
+    @property
+    def key(self) -> str:
+        """
+        Key of the template in the registry
+
+        :return:
+            hex digest of the layout and the rules
+        """
+        payload = json.dumps([self.layout, self.lines, self.shape])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def rois(self, shape: tuple) -> dict[str, tuple[slice, slice]]:
+        """
+        ROIs of the page
+
+        :param shape: page shape
+        :return:
+            dict of field -> ROI as numpy slices
+        """
+        height, width = shape[:2]
+        rois = {}
+        for field, (x, y, w, h) in self.boxes.items():
+            x1, y1 = round(x * width), round(y * height)
+            rois[field] = np.s_[y1:y1 + round(h * height), x1:x1 + round(w * width)]
+        return rois
+
+
+class TemplateRegistry:
+    """
+    Learned layout templates, looked up by the nearest fingerprint
+    of the same layout. The least recently used templates over the
+    limit are dropped, templates are stored in a JSON
+    file when the path is set, so they survive restarts and are shared
+    by worker processes.
+    """
+
+    def __init__(self, path: str | Path | None = None, max_templates: int | None = None):
+        """
+        Initialize the registry
+
+        :param path: JSON file with templates, in-memory only if None
+        :param max_templates: limit of templates, setting by default
+        """
+        self.path = Path(path) if path is not None else None
+        self.max_templates = settings.TEMPLATES_MAX if max_templates is None else max_templates
+        self.hits = 0
+        self.misses = 0
+        self._templates: OrderedDict[str, LayoutTemplate] = OrderedDict()
+        self._lock = threading.Lock()
+        if self.path is not None:
+            self._templates.update(self._read())
+
+    def _read(self) -> dict[str, LayoutTemplate]:
+        """
+        Read templates from the file
+
+        :return:
+            dict of key -> template, templates of other formats are skipped
+        """
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                stored = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Broken templates file {self.path}: {e!r}")
+            return {}
+        templates = {}
+        for key, value in stored.items():
+            try:
+                templates[key] = LayoutTemplate(
+                    {k: tuple(v) for k, v in value["boxes"].items()},
+                    value["layout"], value["lines"], tuple(value["shape"]),
+                )
+            except (KeyError, TypeError):
+                continue
+        return templates
+
+    def _write(self) -> None:
+        """
+        Merge templates with the file and replace it
+
+        :return:
+            None
+        """
+        templates = self._read()
+        templates.update(self._templates)
+        keys = list(templates)[-self.max_templates:]
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({key: templates[key]._asdict() for key in keys}, f, ensure_ascii=False)
+        tmp.replace(self.path)
+
+    def get(self, probe: LayoutProbe) -> LayoutTemplate | None:
+        """
+        Find the nearest template of the layout and mark it as recently used
+
+        :param probe: fingerprint of the page
+        :return:
+            Template or None
+        """
+        with self._lock:
+            best, best_distance = None, None
+            for key, template in self._templates.items():
+                if template.layout != probe.layout:
+                    continue
+                distance = match_rules(probe.lines, probe.shape, template.lines, template.shape)
+                if distance is not None and (best_distance is None or distance < best_distance):
+                    best, best_distance = key, distance
+            if best is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._templates.move_to_end(best)
+            return self._templates[best]
+
+    def put(self, template: LayoutTemplate) -> None:
+        """
+        Store the template and drop old ones over the limit
+
+        :param template: template
+        :return:
+            None
+        """
+        key = template.key
+        with self._lock:
+            self._templates[key] = template
+            self._templates.move_to_end(key)
+            while len(self._templates) > self.max_templates:
+                self._templates.popitem(last=False)
+            if self.path is not None:
+                try:
+                    self._write()
+                except OSError as e:
+                    logger.warning(f"Can't save templates: {e!r}")
+
+    def __len__(self) -> int:
+        return len(self._templates)
+
+
+_registry: TemplateRegistry | None = None
+
+
+def get_registry() -> TemplateRegistry:
+    """
+    Registry of the process, stored in the cache directory if the cache is enabled
+
+    :return:
+        Template registry
+    """
+    global _registry
+    if _registry is None:
+        path = Path(settings.CACHE_DIR) / TEMPLATES_FILE if settings.CACHE_ENABLED else None
+        _registry = TemplateRegistry(path)
+    return _registry
+
+
+@timed("template")
+def find_template(
+    gray: np.ndarray, name: str, band: float = HEADER_BAND, **params
+) -> (LayoutProbe | None, LayoutTemplate | None):
+    """
+    Look up the template of the page
+
+    :param gray: grayscale page
+    :param name: layout name, e.g. form type
+    :param band: part of the page height covered by the fingerprint
+    :param params: parameters which change the ROIs
+    :return:
+        fingerprint and template, None if not found, both None if templates are disabled
+    """
+    if not settings.TEMPLATES_ENABLED:
+        return None, None
+    probe = fingerprint(gray, name, band, **params)
+    return probe, get_registry().get(probe)
+
+
+def learn_template(probe: LayoutProbe | None, rois: dict[str, tuple[slice, slice]]) -> None:
+    """
+    Store the template of the page
+
+    :param probe: fingerprint of the page, nothing is stored if None
+    :param rois: dict of field -> ROI as numpy slices
+    :return:
+        None
+    """
+    if probe is None:
+        return
+    if not probe.lines:
+        logger.info("No header rules, template is not stored")
+        return
+    template = LayoutTemplate.learn(probe, rois)
+    if template is None:
+        logger.info("Header ROIs are out of the header band, template is not stored")
+        return
+    get_registry().put(template)
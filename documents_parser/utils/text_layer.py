@@ -0,0 +1,148 @@
+import logging
+from typing import Iterable, NamedTuple
+from pdfminer.high_level import extract_pages
+from pdfminer.layout import LTTextLine
+from pdfminer.pdfparser import PDFSyntaxError
+from documents_parser.utils.timing import timed
+
+logger = logging.getLogger("dev")
+
+# Text added by the PDF converter, not a part of the document
+WATERMARKS = ("Evaluation Only. Created with Aspose",)
+# Minimal amount of characters on the page to trust the text layer
+MIN_TEXT_LENGTH = 100
+
+
+class Span(NamedTuple):
+    """
+    Line of the embedded text with its box in PDF points,
+    `top` and `bottom` are measured from the top of the page.
+    """
+    x0: float
+    top: float
+    x1: float
+    bottom: float
+    text: str
+
+
+def _iter_lines(layout_object) -> Iterable[LTTextLine]:
+    """
+    Walk over pdfminer layout tree and yield text lines
+
+    :param layout_object: pdfminer layout object
+    :return:
+        text lines
+    """
+    if isinstance(layout_object, LTTextLine):
+        yield layout_object
+        return
+    for child in getattr(layout_object, "_objs", []):
+        yield from _iter_lines(child)
+
+
+@timed("text_layer")
+def read_spans(
+    pdf_path: str, page_numbers: Iterable[int] | None = None
+) -> list[list[Span]]:
+    """
+    Read embedded text of the pdf file with positions
+
+    :param pdf_path: path to pdf file
+    :param page_numbers: zero-based numbers of pages to read, all by default
+    :return:
+        list of spans for each page, in reading order.
+        Empty list if the file can't be parsed.
+    """
+    pages = []
+    try:
+        for layout in extract_pages(pdf_path, page_numbers=page_numbers):
+            spans = []
+            for line in _iter_lines(layout):
+                text = line.get_text().replace("\xa0", " ").strip()
+                if not text or any(mark in text for mark in WATERMARKS):
+                    continue
+                spans.append(Span(
+                    line.x0, layout.height - line.y1,
+                    line.x1, layout.height - line.y0, text
+                ))
+            spans.sort(key=lambda s: (round(s.top), s.x0))
+            pages.append(spans)
+    except PDFSyntaxError as e:
+        logger.warning(f"Can't read text layer: {e}")
+        return []
+    return pages
+
+
+def has_text_layer(spans: list[Span]) -> bool:
+    """
+    Check if the page has an embedded text layer (digital, not scanned)
+
+    :param spans: spans of the page
+    :return:
+        True if there is enough text on the page
+    """
+    return sum(len(span.text) for span in spans) >= MIN_TEXT_LENGTH
+
+
+def find_span(spans: list[Span], label: str) -> Span | None:
+    """
+    Find the first span containing the label
+
+    :param spans: spans of the page
+    :param label: searched text
+    :return:
+        Span or None
+    """
+    for span in spans:
+        if label in span.text:
+            return span
+    return None
+
+
+def right_of(spans: list[Span], anchor: Span) -> list[Span]:
+    """
+    Spans on the same row to the right of the anchor
+
+    :param spans: spans of the page
+    :param anchor: anchor span
+    :return:
+        list of spans sorted from left to right
+    """
+    row = [
+        span for span in spans
+        if span.x0 >= anchor.x1 - 1
+        and span.top < anchor.bottom and span.bottom > anchor.top
+    ]
+    return sorted(row, key=lambda s: s.x0)
+
+
+def in_box(
+    spans: list[Span], top: float, bottom: float,
+    x0: float = float("-inf"), x1: float = float("inf")
+) -> list[Span]:
+    """
+    Spans which start inside the box
+
+    :param spans: spans of the page
+    :param top: upper bound
+    :param bottom: lower bound
+    :param x0: left bound
+    :param x1: right bound
+    :return:
+        list of spans in reading order
+    """
+    return [
+        span for span in spans
+        if top <= span.top < bottom and x0 <= span.x0 < x1
+    ]
+
+
+def join(spans: Iterable[Span]) -> str:
+    """
+    Join text of spans into a single line
+
+    :param spans: spans
+    :return:
+        Joined text
+    """
+    return " ".join(span.text for span in spans).strip()
@@ -0,0 +1,224 @@
+import json
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, NamedTuple
+
+# Prefix of the exported Prometheus metrics
+METRICS_PREFIX = "documents_parser"
+
+
+class Span(NamedTuple):
+    """
+    Measured stage: name, start as unix time, wall time and tags
+    (document id, form type, page count) of the enclosing document
+    """
+    name: str
+    start: float
+    seconds: float
+    tags: dict
+
+
+# Tags of the current document and lists collecting the spans, per thread and task
+_NO_TAGS: dict = {}
+_tags: ContextVar[dict] = ContextVar("timing_tags", default=_NO_TAGS)
+_collectors: ContextVar[tuple[list, ...]] = ContextVar("timing_collectors", default=())
+# Total time and number of calls of the stages in this process by (stage, form)
+_totals: dict[tuple[str, str], float] = defaultdict(float)
+_calls: dict[tuple[str, str], int] = defaultdict(int)
+_lock = threading.Lock()
+
+
+def _add(name: str, form: str, seconds: float, calls: int = 1) -> None:
+    with _lock:
+        _totals[name, form] += seconds
+        _calls[name, form] += calls
+
+
+@contextmanager
+def stage(name: str, **tags) -> Iterator[None]:
+    """
+    Measure wall time of the block. Stages may be nested,
+    the time of a stage includes its inner stages.
+
+    :param name: stage name
+    :param tags: tags of the span in addition to the document tags
+    :return:
+        None
+    """
+    start = time.time()
+    counter = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - counter
+        tags = {**_tags.get(), **tags}
+        _add(name, str(tags.get("form", "")), elapsed)
+        collectors = _collectors.get()
+        if collectors:
+            span = Span(name, round(start, 6), round(elapsed, 6), tags)
+            for spans in collectors:
+                spans.append(span)
+
+
+def timed(name: str | None = None) -> Callable:
+    """
+    Decorator measuring each call of the function as a stage
+
+    :param name: stage name, function name by default
+    :return:
+        decorator
+    """
+    def decorator(func: Callable) -> Callable:
+        stage_name = name or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(stage_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def tagged(**tags) -> Iterator[dict]:
+    """
+    Tag the spans of the block, e.g. with the document id.
+    More tags can be added to the yielded dict later, when they are known.
+
+    :param tags: tags
+    :return:
+        dict of the tags of the block
+    """
+    current = {**_tags.get(), **tags}
+    token = _tags.set(current)
+    try:
+        yield current
+    finally:
+        _tags.reset(token)
+
+
+def tag(**tags) -> None:
+    """
+    Add tags to the innermost `tagged` block from the code inside it,
+    e.g. when they are known only there. Outside of the blocks tags are dropped.
+
+    :param tags: tags
+    :return:
+        None
+    """
+    current = _tags.get()
+    if current is not _NO_TAGS:
+        current.update(tags)
+
+
+@contextmanager
+def collect() -> Iterator[list[Span]]:
+    """
+    Collect the spans of the block
+
+    :return:
+        list filled with the spans when they finish
+    """
+    spans = []
+    token = _collectors.set(_collectors.get() + (spans,))
+    try:
+        yield spans
+    finally:
+        _collectors.reset(token)
+
+
+def summarize_spans(spans: Iterable[Span]) -> dict[str, dict[str, float]]:
+    """
+    Total time and number of calls of the stages
+
+    :param spans: spans
+    :return:
+        dict of stage -> {"seconds": total time, "calls": number of calls}
+    """
+    stages = {}
+    for span in spans:
+        totals = stages.setdefault(span.name, {"seconds": 0.0, "calls": 0})
+        totals["seconds"] = round(totals["seconds"] + span.seconds, 6)
+        totals["calls"] += 1
+    return stages
+
+
+def record_stages(stages: dict[str, dict[str, float]], form: str | None = None) -> None:
+    """
+    Add stages measured in another process, e.g. in the pool worker
+
+    :param stages: result of summarize_spans
+    :param form: form type of the document
+    :return:
+        None
+    """
+    for name, totals in stages.items():
+        _add(name, form or "", totals["seconds"], totals["calls"])
+
+
+def stage_times(reset: bool = False) -> dict[str, dict[str, float]]:
+    """
+    Stages measured in this process
+
+    :param reset: clear the measurements
+    :return:
+        dict of stage -> {"seconds": total time, "calls": number of calls}
+    """
+    with _lock:
+        times = {}
+        for (name, form), seconds in sorted(_totals.items()):
+            totals = times.setdefault(name, {"seconds": 0.0, "calls": 0})
+            totals["seconds"] = round(totals["seconds"] + seconds, 6)
+            totals["calls"] += _calls[name, form]
+        if reset:
+            _totals.clear()
+            _calls.clear()
+    return times
+
+
+def export_jsonl(spans: Iterable[Span], path: str | Path) -> None:
+    """
+    Append spans to the JSON lines file
+
+    :param spans: spans
+    :param path: path to the file
+    :return:
+        None
+    """
+    lines = "".join(json.dumps(span._asdict(), ensure_ascii=False) + "\n" for span in spans)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(lines)
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def prometheus_text() -> str:
+    """
+    Stages measured in this process in Prometheus text format.
+    Document ids are not labels, they are only in the spans.
+
+    :return:
+        metrics text
+    """
+    with _lock:
+        totals, calls = dict(_totals), dict(_calls)
+    metrics = [
+        ("stage_seconds_total", "Time spent in the pipeline stage", totals),
+        ("stage_calls_total", "Number of calls of the pipeline stage", calls),
+    ]
+    lines = []
+    for metric, description, values in metrics:
+        lines.append(f"# HELP {METRICS_PREFIX}_{metric} {description}")
+        lines.append(f"# TYPE {METRICS_PREFIX}_{metric} counter")
+        for (name, form), value in sorted(values.items()):
+            lines.append(
+                f'{METRICS_PREFIX}_{metric}{{stage="{_label(name)}",form="{_label(form)}"}} {round(value, 6)}'
+            )
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,67 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError
+from urllib.parse import quote
+from urllib.request import Request, urlopen
+import pytest
+from documents_parser.api import ApiServer
+from documents_parser.utils.jobs import JobQueue
+
+release = threading.Event()
+
+
+def fake_worker(data: bytes, form: str, tier: str | None = None) -> dict:
+    if data == b"wait":
+        release.wait(5)
+    return {"form": form, "tier": tier, "status": "Принято", "reasons": [], "size": len(data)}
+
+
+@pytest.fixture
+def server():
+    queue = JobQueue(max_pending=1, executor=ThreadPoolExecutor(max_workers=1))
+    server = ApiServer(("127.0.0.1", 0), queue, worker=fake_worker, sync_timeout=5)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    release.set()
+    server.shutdown()
+    server.server_close()
+    queue.shutdown()
+
+
+def request(url: str, data: bytes | None = None) -> (int, dict):
+    try:
+        with urlopen(Request(url, data=data), timeout=5) as response:
+            return response.status, json.loads(response.read())
+    except HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_sync_async_and_backpressure(server):
+    release.clear()
+    validate = f"{server}/validate?form={quote('М-11')}"
+
+    status, payload = request(validate, b"%PDF")
+    assert status == 200
+    assert payload["result"]["status"] == "Принято"
+
+    assert request(f"{server}/validate?form=X", b"%PDF")[0] == 400
+    assert request(f"{server}/validate?tier=slow", b"%PDF")[0] == 400
+    assert request(f"{server}/validate?tier=fast", b"%PDF-fast")[1]["result"]["tier"] == "fast"
+    # the form is detected by the worker
+    assert request(f"{server}/validate", b"%PDF-auto")[1]["result"]["form"] is None
+
+    status, payload = request(validate + "&mode=async", b"wait")
+    assert status == 202
+    job_url = f"{server}/jobs/{payload['id']}"
+    assert request(validate + "&mode=async", b"%PDF-other")[0] == 429
+
+    release.set()
+    for _ in range(50):
+        status, payload = request(job_url)
+        if status == 200:
+            break
+        threading.Event().wait(0.1)
+    assert payload["result"]["size"] == 4
+    assert request(f"{server}/jobs/unknown")[0] == 404
@@ -0,0 +1,84 @@
+import os
+import pandas as pd
+from documents_parser.utils.cache import ResultCache, cache_key, file_hash
+
+
+def test_cache_key_depends_on_content_and_params(tmp_path):
+    first, second = tmp_path / "a.pdf", tmp_path / "b.pdf"
+    first.write_bytes(b"%PDF-1.4 first")
+    second.write_bytes(b"%PDF-1.4 second")
+    digest = file_hash(first)
+    assert cache_key(digest, form="М-11") == cache_key(file_hash(first), form="М-11")
+    assert cache_key(digest, form="М-11") != cache_key(file_hash(second), form="М-11")
+    assert cache_key(digest, form="М-11") != cache_key(digest, form="ФМУ-76")
+
+
+def test_cache_round_trip_and_lru_eviction(tmp_path):
+    cache = ResultCache(tmp_path, max_size_mb=1)
+    report = pd.DataFrame({"Значение": ["00006078", "0315006"]}, index=["Номер", "ОКУД"])
+    cache.put("report", (report, [report]))
+    cached_report, cached_tables = cache.get("report")
+    pd.testing.assert_frame_equal(cached_report, report)
+    assert len(cached_tables) == 1
+    assert cache.get("missing") is None
+
+    # incompressible payloads, two of them fit under the cap
+    cache = ResultCache(tmp_path / "lru", max_size_mb=1)
+    cache.put("old", os.urandom(400_000))
+    cache.put("used", os.urandom(400_000))
+    os.utime(cache.path / "old.pkl.gz", (100, 100))
+    os.utime(cache.path / "used.pkl.gz", (200, 200))
+    assert cache.get("old") is not None  # reading marks the entry as recently used
+    cache.put("new", os.urandom(400_000))
+    assert cache.get("used") is None
+    assert cache.get("old") is not None
+    assert cache.get("new") is not None
+
+
+def test_cache_key_depends_on_output_settings(monkeypatch):
+    from documents_parser import settings
+    from documents_parser.pipeline import output_settings
+
+    keys = {cache_key("digest", form="М-11", **output_settings())}
+    for name in ("TABLES_SCOPED", "TEMPLATES_ENABLED", "OCR_FIELD_PROFILES"):
+        monkeypatch.setattr(settings, name, not getattr(settings, name))
+        keys.add(cache_key("digest", form="М-11", **output_settings()))
+    assert len(keys) == 4
+
+
+def test_cache_hit_skips_form_detection_and_rendering(tmp_path, monkeypatch):
+    from PyPDF2 import PdfWriter
+    from documents_parser import pipeline, settings
+    from documents_parser.parser.classifier import FORM_M11, FormGuess
+    from documents_parser.utils.document import DocumentContext
+
+    writer = PdfWriter()
+    writer.add_blank_page(width=72, height=72)
+    with open(tmp_path / "doc.pdf", "wb") as f:
+        writer.write(f)
+    monkeypatch.setattr(settings, "CACHE_DIR", str(tmp_path / "cache"))
+    report = pd.DataFrame({"Значение": ["00006078"]}, index=["Номер"])
+    monkeypatch.setattr(pipeline, "classify_document", lambda context, name: FormGuess(FORM_M11, 0.99, "text"))
+    monkeypatch.setattr(pipeline, "_parse_document", lambda *args: (report, []))
+    guess, _, _ = pipeline.parse_document(tmp_path / "doc.pdf", use_cache=True)
+    assert guess.form == FORM_M11
+
+    def fail(*args, **kwargs):
+        raise AssertionError("the document is processed again")
+
+    monkeypatch.setattr(pipeline, "classify_document", fail)
+    monkeypatch.setattr(pipeline, "_parse_document", fail)
+    monkeypatch.setattr(DocumentContext, "_render", fail)
+    context = DocumentContext(str(tmp_path / "doc.pdf"))
+    cached_guess, cached_report, _ = pipeline.parse_document(tmp_path / "doc.pdf", use_cache=True, context=context)
+    assert cached_guess == guess
+    pd.testing.assert_frame_equal(cached_report, report)
+
+    hashed = []
+    digest = pipeline.file_hash
+    monkeypatch.setattr(pipeline, "file_hash", lambda path: hashed.append(path) or digest(path))
+    monkeypatch.setattr(pipeline, "DocumentContext", fail)
+    result = pipeline.process_document(tmp_path / "doc.pdf", use_cache=True)
+    assert "processed again" not in str(result["reasons"])
+    assert result["form"] == FORM_M11
+    assert len(hashed) == 1
@@ -0,0 +1,17 @@
+from documents_parser.parser.classifier import FORM_FMU76, FORM_M11, guess_from_name, match_markers
+
+
+def test_markers_of_the_page_text():
+    guess = match_markers("Типовая межотраслевая форма № М-11 ... Форма по ОКУД 0315006", "text")
+    assert guess.form == FORM_M11 and guess.confidence == 0.99
+    guess = match_markers('Специализированная форма № ФМУ-76 Форма по ОКУД 0315835 АКТ на списание материальных', "ocr")
+    assert guess.form == FORM_FMU76 and guess.confidence == 0.999
+    # the other form is mentioned, confidence drops
+    assert match_markers("форма ФМУ-76, 0315835, см. М-11", "text").confidence < 0.7
+    assert match_markers("Счет-фактура № 1100", "text").form is None
+
+
+def test_guess_from_name():
+    assert guess_from_name("data/ФМУ-76/Принято/ФМУ76_818_22.05.2023.pdf") == FORM_FMU76
+    assert guess_from_name("М11_2049_ 01.01.2023.pdf") == FORM_M11
+    assert guess_from_name("upload_x1y2.pdf") is None
@@ -0,0 +1,58 @@
+import numpy as np
+import pytesseract
+from documents_parser.utils import extraction
+from documents_parser.utils.extraction import DIGITS, PSM_LINE, OcrProfile, PytesseractEngine, roi_to_box
+
+
+def test_roi_to_box_matches_numpy_slicing():
+    img = np.zeros((300, 2000), dtype=np.uint8)
+    for roi in [np.s_[30:170, 1000:1600], np.s_[210:250, -390:-100], np.s_[-20:40, 0:]]:
+        x, y, w, h = roi_to_box(roi, img.shape)
+        assert img[roi].shape == (h, w)
+        assert img[y:y + h, x:x + w].shape == img[roi].shape
+
+
+def test_pytesseract_batch_assigns_words_to_tiles(monkeypatch):
+    img = np.full((100, 200), 255, dtype=np.uint8)
+    boxes = {"first": (0, 0, 100, 20), "second": (0, 50, 100, 30), "empty": (0, 0, 0, 0)}
+    gap = extraction.TILE_GAP
+
+    def image_to_data(canvas, lang, config, output_type):
+        assert canvas.shape[0] == 20 + 30 + 3 * gap
+        tops = [gap + 2, gap + 2, 2 * gap + 20 + 5]
+        return {
+            "text": ["Через", "кого", "Иванов"],
+            "top": tops,
+            "height": [10, 10, 10],
+            "block_num": [1, 1, 1],
+            "par_num": [1, 1, 1],
+            "line_num": [1, 1, 2],
+            "word_num": [1, 2, 1],
+        }
+
+    monkeypatch.setattr(pytesseract, "image_to_data", image_to_data)
+    texts = PytesseractEngine().recognize_many(img, boxes)
+    assert texts == {"first": "Через кого", "second": "Иванов", "empty": ""}
+
+
+def test_pytesseract_single_line_profiles_are_not_tiled(monkeypatch):
+    img = np.full((100, 200), 255, dtype=np.uint8)
+    boxes = {"name": (0, 0, 100, 20), "date": (0, 50, 100, 30)}
+    profile = OcrProfile(PSM_LINE, DIGITS + ".")
+    assert profile.config() == "--psm 7 -c tessedit_char_whitelist=0123456789."
+    calls = []
+
+    def image_to_string(crop, lang, config):
+        calls.append(("string", crop.shape, config))
+        return "01.02.2023\n"
+
+    def image_to_data(canvas, lang, config, output_type):
+        calls.append(("data", canvas.shape, config))
+        return {key: [] for key in ("text", "top", "height", "block_num", "par_num", "line_num", "word_num")}
+
+    monkeypatch.setattr(pytesseract, "image_to_string", image_to_string)
+    monkeypatch.setattr(pytesseract, "image_to_data", image_to_data)
+    texts = PytesseractEngine().recognize_many(img, boxes, {"date": profile})
+    assert texts == {"name": "", "date": "01.02.2023\n"}
+    assert ("string", (30, 100), profile.config()) in calls
+    assert [call[0] for call in calls].count("data") == 1
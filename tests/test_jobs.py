@@ -0,0 +1,37 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from documents_parser.utils.jobs import JobQueue, QueueFull, STATUS_DONE, STATUS_FAILED
+
+
+def test_job_queue_bounds_and_deduplicates():
+    release = threading.Event()
+    queue = JobQueue(max_pending=2, executor=ThreadPoolExecutor(max_workers=1))
+
+    first = queue.submit(release.wait, name="first.pdf", key="a")
+    assert queue.submit(release.wait, name="copy.pdf", key="a") is first
+    queue.submit(release.wait, name="second.pdf", key="b")
+    with pytest.raises(QueueFull):
+        queue.submit(release.wait, name="third.pdf", key="c")
+
+    release.set()
+    assert first.result(timeout=5) is True
+    assert first.status == STATUS_DONE
+    assert queue.get(first.id) is first
+
+    failed = queue.submit(int, "not a number", key="d")
+    failed.future.exception(timeout=5)
+    assert failed.status == STATUS_FAILED
+    assert queue.submit(int, "1", key="d") is not failed
+    queue.shutdown()
+
+
+def test_job_queue_restarts_broken_pool():
+    queue = JobQueue(workers=1, max_pending=2)
+    # the worker dies, the pool is broken
+    crashed = queue.submit(os._exit, 1)
+    crashed.future.exception(timeout=30)
+    assert crashed.status == STATUS_FAILED
+    assert queue.submit(int, "1").result(timeout=30) == 1
+    queue.shutdown()
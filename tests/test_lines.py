@@ -0,0 +1,59 @@
+import numpy as np
+from documents_parser.utils.lines import detect_grids, detect_lines
+
+
+def test_detect_lines_finds_rules_and_skips_text():
+    page = np.full((1000, 1600), 255, dtype=np.uint8)
+    page[200:203, 100:1500] = 0
+    # rule split by a cell border is one line
+    page[600:602, 300:800] = 0
+    page[600:602, 804:1200] = 0
+    # text-like strokes and a short rule are not lines
+    page[400:430:4, 100:1500:8] = 0
+    page[800:802, 100:300] = 0
+
+    lines = detect_lines(page)
+    assert len(lines) == 2
+    (x1, y1, x2, y2), second = lines
+    assert abs(y1 - 200) <= 2 and y1 == y2
+    assert abs(x1 - 100) <= 2 and abs(x2 - 1500) <= 2
+    assert abs(second[1] - 600) <= 2
+    assert abs(second[0] - 300) <= 2 and abs(second[2] - 1200) <= 2
+
+
+def test_detect_lines_keeps_rules_of_one_row_apart():
+    page = np.full((1000, 1600), 255, dtype=np.uint8)
+    # signature rules side by side
+    page[200:202, 100:500] = 0
+    page[200:202, 900:1400] = 0
+    # rule split by a small gap is one line
+    page[600:602, 100:600] = 0
+    page[600:602, 604:1000] = 0
+
+    lines = detect_lines(page)
+    assert len(lines) == 3
+    for line, (x1, y, x2) in zip(lines, [(100, 200, 499), (900, 200, 1399), (100, 600, 999)]):
+        assert abs(line[0] - x1) <= 2 and abs(line[1] - y) <= 2 and abs(line[2] - x2) <= 2
+
+
+def test_detect_lines_on_empty_page():
+    assert detect_lines(np.full((500, 500), 255, dtype=np.uint8)) == []
+
+
+def test_detect_grids_skips_coloured_tables_and_lone_rules():
+    page = np.full((1600, 1200, 3), 255, dtype=np.uint8)
+    # black table with two rows and three columns
+    for row in (100, 200, 300):
+        page[row:row + 3, 100:1100] = 0
+    for column in (100, 600, 1100):
+        page[100:303, column:column + 3] = 0
+    # blue stamp table and a signature rule
+    for row in (800, 1000):
+        page[row:row + 3, 100:1100] = (0, 0, 255)
+    for column in (100, 1100):
+        page[800:1003, column:column + 3] = (0, 0, 255)
+    page[1400:1403, 100:700] = 0
+
+    (x, y, width, height), = detect_grids(page)
+    assert abs(x - 100) <= 6 and abs(y - 100) <= 6
+    assert abs(x + width - 1103) <= 6 and abs(y + height - 303) <= 6
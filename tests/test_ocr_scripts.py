@@ -0,0 +1,14 @@
+from documents_parser import settings
+from documents_parser.parser import ocr_m11_scripts, ocr_fmu76_scripts
+
+
+def test_codes_by_digit_groups_match_the_positional_parse(monkeypatch):
+    m11_text, fmu76_text = "Коды 0315006 по 00083262 5219", "Коды 0315835 00083262 2377"
+    positional = ocr_m11_scripts.parse_codes(m11_text), ocr_fmu76_scripts.parse_codes(fmu76_text)
+    assert positional[0] == {"ОКУД": "0315006", "ОКПО": "00083262", "№": "5219"}
+    assert positional[1] == {"ОКУД": "0315835", "ОКПО": "00083262", "БЕ": "2377"}
+
+    monkeypatch.setattr(settings, "OCR_FIELD_PROFILES", True)
+    assert (ocr_m11_scripts.parse_codes(m11_text), ocr_fmu76_scripts.parse_codes(fmu76_text)) == positional
+    # the profiled OCR may read the codes without the labels
+    assert ocr_m11_scripts.parse_codes("0315006 00083262 5219") == positional[0]
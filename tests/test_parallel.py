@@ -0,0 +1,7 @@
+from documents_parser.utils.parallel import run_parallel
+
+
+def test_run_parallel_keeps_order():
+    items = list(range(-20, 20))
+    assert run_parallel(abs, items, workers=2) == [abs(i) for i in items]
+    assert run_parallel(abs, items, workers=1) == [abs(i) for i in items]
@@ -0,0 +1,44 @@
+import json
+import pstats
+import time
+from documents_parser import settings
+from documents_parser.utils.profiling import profile_stem, profiled, profiling
+from documents_parser.utils.timing import stage
+
+
+def test_profile_summary_is_saved(tmp_path):
+    stem = profile_stem(tmp_path, "data/М-11/Принято/doc 1.pdf")
+    assert stem.name.startswith("doc_1.document.")
+
+    with profiling(stem) as summary:
+        with stage("tesseract"):
+            data = [bytearray(1024) for _ in range(100)]
+            time.sleep(0.01)
+        # nested profiles are covered by the outer one
+        with profiling(tmp_path / "inner") as inner:
+            assert inner is None
+    assert data
+
+    assert summary["path"] == f"{stem}.json"
+    with open(summary["path"], encoding="utf-8") as f:
+        saved = json.load(f)
+    assert saved["external"]["tesseract"] > 0 and saved["external"]["poppler"] == 0
+    assert saved["stages"]["tesseract"]["calls"] == 1
+    assert saved["top_functions"] and saved["top_allocations"]
+    assert pstats.Stats(f"{stem}.prof").total_calls > 0
+    assert not (tmp_path / "inner.json").exists()
+
+
+def test_profiled_names_the_profile_by_the_document(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "PROFILE_RATE", 1.0)
+
+    @profiled
+    def table_ocr(path, context=None):
+        return path
+
+    # the document path is passed by position or by the name of the first argument
+    assert table_ocr("a.pdf") == "a.pdf"
+    assert table_ocr(path="b.pdf") == "b.pdf"
+    names = sorted(path.name.split(".")[0] for path in tmp_path.glob("*.json"))
+    assert names == ["a", "b"]
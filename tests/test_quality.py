@@ -0,0 +1,41 @@
+import logging
+import numpy as np
+import pytest
+from documents_parser import settings
+from documents_parser.utils.quality import (
+    TIERS, get_tier, prepare_image, quality_tier, scale_box, tessdata_dir
+)
+
+
+def test_tier_is_scoped_and_prepares_images(monkeypatch, tmp_path, caplog):
+    assert get_tier().name == settings.QUALITY_TIER
+    with quality_tier("accurate") as tier:
+        assert get_tier() is tier
+        # nested blocks without a tier keep the current one
+        with quality_tier(None):
+            assert get_tier().name == "accurate"
+    assert get_tier().name == settings.QUALITY_TIER
+    with pytest.raises(ValueError):
+        get_tier("slow")
+
+    img = np.full((100, 200, 3), 250, dtype=np.uint8)
+    img[40:60, 50:150] = 20
+    prepared, scale = prepare_image(img, tier)
+    assert prepared.shape == (150, 300) and scale == 1.5
+    assert set(np.unique(prepared)) == {0, 255}
+    assert scale_box((10, 20, 30, 40), scale) == (15, 30, 45, 60)
+    assert prepare_image(img, TIERS["balanced"])[0] is img
+    assert prepare_image(img, TIERS["fast"])[0].shape == (75, 150, 3)
+    # images rendered at the tier resolution are not resampled
+    assert prepare_image(img, TIERS["fast"], dpi=TIERS["fast"].dpi)[0] is img
+
+    monkeypatch.setattr(settings, "TESSDATA_DIR", "")
+    with caplog.at_level(logging.WARNING, logger="dev"):
+        assert tessdata_dir(TIERS["fast"], "rus") is None
+    assert "TESSDATA_DIR is not set" in caplog.text
+    monkeypatch.setattr(settings, "TESSDATA_DIR", str(tmp_path))
+    assert tessdata_dir(TIERS["fast"], "rus") is None
+    (tmp_path / "fast").mkdir()
+    (tmp_path / "fast" / "rus.traineddata").touch()
+    assert tessdata_dir(TIERS["fast"], "rus") == str(tmp_path / "fast")
+    assert tessdata_dir(TIERS["balanced"], "rus") is None
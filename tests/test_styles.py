@@ -0,0 +1,21 @@
+import pandas as pd
+from documents_parser.ui.styles import HIGHLIGHT, highlight_cells, highlight_rows
+
+
+def test_highlight_cells_marks_only_unvalidated_coordinates():
+    # equal values in other cells must not be highlighted
+    df = pd.DataFrame({"Код": ["x", "x", "1"], "Счет": ["x", "7909", "x"]})
+    styles = highlight_cells(df, [(0, "Код"), (2, "Счет"), (10, "Код")])
+    assert styles.eq(HIGHLIGHT).to_numpy().tolist() == [
+        [True, False],
+        [False, False],
+        [False, True],
+    ]
+    page = df.iloc[1:]
+    assert highlight_cells(page, [(0, "Код"), (2, "Счет")]).eq(HIGHLIGHT).sum().sum() == 1
+
+
+def test_highlight_rows():
+    report = pd.DataFrame({"Название": ["Организация", "Тип формы"], "Значение": ["ООО", "М-11"]})
+    styles = highlight_rows(report, ["Тип формы"])
+    assert styles.eq(HIGHLIGHT).to_numpy().tolist() == [[False, False], [True, True]]
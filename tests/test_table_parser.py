@@ -0,0 +1,91 @@
+import cv2
+import numpy as np
+import pandas as pd
+from PyPDF2 import PdfReader, PdfWriter
+from PIL import Image
+from documents_parser.parser.table_parser import (
+    LATTICE_RESOLUTION, ContextBackend, clear_dataframe, mask_regions, read_tables, stitch_tables
+)
+from documents_parser.utils.document import DocumentContext
+
+
+def test_stitch_tables_joins_pages_and_split_rows():
+    header = [["name", "count"], ["", ""], ["1", "2"]]
+    first = pd.DataFrame(header + [["bolt", "3"], ["long\nname", "1"]])
+    # the last row continues on the next page
+    second = pd.DataFrame(header + [["", "0"], ["nut", "5"]])
+    third = pd.DataFrame(header + [["washer", "7"]])
+    other = pd.DataFrame([["stamp"]])
+
+    joined, stamp = stitch_tables([first, second, third, other])
+    assert stamp is other
+    assert joined.iloc[3:, 0].tolist() == ["bolt", "long\nname", "nut", "washer"]
+    assert joined.iloc[3:, 1].tolist() == ["3", "10", "5", "7"]
+
+    cleared, = clear_dataframe([joined])
+    assert cleared.iloc[4, 0] == "longname"
+    assert joined.iloc[4, 0] == "long\nname"
+
+
+def test_clear_dataframe_cleans_string_dtype_columns():
+    table = pd.DataFrame({
+        "name": pd.Series(["long\nname", "nut"], dtype="string"),
+        "code": pd.Series(["1\n2", None], dtype=object),
+        "count": [1, 2],
+    })
+    cleared, = clear_dataframe([table])
+    assert cleared["name"].tolist() == ["longname", "nut"]
+    assert cleared["name"].dtype == "string"
+    assert cleared["code"].tolist() == ["12", None]
+    assert cleared["count"].tolist() == [1, 2]
+
+
+def test_context_backend_renders_pages_rotated_by_camelot(tmp_path, monkeypatch):
+    writer = PdfWriter()
+    writer.add_blank_page(width=595, height=842)
+    with open(tmp_path / "doc.pdf", "wb") as f:
+        writer.write(f)
+    context = DocumentContext(str(tmp_path / "doc.pdf"))
+    backend = ContextBackend(context, {0: np.zeros((20, 10, 3), dtype=np.uint8)})
+    calls = []
+    monkeypatch.setattr(backend.fallback, "convert", lambda pdf, png, dpi: calls.append(("ghostscript", dpi)))
+
+    # camelot rotates the page by /Rotate, the media box is unchanged
+    for rotation in (0, 90):
+        writer = PdfWriter()
+        writer.add_page(PdfReader(tmp_path / "doc.pdf").pages[0])
+        writer.pages[0].rotate(rotation)
+        with open(tmp_path / "page-1.pdf", "wb") as f:
+            writer.write(f)
+        backend.convert(str(tmp_path / "page-1.pdf"), str(tmp_path / f"page-{rotation}.png"))
+    # the rendered page is passed as is, the rotated one is rendered at the lattice resolution
+    assert cv2.imread(str(tmp_path / "page-0.png")).shape == (20, 10, 3)
+    assert calls == [("ghostscript", LATTICE_RESOLUTION)]
+
+
+def test_document_pages_are_rendered_once(tmp_path, monkeypatch):
+    writer = PdfWriter()
+    for _ in range(3):
+        writer.add_blank_page(width=72, height=72)
+    with open(tmp_path / "doc.pdf", "wb") as f:
+        writer.write(f)
+    context = DocumentContext(str(tmp_path / "doc.pdf"))
+    renders = []
+    monkeypatch.setattr(
+        context, "_render",
+        lambda index, dpi=None: renders.append((index, dpi)) or Image.new("RGB", (dpi, dpi), "white")
+    )
+
+    # the header parser takes the first page at the context resolution
+    assert context.gray(0).shape == (context.dpi, context.dpi)
+    assert read_tables(context, workers=1, scoped=True) == []
+    assert renders == [(index, LATTICE_RESOLUTION) for index in range(3)]
+    # only the page of the header is kept
+    assert list(context._pages) == [0]
+
+
+def test_mask_regions_keeps_only_the_tables():
+    image = np.zeros((300, 300, 3), dtype=np.uint8)
+    masked = mask_regions(image, [(30, 60, 90, 120)])
+    rows, columns = np.nonzero(masked[:, :, 0] == 0)
+    assert (rows.min(), rows.max(), columns.min(), columns.max()) == (60, 179, 30, 119)
@@ -0,0 +1,66 @@
+import numpy as np
+from documents_parser.utils.templates import LayoutTemplate, TemplateRegistry, fingerprint
+
+
+def page_with_rules(*rows: int, shift: tuple[int, int] = (0, 0), rise: int = 0) -> np.ndarray:
+    page = np.full((2000, 1600), 255, dtype=np.uint8)
+    dy, dx = shift
+    for row in rows:
+        # skewed rule rises by `rise` pixels over its length
+        for step, x in enumerate(range(200, 1200, 100)):
+            y = row + dy - rise * step // 10
+            page[y:y + 3, x + dx:x + dx + 100] = 0
+    return page
+
+
+def scanned(page: np.ndarray, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    noisy = page.astype(np.int16) + rng.normal(0, 20, page.shape).astype(np.int16)
+    # dust and text strokes too short to be rules
+    noisy[rng.random(page.shape) < 0.002] = 0
+    noisy[350:360, 300:340] = 0
+    return np.clip(noisy, 0, 255).astype(np.uint8)
+
+
+def test_fingerprint_matches_scans_of_the_same_layout():
+    page = page_with_rules(300, 400)
+    template = LayoutTemplate.learn(fingerprint(page, "М-11"), {"org": np.s_[260:300, 200:1200]})
+    registry = TemplateRegistry(max_templates=4)
+    registry.put(template)
+
+    # noise, a shift of a few pixels and skew keep the layout
+    for seed, (shift, rise) in enumerate([((0, 0), 0), ((3, -5), 0), ((-2, 6), 4)]):
+        assert registry.get(fingerprint(scanned(page_with_rules(300, 400, shift=shift, rise=rise), seed), "М-11")) == template
+    # content below the header band is ignored
+    below = page_with_rules(300, 400)
+    below[1500:1503, 200:1200] = 0
+    assert registry.get(fingerprint(below, "М-11")) == template
+    # other rules, far shift or another form is another layout
+    assert registry.get(fingerprint(page_with_rules(300, 440), "М-11")) is None
+    assert registry.get(fingerprint(page_with_rules(300, 400, shift=(40, 0)), "М-11")) is None
+    assert registry.get(fingerprint(page, "ФМУ-76")) is None
+    assert (registry.hits, registry.misses) == (4, 3)
+
+
+def test_template_rois_round_trip(tmp_path):
+    page = page_with_rules(300, 400, 1500)
+    shape = page.shape
+    rois = {"organisation": np.s_[260:300, 200:1200], "codes": np.s_[210:400, -390:-100]}
+    probe = fingerprint(page, "М-11")
+    # only the rules of the header band are found
+    assert probe.bottom == 600
+    assert [line[1] for line in probe.lines] == [300, 400]
+    template = LayoutTemplate.learn(probe, rois)
+    assert template.lines == probe.lines
+    assert template.rois(shape) == {"organisation": np.s_[260:300, 200:1200], "codes": np.s_[210:400, 1210:1500]}
+    # ROI below the band depends on the content which is not fingerprinted
+    assert LayoutTemplate.learn(probe, {"committee": np.s_[1450:1500, 200:1200]}) is None
+
+    path = tmp_path / "templates.json"
+    registry = TemplateRegistry(path, max_templates=2)
+    probes = [fingerprint(page, name) for name in ("a", "b", "c")]
+    for other in probes:
+        registry.put(LayoutTemplate.learn(other, rois))
+    assert registry.get(probes[0]) is None
+    assert TemplateRegistry(path).get(probes[2]) == LayoutTemplate.learn(probes[2], rois)
+    assert (registry.hits, registry.misses) == (0, 1)
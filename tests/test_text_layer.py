@@ -0,0 +1,38 @@
+from pathlib import Path
+from documents_parser.parser import ocr_m11_scripts, ocr_fmu76_scripts
+from documents_parser.utils.text_layer import read_spans, has_text_layer
+
+DATA_PATH = Path(__file__).parent.parent / "data"
+
+
+def test_m11_header_from_text_layer():
+    spans = read_spans(str(DATA_PATH / "М-11/Принято/М11_6078_11.04.2023.pdf"), page_numbers=[0])
+    assert has_text_layer(spans[0])
+    fields = ocr_m11_scripts.parse_text_layer(spans[0])
+    assert fields["Требование-накладная"] == "00006078"
+    assert fields["Организация"] == 'ОАО "Никелин"'
+    assert fields["Коды [Форма по ОКУД]"] == "0315006"
+    assert fields["Коды [Форма по ОКПО]"] == "00083262"
+    assert fields["Коды [Форма, 3 поле]"] == "5219"
+    assert "Типовая межотраслевая форма" in fields["Тип формы"]
+    assert fields["Разрешил"] == "Начальник дистанции пути Келев Авас Геннадьевич"
+
+
+def test_fmu76_header_from_text_layer():
+    spans = read_spans(str(DATA_PATH / "ФМУ-76/Принято/ФМУ 76_790_15082023.pdf"), page_numbers=[0])
+    fields = ocr_fmu76_scripts.parse_text_layer(spans[0])
+    assert fields["Номер акта"] == "790"
+    assert fields["Дата акта"] == "15.08.2023"
+    assert fields["Коды [Форма, БЕ]"] == "2377"
+    assert fields["Тип формы"] == "Специализированная форма № ФМУ-76"
+
+
+def test_scanned_file_has_no_text_layer():
+    spans = read_spans(str(DATA_PATH / "ФМУ-76/Принято/ФМУ76_1_21.08.2023.pdf"), page_numbers=[0])
+    assert not spans or not has_text_layer(spans[0])
+
+
+def test_m11_text_layer_without_number_is_not_recognized():
+    spans = read_spans(str(DATA_PATH / "М-11/Принято/М11_6078_11.04.2023.pdf"), page_numbers=[0])
+    spans = [span._replace(text=span.text.replace("№", "")) for span in spans[0]]
+    assert ocr_m11_scripts.parse_text_layer(spans) is None
@@ -0,0 +1,47 @@
+import json
+from documents_parser.utils.timing import (
+    collect, export_jsonl, prometheus_text, record_stages, stage, stage_times, summarize_spans, tag, tagged, timed
+)
+
+
+def test_stages_are_accumulated_and_reset():
+    stage_times(reset=True)
+
+    @timed()
+    def parse_twice():
+        with stage("inner"):
+            return 2
+
+    assert parse_twice() == 2 and parse_twice() == 2
+    times = stage_times(reset=True)
+    assert times["parse_twice"]["calls"] == 2 and times["inner"]["calls"] == 2
+    # outer stages include the inner ones
+    assert times["parse_twice"]["seconds"] >= times["inner"]["seconds"]
+    assert stage_times() == {}
+
+
+def test_spans_are_tagged_and_exported(tmp_path):
+    stage_times(reset=True)
+    with collect() as spans, tagged(document="abc") as tags:
+        tags["form"] = "М-11"
+        # tags known deeper in the code
+        tag(pages=2)
+        with stage("camelot", page=1):
+            pass
+    tag(pages=3)
+    with tagged() as tags:
+        assert tags == {}
+    span, = spans
+    assert span.name == "camelot"
+    assert span.tags == {"document": "abc", "form": "М-11", "pages": 2, "page": 1}
+    assert summarize_spans(spans)["camelot"]["calls"] == 1
+
+    path = tmp_path / "spans.jsonl"
+    export_jsonl(spans, path)
+    assert json.loads(path.read_text(encoding="utf-8"))["tags"]["document"] == "abc"
+
+    record_stages({"camelot": {"seconds": 2.0, "calls": 3}}, "М-11")
+    text = prometheus_text()
+    assert '# TYPE documents_parser_stage_seconds_total counter' in text
+    assert 'documents_parser_stage_calls_total{stage="camelot",form="М-11"} 4' in text
+    stage_times(reset=True)
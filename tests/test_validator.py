@@ -0,0 +1,159 @@
+import random
+import pandas as pd
+import pytest
+from documents_parser.pipeline import STATUS_ACCEPTED, STATUS_REJECTED, document_status
+from documents_parser.ui import validator
+from documents_parser.ui.rules import CONTAINS, WARNING, Rule, RuleSet
+from documents_parser.ui.validator import check_date, check_float
+
+
+# Row-wise implementations the column-wise validators must match
+
+
+def rowwise_m11_1(dataframe):
+    reasons, unvalidated = [], []
+    for index, row in dataframe.iterrows():
+        if not check_date(row["Дата составления"]):
+            unvalidated.append((index, "Дата составления"))
+            reasons.append("Неверная дата составления")
+        if not row["Код вида операции"].isdigit():
+            unvalidated.append((index, "Код вида операции"))
+            reasons.append("Неверный код вида операции")
+        for name, reason in (("Отправитель", "Нет данных о отправителе"),
+                             ("Получатель", "Нет данных о получателе")):
+            cols = [col for col in dataframe.columns if name in col]
+            if not any(len(row[col]) > 10 for col in cols):
+                unvalidated.extend((index, col) for col in cols)
+                reasons.append(reason)
+        for col in [col for col in dataframe.columns if "Корреспондирующий счет" in col]:
+            if not row[col].replace(" ", "").isdigit() and row[col] != "-":
+                unvalidated.append((index, col))
+                reasons.append(f"{col}: неправильные данные")
+            elif not row[col].startswith("7909"):
+                unvalidated.append((index, col))
+                reasons.append(f"{col}: неправильные данные (начинается с 7909)")
+    return unvalidated, reasons
+
+
+def rowwise_m11_2(dataframe):
+    reasons, unvalidated = [], []
+    for index, row in dataframe.iterrows():
+        if index == 2:
+            continue
+        for col in [col for col in dataframe.columns if "Корреспондирующий счет" in col]:
+            if not row[col].replace(" ", "").replace("\n", "").isdigit() and row[col] != "-":
+                unvalidated.append((index, col))
+                reasons.append(f"{col}: неправильные данные (начинается с 1003)")
+            elif not row[col].startswith("1003"):
+                unvalidated.append((index, col))
+                reasons.append(f"{col}: неправильные данные")
+        col = "Материальные ценности (номенклатурный номер)"
+        if not row[col].replace(" ", "").replace("\n", "").isdigit():
+            unvalidated.append((index, col))
+            reasons.append(f'"{col}": неправильные данные (только цифры)')
+        col = "Единица измерения (код)"
+        if not row[col].isdigit():
+            unvalidated.append((index, col))
+            reasons.append(f'"{col}": неправильные данные (только цифры)')
+        for col in [col for col in dataframe.columns if "Количество" in col]:
+            if not check_float(row[col].replace(" ", "").replace("\n", "")):
+                unvalidated.append((index, col))
+                reasons.append(f"{col}: неправильные данные")
+        for col in [col for col in dataframe.columns if "руб." in col]:
+            parts = row[col].replace("\n", "").replace(" ", "").split(",")
+            if len(parts) != 2 or not parts[0].isdigit() or not parts[1].isdigit():
+                unvalidated.append((index, col))
+                reasons.append(f"{col}: Неправильный денежный формат (руб,коп)")
+    return unvalidated, reasons
+
+
+def rowwise_fmu_1(df):
+    reasons, unvalidated = [], []
+    department = "Структурное подразделение (цех, участок и др.)"
+    for index, row in df.iterrows():
+        if len(row[department]) < 3:
+            unvalidated.append((index, department))
+            reasons.append(f"{department}: Неправильное название организации")
+        for col, reason in (("Код операции", "Допустимы только цифры!"),
+                            ("Корреспондирующий счет (Cчет, субчет)", "Некорректно задан"),
+                            ("Корреспондирующий счет (Статья расходов/носитель затрат)",
+                             "Допустимы только цифры!")):
+            if not row[col].isdigit():
+                unvalidated.append((index, col))
+                reasons.append(f"{col}: {reason}")
+    return unvalidated, reasons
+
+
+VALUES = [
+    "11.04.2023", "1.1.2020", "32.01.2023", "11.13.2023", "11.04.23", "11.04.2099",
+    "11-04-2023", "01.01.2000.1", "", "-", "7909", "79090001", "7909 0001", "1003",
+    "1003\n12", "12", "abc", "Цех по ремонту пути", "Отправитель склад", "1 200,50",
+    "10,5", "10,5,1", "a,5", "1.000", "-3.125", "nan", "3", "IV",
+]
+
+
+def random_table(columns: list[str], rows: int = 60, seed: int = 0) -> pd.DataFrame:
+    rng = random.Random(seed)
+    return pd.DataFrame({col: [rng.choice(VALUES) for _ in range(rows)] for col in columns})
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_m11_validators_match_rowwise(seed):
+    first = random_table([
+        "Дата составления", "Код вида операции",
+        "Отправитель (структурное подразделение)", "Отправитель (вид деятельности)",
+        "Получатель (структурное подразделение)", "Получатель (вид деятельности)",
+        "Корреспондирующий счет (счет, субсчет)", "Корреспондирующий счет (код аналитического учета)",
+    ], seed=seed)
+    assert validator.validate_dataframe_m11_1(first) == rowwise_m11_1(first)
+
+    second = random_table([
+        "Корреспондирующий счет (счет, субсчет)",
+        "Материальные ценности (номенклатурный номер)", "Единица измерения (код)",
+        "Количество (затребовано)", "Количество (отпущено)",
+        "Цена, руб. коп.", "Сумма без учета НДС, руб. коп.",
+    ], seed=seed)
+    assert validator.validate_dataframe_m11_2(second) == rowwise_m11_2(second)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_fmu_validators_match_rowwise(seed):
+    first = random_table([
+        "Структурное подразделение (цех, участок и др.)", "Код операции",
+        "Корреспондирующий счет (Cчет, субчет)",
+        "Корреспондирующий счет (Статья расходов/носитель затрат)",
+    ], seed=seed)
+    assert validator.validate_dataframe_fmu_1(first) == rowwise_fmu_1(first)
+
+
+def test_rule_chain_reports_first_failed_rule_and_counts_hits():
+    rules = RuleSet([
+        Rule("Счет", validator.is_digit, "{field}: не число", match=CONTAINS),
+        Rule("Счет", lambda values: values.str.startswith("7909"), "{field}: не 7909", match=CONTAINS),
+        Rule("Код", validator.is_digit, "{field}: не число", WARNING),
+    ], skip_index=[2])
+    table = pd.DataFrame({
+        "Счет (субсчет)": ["7909", "abc", "1003", "abc"],
+        "Код": ["1", "x", "2", "3"],
+    })
+    violations = rules.check(table)
+    assert [(v.index, v.columns, v.message, v.severity) for v in violations] == [
+        (1, ["Счет (субсчет)"], "Счет (субсчет): не число", "error"),
+        (1, ["Код"], "Код: не число", "warning"),
+        (3, ["Счет (субсчет)"], "Счет (субсчет): не число", "error"),
+    ]
+    assert rules.validate(table) == (
+        [(1, "Счет (субсчет)"), (3, "Счет (субсчет)")],
+        ["Счет (субсчет): не число", "Счет (субсчет): не число"],
+    )
+    stats = rules.stats()
+    assert stats["hits"].tolist() == [4, 0, 2]
+    assert stats["calls"].tolist() == [2, 2, 2]
+
+
+def test_document_status_rejects_unvalidated_cells_and_reasons():
+    assert document_status([], [], [[], []], [[], []]) == (STATUS_ACCEPTED, [])
+    assert document_status([], [], [[], [(0, "Цена")]], [[], []]) == (STATUS_REJECTED, [])
+    assert document_status(["Номер"], ["нет номера"], [[]], [["нет даты"]]) == (
+        STATUS_REJECTED, ["нет номера", "нет даты"]
+    )